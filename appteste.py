@@ -34,6 +34,19 @@ import backtester as timemachine
 import capo
 import alocador as allocator
 import bot
+import padroes as candles
+import niveis as levels
+import perfil_volume as profile
+import montecarlo as casino
+import opcoes as desk
+import risco as risk
+import estresse as stress
+import covariancia as abacus
+import previsao as prophet
+import sensibilidade as shadow
+import rotacao as compass
+import sentinela as sentinel
+import replay as rewind
 
 # --- CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(
@@ -265,7 +278,8 @@ if st.sidebar.button("ATUALIZAR SISTEMA", type="primary"):
     with st.spinner('Processando Dados Globais, IA e Risco...'):
         lista = [t.strip() for t in tickers_input.split(',')]
         st.session_state['lista_ativos'] = lista
-        st.session_state['df_precos'] = db.buscar_dados_multiticker(lista, periodo)
+        st.session_state['painel'] = db.buscar_painel(lista, periodo)
+        st.session_state['df_precos'] = st.session_state['painel'].fechamentos() if not st.session_state['painel'].vazio else pd.DataFrame()
         st.session_state['macro_data'] = governor.coletar_dados_macro()
         st.session_state['portfolio'] = vault.carregar_portfolio(USER_ID)
         st.session_state['historico'] = vault.carregar_historico(USER_ID)
@@ -277,6 +291,7 @@ if 'dados_carregados' in st.session_state and not st.session_state['df_precos'].
     df_precos = st.session_state['df_precos']
     lista = st.session_state['lista_ativos']
     df_macro = st.session_state['macro_data']
+    painel_ohlcv = st.session_state.get('painel')
 
     # -------------------------------------------------------------------------------------------
     # 0. CHAT ROOM
@@ -312,7 +327,9 @@ if 'dados_carregados' in st.session_state and not st.session_state['df_precos'].
 
         st.subheader("⭐ CAPO'S LIST (Top Conviction)")
         with st.spinner("O Capo está deliberando..."):
-            df_rank = capo.ranquear_oportunidades(lista, df_precos)
+            # Reaproveita o macro já baixado no ATUALIZAR SISTEMA (zero downloads por ativo)
+            ctx_macro = governor.montar_contexto_macro(df_macro) if not df_macro.empty else None
+            df_rank = capo.ranquear_oportunidades(lista, painel_ohlcv if painel_ohlcv is not None else df_precos, ctx_macro)
             if not df_rank.empty:
                 def highlight_veredito(val): return f'color: {"#00FF00" if "COMPRA" in val else "#FF4B4B"}; font-weight: bold'
                 st.dataframe(df_rank.style.applymap(highlight_veredito, subset=['Veredito']).format({'Preço': "{:.2f}", 'Score': "{:.0f}"}), use_container_width=True, height=250)
@@ -367,11 +384,18 @@ if 'dados_carregados' in st.session_state and not st.session_state['df_precos'].
                         rsi = brain.calcular_rsi(h).iloc[-1]
                         if rsi < 25: sinais.append(f"🟢 {t}: OVERSOLD (RSI {rsi:.0f})")
                         if rsi > 75: sinais.append(f"🔴 {t}: OVERBOUGHT (RSI {rsi:.0f})")
-                        if brain.detectar_baleia(h.to_frame()): sinais.append(f"🐋 {t}: WHALE ACTIVITY")
+                        if painel_ohlcv is not None and t in painel_ohlcv and brain.detectar_baleia(painel_ohlcv.ativo(t)): sinais.append(f"🐋 {t}: WHALE ACTIVITY")
             if sinais:
                 for s in sinais: st.warning(s)
             else: st.info("Sem sinais extremos no momento.")
 
+        if painel_ohlcv is not None and not painel_ohlcv.vazio:
+            st.subheader("🧲 Liquidity Map (Volume Profile)")
+            # Um único histograma (bincount) para a watchlist inteira
+            df_perfil = profile.perfis_lote(painel_ohlcv.selecionar(lista))
+            if not df_perfil.empty:
+                st.dataframe(df_perfil[['Preço', 'POC', 'VAL', 'VAH', 'Posição']].style.format({'Preço': "{:.2f}", 'POC': "{:.2f}", 'VAL': "{:.2f}", 'VAH': "{:.2f}"}), use_container_width=True)
+
         c_chart, c_pie = st.columns([2, 1])
         with c_chart:
             st.subheader("📈 Equity Curve")
@@ -396,7 +420,7 @@ if 'dados_carregados' in st.session_state and not st.session_state['df_precos'].
         with c_table:
             if st.button("🔫 RUN STRATEGY SCANNER (Pro)"):
                 with st.spinner("Caçando oportunidades táticas..."):
-                    df_scan = hunter.escanear_estrategias(df_precos)
+                    df_scan = hunter.escanear_estrategias(painel_ohlcv if painel_ohlcv is not None else df_precos)
                     if not df_scan.empty:
                         st.success(f"Caçada concluída! {len(df_scan)} setups encontrados.")
                         st.dataframe(df_scan.style.format({'Preço': "{:.2f}"}), use_container_width=True)
@@ -434,7 +458,8 @@ if 'dados_carregados' in st.session_state and not st.session_state['df_precos'].
         c_sel, c_graph = st.columns([1, 3])
         with c_sel:
             ativo_foco = st.selectbox("Ativo:", lista)
-            df_ohlc = db.buscar_dados_detalhados(ativo_foco, periodo)
+            # OHLCV já está no painel carregado; só busca se o ativo não estiver nele
+            df_ohlc = painel_ohlcv.ativo(ativo_foco) if painel_ohlcv is not None and ativo_foco in painel_ohlcv else db.buscar_dados_detalhados(ativo_foco, periodo)
             if not df_ohlc.empty:
                 atr = brain.calcular_atr(df_ohlc).iloc[-1]; atual = df_ohlc['Close'].iloc[-1]
                 stop, target, ratio = brain.calcular_setup_trade(atual, atr)
@@ -457,15 +482,25 @@ if 'dados_carregados' in st.session_state and not st.session_state['df_precos'].
                 cor_sinal = "#00FF00" if "ALTA" in sinal_ml else "#FF4B4B"
                 st.markdown(f"""<div class="oracle-box" style="border-color: {cor_sinal};"><h3 style="color: {cor_sinal}; margin:0;">{sinal_ml}</h3><p style="font-size: 1.2em; margin:5px;">Probabilidade: <b>{prob:.1f}%</b></p></div>""", unsafe_allow_html=True)
                 
-                texto_analise = story.gerar_parecer_tecnico(ativo_foco, df_ohlc, brain.calcular_rsi(df_ohlc['Close']).iloc[-1], *brain.calcular_suporte_resistencia_auto(df_ohlc)[0:2])
+                texto_analise = story.gerar_parecer_tecnico(ativo_foco, df_ohlc, brain.calcular_rsi(df_ohlc['Close']).iloc[-1], *levels.niveis_proximos(df_ohlc, ticker=ativo_foco))
                 st.markdown(f'<div class="narrativa-box">{texto_analise}</div>', unsafe_allow_html=True)
 
         with c_graph:
-            t1, t2, t3, t4 = st.tabs(["📈 Technicals", "📅 Seasonality", "⚔️ Benchmark", "💎 Valuation"])
+            t1, t2, t3, t4, t5 = st.tabs(["📈 Technicals", "📅 Seasonality", "⚔️ Benchmark", "💎 Valuation", "🔭 Projections"])
             with t1:
                 if not df_ohlc.empty:
                     fig = make_subplots(rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.02, row_width=[0.2, 0.2, 0.6])
                     fig.add_trace(go.Candlestick(x=df_ohlc.index, open=df_ohlc['Open'], high=df_ohlc['High'], low=df_ohlc['Low'], close=df_ohlc['Close'], name='Price'), row=1, col=1)
+                    # Padrões de candle (tabela de eventos vetorizada)
+                    ev = candles.eventos_padroes(df_ohlc)
+                    for direcao, cor, simbolo in [("Bull", "#00FF00", "triangle-up"), ("Bear", "#FF4B4B", "triangle-down")]:
+                        sub = ev[ev['Direção'] == direcao]
+                        if not sub.empty:
+                            fig.add_trace(go.Scatter(x=sub['Data'], y=sub['Preço'], mode='markers', name=f"Padrões {direcao}", text=sub['Padrão'], hovertemplate="%{text}<extra></extra>", marker=dict(symbol=simbolo, color=cor, size=8)), row=1, col=1)
+                    # Zonas de suporte/resistência (cache por ativo + última barra)
+                    for _, z in levels.mapear_zonas(df_ohlc, ticker=ativo_foco).iterrows():
+                        cor_z = "rgba(0,255,0,0.12)" if z['Tipo'] == 'Suporte' else "rgba(255,75,75,0.12)"
+                        fig.add_hrect(y0=z['Inferior'], y1=z['Superior'], fillcolor=cor_z, line_width=0, annotation_text=f"{z['Tipo']} ({z['Toques']} toques)", annotation_position="right", row=1, col=1)
                     st.plotly_chart(fig.update_layout(template="plotly_dark", height=700, xaxis_rangeslider_visible=False), use_container_width=True)
             with t2:
                 try:
@@ -479,6 +514,14 @@ if 'dados_carregados' in st.session_state and not st.session_state['df_precos'].
                     if not df_bench_data.empty and '^GSPC' in df_bench_data.columns:
                         st.plotly_chart(px.line((df_bench_data / df_bench_data.iloc[0]) * 100).update_layout(template="plotly_dark", height=500), use_container_width=True)
                 except: pass
+                st.markdown("#### 🧭 Rotação da Watchlist (RRG vs índice igual-ponderado)")
+                c_rrg1, c_rrg2, c_rrg3 = st.columns(3)
+                jan_rrg = c_rrg1.slider("Janela", 5, 50, 14, key="jan_rrg")
+                suav_rrg = c_rrg2.slider("Suavização (EMA)", 1, 10, 1, key="suav_rrg")
+                cauda_rrg = c_rrg3.slider("Trilha (pregões)", 2, 60, 10, key="cauda_rrg")
+                rrg_wl = compass.calcular(df_precos, compass.MERCADO, jan_rrg, suav_rrg)
+                st.plotly_chart(compass.grafico_rrg(rrg_wl, cauda_rrg, destaque=ativo_foco), use_container_width=True)
+                st.dataframe(compass.posicoes(rrg_wl).style.format({'RS-Ratio': "{:.2f}", 'RS-Momentum': "{:.2f}"}), use_container_width=True)
             with t4:
                 st.subheader("💎 Fundamental Valuation Engine")
                 fund = val.obter_dados_fundamentos(ativo_foco)
@@ -488,6 +531,22 @@ if 'dados_carregados' in st.session_state and not st.session_state['df_precos'].
                     st.metric("Preço Justo (Graham)", f"{moeda} {graham:.2f}", delta=f"{upside:.1f}%")
                     st.write(fund)
                 else: st.warning("Sem dados fundamentalistas.")
+            with t5:
+                c_pj1, c_pj2, c_pj3 = st.columns(3)
+                modelo_pj = c_pj1.selectbox("Modelo", list(prophet.MODELOS), index=1, format_func={'linear': "Tendência Linear", 'log': "Tendência Log (crescimento %)"}.get)
+                janela_pj = c_pj2.select_slider("Janela (pregões)", [20, 60, 120, 252, 0], value=120, format_func=lambda j: "Histórico todo" if j == 0 else str(j)) or None
+                dias_pj = c_pj3.number_input("Horizonte (pregões)", 5, 120, 30, step=5)
+                if not df_ohlc.empty:
+                    pj = prophet.projetar(df_ohlc['Close'], int(dias_pj), modelo_pj, janela_pj)
+                    fut = prophet.datas_futuras(df_ohlc.index[-1], int(dias_pj))
+                    fig_pj = go.Figure([go.Scatter(x=df_ohlc.index, y=df_ohlc['Close'], name='Preço', line=dict(color='#D4AF37'))])
+                    fig_pj.add_trace(go.Scatter(x=fut, y=pj['superior'][:, 0], line=dict(width=0), showlegend=False))
+                    fig_pj.add_trace(go.Scatter(x=fut, y=pj['inferior'][:, 0], fill='tonexty', fillcolor='rgba(212,175,55,0.15)', line=dict(width=0), name='Intervalo 95%'))
+                    fig_pj.add_trace(go.Scatter(x=fut, y=pj['previsao'][:, 0], name='Projeção', line=dict(color='white', dash='dash')))
+                    st.plotly_chart(fig_pj.update_layout(template="plotly_dark", height=450), use_container_width=True)
+                st.markdown("#### 📋 Watchlist inteira (um único ajuste)")
+                tab_pj = prophet.projetar_tabela(df_precos, int(dias_pj), modelo_pj, janela_pj)
+                st.dataframe(tab_pj.sort_values('Var %', ascending=False).style.format({'Preço': "{:.2f}", 'Projeção': "{:.2f}", 'Var %': "{:+.2f}%", 'Inferior': "{:.2f}", 'Superior': "{:.2f}", 'Tendência %/dia': "{:+.3f}%", 'R²': "{:.2f}"}).background_gradient(cmap='RdYlGn', subset=['Var %']), use_container_width=True)
 
     # -------------------------------------------------------------------------------------------
     # 4. WAR ROOM (FULL 16 TABS)
@@ -534,17 +593,123 @@ if 'dados_carregados' in st.session_state and not st.session_state['df_precos'].
                     fig_bt.add_trace(go.Scatter(x=df_res.index, y=df_res['BuyHold_Equity'], name='B&H', line=dict(color='gray', dash='dot')))
                     st.plotly_chart(fig_bt.update_layout(template="plotly_dark", height=400), use_container_width=True)
                     if trades: st.dataframe(pd.DataFrame(trades), use_container_width=True)
+            with st.expander("🧪 Varredura de Parâmetros (grid search em vários ativos)"):
+                sw_strat = st.selectbox("Estratégia ", timemachine.ESTRATEGIAS, key="sw_strat")
+                sw_ativos = st.multiselect("Ativos", lista, default=lista[:10], key="sw_ativos")
+                grade_sw = {}
+                cols_sw = st.columns(len(timemachine.GRADES_PADRAO[sw_strat]))
+                for col, (nome, valores) in zip(cols_sw, timemachine.GRADES_PADRAO[sw_strat].items()):
+                    texto = col.text_input(nome, ", ".join(str(v) for v in valores), key=f"sw_{sw_strat}_{nome}")
+                    try: grade_sw[nome] = [float(v) if '.' in v else int(v) for v in texto.replace(' ', '').split(',') if v]
+                    except ValueError: grade_sw[nome] = valores
+                if st.button("RODAR VARREDURA") and sw_ativos:
+                    with st.spinner(f"Varrendo {sw_strat} em {len(sw_ativos)} ativos..."):
+                        st.session_state['sw_result'] = (sw_strat, timemachine.varrer_parametros(db.buscar_dados_multiticker(sw_ativos, "5y"), sw_strat, grade_sw, bt_cap))
+                if 'sw_result' in st.session_state:
+                    sw_nome, df_sw = st.session_state['sw_result']
+                    if df_sw.empty: st.warning("Sem dados suficientes para a varredura.")
+                    else:
+                        params_sw = [c for c in df_sw.columns if c in timemachine.GRADES_PADRAO[sw_nome]]
+                        c_sw1, c_sw2, c_sw3 = st.columns(3)
+                        eixo_y = c_sw1.selectbox("Linhas", params_sw, key="sw_y")
+                        eixo_x = c_sw2.selectbox("Colunas", params_sw, index=min(1, len(params_sw) - 1), key="sw_x")
+                        metrica_sw = c_sw3.selectbox("Métrica", ['Sharpe', 'Retorno %', 'Max DD %', 'Trades'], key="sw_m")
+                        if eixo_x != eixo_y:
+                            st.plotly_chart(px.imshow(timemachine.mapa_calor(df_sw, eixo_y, eixo_x, metrica_sw), text_auto=".2f", aspect="auto", color_continuous_scale='RdYlGn', labels=dict(color=metrica_sw)).update_layout(template="plotly_dark", title=f"{metrica_sw} médio entre ativos"), use_container_width=True)
+                        st.dataframe(df_sw.sort_values('Sharpe', ascending=False).style.format({'Retorno %': "{:.2f}%", 'Sharpe': "{:.2f}", 'Max DD %': "{:.2f}%"}), use_container_width=True)
+            with st.expander("🚶 Walk-Forward (otimiza no treino, opera fora da amostra)"):
+                c_wf1, c_wf2, c_wf3, c_wf4 = st.columns(4)
+                wf_strat = c_wf1.selectbox("Estratégia  ", timemachine.ESTRATEGIAS, key="wf_strat")
+                wf_treino = c_wf2.number_input("Treino (pregões)", 126, 1260, 504, step=21, key="wf_treino")
+                wf_teste = c_wf3.number_input("Teste (pregões)", 21, 504, 126, step=21, key="wf_teste")
+                wf_metrica = c_wf4.selectbox("Otimizar", ['Sharpe', 'Retorno %', 'Max DD %'], key="wf_metrica")
+                if st.button("RODAR WALK-FORWARD"):
+                    with st.spinner(f"Walk-forward de {wf_strat} em {bt_asset}..."):
+                        st.session_state['wf_result'] = timemachine.walk_forward(db.buscar_dados_detalhados(bt_asset, "max"), wf_strat, None, int(wf_treino), int(wf_teste), wf_metrica, bt_cap)
+                if 'wf_result' in st.session_state:
+                    wf = st.session_state['wf_result']
+                    if wf['equity'].empty: st.warning("Histórico curto demais para uma janela de treino + teste.")
+                    else:
+                        m_wf = st.columns(4)
+                        m_wf[0].metric("Retorno OOS", f"{wf['resumo']['Estratégia']['Retorno %']:.2f}%")
+                        m_wf[1].metric("Sharpe OOS", f"{wf['resumo']['Estratégia']['Sharpe']:.2f}")
+                        m_wf[2].metric("Max DD OOS", f"{wf['resumo']['Estratégia']['Max DD %']:.2f}%")
+                        m_wf[3].metric("Buy & Hold", f"{wf['resumo']['Buy & Hold']['Retorno %']:.2f}%")
+                        fig_wf = go.Figure()
+                        fig_wf.add_trace(go.Scatter(x=wf['equity'].index, y=wf['equity']['Strategy_Equity'], name='Walk-Forward', line=dict(color='#00FF00')))
+                        fig_wf.add_trace(go.Scatter(x=wf['equity'].index, y=wf['equity']['BuyHold_Equity'], name='B&H', line=dict(color='gray', dash='dot')))
+                        st.plotly_chart(fig_wf.update_layout(template="plotly_dark", height=400), use_container_width=True)
+                        st.dataframe(wf['janelas'].style.format({'Retorno Teste %': "{:+.2f}%", f'{wf_metrica} Treino': "{:.2f}"}), use_container_width=True)
+            with st.expander("🗂️ Backtest de Carteira (watchlist inteira, caixa único)"):
+                c_pb1, c_pb2, c_pb3, c_pb4 = st.columns(4)
+                pb_strat = c_pb1.selectbox("Estratégia   ", timemachine.ESTRATEGIAS, key="pb_strat")
+                pb_dim = c_pb2.selectbox("Dimensionamento", timemachine.DIMENSIONAMENTOS, format_func={'lote': f"Lote fixo (R$ {timemachine.LOTE_PADRAO:,.0f})", 'volatilidade': "Por volatilidade (ATR)", 'igual': "Peso igual"}.get, key="pb_dim")
+                pb_max = c_pb3.number_input("Máx. posições", 1, 100, 10, key="pb_max")
+                pb_periodo = c_pb4.selectbox("Período", ["2y", "5y", "10y"], index=1, key="pb_periodo")
+                c_pb5, c_pb6 = st.columns(2)
+                pb_stop = c_pb5.slider("Stop (x ATR)", 0.5, 10.0, timemachine.STOP_ATR, 0.5, key="pb_stop")
+                pb_take = c_pb6.slider("Take (x ATR)", 0.5, 20.0, timemachine.TAKE_ATR, 0.5, key="pb_take")
+                if st.button("RODAR CARTEIRA"):
+                    with st.spinner(f"Simulando {pb_strat} em {len(lista)} ativos..."):
+                        st.session_state['pb_result'] = timemachine.rodar_backtest_carteira(db.buscar_painel(lista, pb_periodo), pb_strat, bt_cap, pb_dim, max_posicoes=int(pb_max), stop_atr=pb_stop, take_atr=pb_take)
+                if 'pb_result' in st.session_state:
+                    pb = st.session_state['pb_result']
+                    if pb['equity'].empty: st.warning("Sem dados para a carteira.")
+                    else:
+                        m_pb = st.columns(4)
+                        m_pb[0].metric("Retorno", f"{pb['resumo']['Estratégia']['Retorno %']:.2f}%", delta=f"B&H {pb['resumo']['Buy & Hold']['Retorno %']:.2f}%")
+                        m_pb[1].metric("Sharpe", f"{pb['resumo']['Estratégia']['Sharpe']:.2f}")
+                        m_pb[2].metric("Max DD", f"{pb['resumo']['Estratégia']['Max DD %']:.2f}%")
+                        m_pb[3].metric("Exposição Média", f"{pb['resumo']['Estratégia']['Exposição Média %']:.1f}%")
+                        fig_pb = go.Figure()
+                        fig_pb.add_trace(go.Scatter(x=pb['equity'].index, y=pb['equity']['Strategy_Equity'], name='Carteira', line=dict(color='#00FF00')))
+                        fig_pb.add_trace(go.Scatter(x=pb['equity'].index, y=pb['equity']['BuyHold_Equity'], name='B&H (peso igual)', line=dict(color='gray', dash='dot')))
+                        st.plotly_chart(fig_pb.update_layout(template="plotly_dark", height=400), use_container_width=True)
+                        if not pb['trades'].empty: st.dataframe(pb['trades'].style.format({'Preço': "{:.2f}", 'Resultado': "R$ {:,.2f}"}), use_container_width=True)
+            with st.expander("⏪ Replay da Sentinela (Capo + regras de execução sobre o histórico)"):
+                c_rp1, c_rp2, c_rp3, c_rp4 = st.columns(4)
+                rp_periodo = c_rp1.selectbox("Período ", ["2y", "5y", "10y"], index=1, key="rp_periodo")
+                rp_retreino = c_rp2.number_input("Re-treino da IA (pregões)", 5, 252, rewind.RETREINO, key="rp_retreino")
+                rp_macro = c_rp3.checkbox("Regime macro histórico", True, key="rp_macro")
+                rp_fund = c_rp4.checkbox("Fundamentos atuais (viés)", False, key="rp_fund", help="Não há fundamentos 'na data': usar os de hoje antecipa informação.")
+                st.caption(f"Compra com Score ≥ {sentinel.SCORE_COMPRA}, zera com Score ≤ {sentinel.SCORE_VENDA}, lote de R$ {sentinel.LOTE_PADRAO:,.0f}, stop 2 ATR / alvo 3 ATR. O 1º ano só aquece indicadores e IA.")
+                if st.button("RODAR REPLAY"):
+                    with st.spinner(f"Repetindo a sentinela em {len(lista)} ativos (treinando a IA por data)..."):
+                        painel_rp = db.buscar_painel(lista, rp_periodo)
+                        inicio_rp = painel_rp.datas[min(252, len(painel_rp.datas) - 1)] if not painel_rp.vazio else None
+                        macro_rp = governor.coletar_dados_macro(rp_periodo) if rp_macro else None
+                        fund_rp = val.obter_dados_fundamentos_lote([t for t in lista if capo._usa_fundamentos(t)]) if rp_fund else None
+                        st.session_state['rp_result'] = rewind.rodar_replay(painel_rp, inicio_rp, bt_cap, True, int(rp_retreino), macro_rp, fund_rp)
+                if 'rp_result' in st.session_state:
+                    rp = st.session_state['rp_result']
+                    if rp['equity'].empty: st.warning("Sem dados para o replay.")
+                    else:
+                        m_rp = st.columns(4)
+                        m_rp[0].metric("Retorno", f"{rp['resumo']['Retorno %']:.2f}%")
+                        m_rp[1].metric("Sharpe", f"{rp['resumo']['Sharpe']:.2f}")
+                        m_rp[2].metric("Max DD", f"{rp['resumo']['Max DD %']:.2f}%")
+                        m_rp[3].metric("Trades", rp['resumo']['Trades'], delta=f"P&L R$ {rp['resumo']['PnL Realizado']:,.2f}")
+                        fig_rp = go.Figure()
+                        fig_rp.add_trace(go.Scatter(x=rp['equity'].index, y=rp['equity']['Patrimônio'], name='Patrimônio', line=dict(color='#00FF00')))
+                        fig_rp.add_trace(go.Scatter(x=rp['equity'].index, y=rp['equity']['Caixa'], name='Caixa', line=dict(color='gray', dash='dot')))
+                        st.plotly_chart(fig_rp.update_layout(template="plotly_dark", height=400), use_container_width=True)
+                        if not rp['trades'].empty: st.dataframe(rp['trades'].style.format({'Preço': "{:.2f}", 'Total': "R$ {:,.2f}", 'PnL': "R$ {:,.2f}"}), use_container_width=True)
 
         # T2: Guardian
         with t2:
             st.subheader("Guardian Monitor")
-            mkt_proxy = df_precos.pct_change().mean(axis=1).fillna(0)
-            betas = {t: brain.calcular_beta_alpha(df_precos[t].pct_change(), mkt_proxy)[0] for t in lista if t in df_precos}
+            betas = shadow.betas(df_precos)
             bp, al = brain.analisar_risco_portfolio(st.session_state['portfolio'], df_precos.iloc[-1], betas)
             st.metric("Portfolio Beta", f"{bp:.2f}")
             if al: 
                 for a in al: st.warning(a)
             else: st.success("Sem riscos de concentração.")
+            with st.expander("🌗 The Shadow: Beta / Alfa / Correlação vs Mercado"):
+                st.dataframe(shadow.tabela(df_precos)[shadow.MERCADO].drop(columns='N').style.format("{:.3f}"), use_container_width=True)
+                jan_beta = st.slider("Janela móvel (dias)", 20, 250, 60, 10, key="jan_shadow")
+                beta_movel = shadow.moveis(df_precos, shadow.MERCADO, jan_beta).get('Beta')
+                if beta_movel is not None and not beta_movel.dropna(how='all').empty:
+                    st.plotly_chart(px.line(beta_movel.dropna(how='all'), title=f"Beta Móvel {jan_beta}d").update_layout(template="plotly_dark", height=400), use_container_width=True)
 
         # T3: Rebalance
         with t3:
@@ -596,33 +761,95 @@ if 'dados_carregados' in st.session_state and not st.session_state['df_precos'].
         # T6: Markowitz
         with t6:
             st.subheader("⚖️ Markowitz")
+            c_opt1, c_opt2, c_opt3, c_opt4 = st.columns(4)
+            objetivo_opt = c_opt1.selectbox("Objetivo", ["max_sharpe", "min_variancia", "alvo"], format_func={'max_sharpe': "Máximo Sharpe", 'min_variancia': "Mínima Variância", 'alvo': "Retorno Alvo"}.get)
+            rf_opt = c_opt2.number_input("Taxa livre de risco (% a.a.)", 0.0, 30.0, 0.0, 0.5) / 100
+            teto_opt = c_opt3.slider("Peso máximo por ativo (%)", 5, 100, 100) / 100
+            cov_opt = c_opt4.selectbox("Covariância", list(abacus.METODOS), format_func={'amostral': "Amostral", 'ewma': "EWMA (RiskMetrics)", 'ledoit_wolf': "Ledoit-Wolf"}.get, key="cov_opt")
+            alvo_opt = st.number_input("Retorno alvo (% a.a.)", -50.0, 200.0, 15.0, 1.0) / 100 if objetivo_opt == 'alvo' else None
+            res_opt = architect.otimizar_precos(df_precos, objetivo_opt, rf_opt, alvo_opt, limites=(0.0, teto_opt), metodo_cov=cov_opt)
+            if res_opt:
+                o1, o2, o3 = st.columns(3)
+                o1.metric("Retorno Esperado", f"{res_opt['Retorno']*100:.2f}%"); o2.metric("Volatilidade", f"{res_opt['Volatilidade']*100:.2f}%"); o3.metric("Sharpe", f"{res_opt['Sharpe']:.2f}")
+                pesos_opt = pd.Series(res_opt['Pesos']); pesos_opt = pesos_opt[pesos_opt > 1e-4].sort_values(ascending=False)
+                st.plotly_chart(px.bar(pesos_opt * 100, labels={'value': 'Peso %', 'index': 'Ativo'}).update_layout(template="plotly_dark", showlegend=False), use_container_width=True)
+            else: st.warning("Limites inviáveis para a quantidade de ativos.")
             if st.button("⚠️ INICIAR SIMULAÇÃO"):
                 with st.spinner("Simulando..."):
-                    df_sim, melhor = architect.simular_fronteira_eficiente(df_precos)
+                    df_sim, melhor = architect.simular_fronteira_eficiente(df_precos, num_portfolios=200000, metodo_cov=cov_opt)
                     if df_sim is not None:
                         fig_ef = px.scatter(df_sim, x='Volatilidade', y='Retorno', color='Sharpe')
+                        fig_ef.add_trace(go.Scatter(x=melhor['Fronteira']['Volatilidade'], y=melhor['Fronteira']['Retorno'], mode='lines', name='Fronteira Analítica', line=dict(color='white', width=3)))
+                        fig_ef.add_trace(go.Scatter(x=[melhor['Volatilidade']], y=[melhor['Retorno']], mode='markers', name='Máx. Sharpe (simulado)', marker=dict(color='#D4AF37', size=14, symbol='star')))
                         st.plotly_chart(fig_ef, use_container_width=True)
                         st.dataframe(pd.DataFrame.from_dict(melhor['Pesos'], orient='index', columns=['Peso']), use_container_width=True)
 
         # T7-T16: Other Tabs (Simplified)
         with t7: st.plotly_chart(px.histogram(df_precos.pct_change().dropna().mean(axis=1), title="Distribuição Retornos", color_discrete_sequence=['#D4AF37']).update_layout(template="plotly_dark"), use_container_width=True)
-        with t8: st.plotly_chart(go.Figure([go.Scatter(y=np.mean(brain.monte_carlo_sim(df_precos, capital_war), axis=1), mode='lines', name='Expected', line=dict(color='yellow'))]).update_layout(template="plotly_dark"), use_container_width=True)
+        with t8:
+            st.subheader("💰 Monte Carlo (Carteira Real)")
+            c_mc1, c_mc2, c_mc3, c_mc4 = st.columns(4)
+            n_sims_mc = c_mc1.select_slider("Simulações", [1000, 10000, 50000, 100000], value=10000)
+            metodo_mc = c_mc2.selectbox("Modelo", ["normal", "bootstrap", "bloco"], format_func=lambda m: {"normal": "Normal (Cholesky)", "bootstrap": "Bootstrap Histórico", "bloco": "Block Bootstrap"}[m])
+            dias_mc = c_mc3.number_input("Horizonte (dias)", 21, 756, 252, step=21)
+            cov_mc = c_mc4.selectbox("Covariância", list(abacus.METODOS), format_func={'amostral': "Amostral", 'ewma': "EWMA (RiskMetrics)", 'ledoit_wolf': "Ledoit-Wolf"}.get, key="cov_mc")
+            pesos_mc, capital_mc = casino.pesos_da_carteira(st.session_state['portfolio'], df_precos)
+            if pesos_mc.empty: pesos_mc, capital_mc = None, capital_war # sem posições: pesos iguais sobre o caixa
+            ret_mc = (df_precos if pesos_mc is None else df_precos[list(pesos_mc.index)]).pct_change().dropna()
+            res_mc = casino.simular_carteira(ret_mc, pesos_mc.values if pesos_mc is not None else None, capital_mc, int(dias_mc), n_sims_mc, metodo_mc, seed=42, cov=abacus.estimador(ret_mc).matriz(cov_mc).to_numpy() if not ret_mc.empty else None)
+            if res_mc:
+                bandas = res_mc['bandas']
+                fig_mc = go.Figure()
+                fig_mc.add_trace(go.Scatter(x=bandas.index, y=bandas['P95'], line=dict(width=0), showlegend=False))
+                fig_mc.add_trace(go.Scatter(x=bandas.index, y=bandas['P5'], fill='tonexty', fillcolor='rgba(212,175,55,0.15)', line=dict(width=0), name='P5-P95'))
+                fig_mc.add_trace(go.Scatter(x=bandas.index, y=bandas['P75'], line=dict(width=0), showlegend=False))
+                fig_mc.add_trace(go.Scatter(x=bandas.index, y=bandas['P25'], fill='tonexty', fillcolor='rgba(212,175,55,0.35)', line=dict(width=0), name='P25-P75'))
+                fig_mc.add_trace(go.Scatter(x=bandas.index, y=bandas['P50'], name='Mediana', line=dict(color='yellow')))
+                fig_mc.add_trace(go.Scatter(x=bandas.index, y=res_mc['media'], name='Média', line=dict(color='white', dash='dot')))
+                st.plotly_chart(fig_mc.update_layout(template="plotly_dark", xaxis_title="Dias", yaxis_title="Patrimônio"), use_container_width=True)
+                m_mc1, m_mc2, m_mc3 = st.columns(3)
+                m_mc1.metric("Pior Cenário (P5)", f"R$ {res_mc['final']['P5']:,.2f}")
+                m_mc2.metric("Mediana", f"R$ {res_mc['final']['P50']:,.2f}")
+                m_mc3.metric("Prob. de Perda", f"{res_mc['prob_perda']*100:.1f}%")
         with t9: 
             foco = st.selectbox("Ativo AI", lista, key="ai_key")
             d = db.buscar_dados_detalhados(foco, periodo)
             if not d.empty: 
                 ds, pr, _ = brain.projecao_propheta(d['Close'])
-                st.plotly_chart(go.Figure([go.Scatter(x=d.index, y=d['Close']), go.Scatter(x=ds, y=pr, line=dict(dash='dash'))]).update_layout(template="plotly_dark"), use_container_width=True)
+                pj = prophet.projetar(d['Close'], len(ds))
+                st.plotly_chart(go.Figure([go.Scatter(x=d.index, y=d['Close']), go.Scatter(x=ds, y=pj['superior'][:, 0], line=dict(width=0), showlegend=False), go.Scatter(x=ds, y=pj['inferior'][:, 0], fill='tonexty', fillcolor='rgba(212,175,55,0.15)', line=dict(width=0), name='Intervalo 95%'), go.Scatter(x=ds, y=pr, line=dict(dash='dash'))]).update_layout(template="plotly_dark"), use_container_width=True)
         with t10: st.plotly_chart(px.imshow(brain.calcular_matriz_correlacao_raw(df_precos), text_auto=".2f", color_continuous_scale='RdYlGn_r').update_layout(template="plotly_dark"), use_container_width=True)
         with t11:
             var_fin, var_pct = brain.calcular_var_portfolio(st.session_state['portfolio'], df_precos)
             cvar_fin = brain.calcular_cvar_portfolio(st.session_state['portfolio'], df_precos)
             st.metric("VaR (95%)", f"R$ {var_fin:,.2f}"); st.metric("CVaR", f"R$ {cvar_fin:,.2f}")
+            expo_risco = risk.exposicoes({'Carteira': st.session_state['portfolio']}, df_precos)
+            if expo_risco.shape[1] > 0:
+                motor_risco = risk.MotorRisco(df_precos, expo_risco.columns)
+                tab_risco = motor_risco.avaliar(expo_risco, horizontes=(1, 5, 10), seed=42)
+                if not tab_risco.empty:
+                    st.markdown("#### 📐 VaR / ES por Método, Horizonte e Confiança")
+                    st.dataframe(tab_risco.pivot_table(index=['Horizonte', 'Confiança'], columns='Método', values=['VaR', 'ES']).style.format("R$ {:,.2f}"), use_container_width=True)
+                    bt_risco = motor_risco.backtest(expo_risco, janela=min(250, max(len(motor_risco.R) // 2, 20)))
+                    st.markdown("#### 🧪 Backtest do VaR 99% (Kupiec / Christoffersen)")
+                    st.dataframe(bt_risco['resumo'], use_container_width=True)
         with t12:
             cenario = st.selectbox("Cenário", ["Queda S&P500 (-10%)", "Crash Bitcoin (-20%)"])
             fator = -0.10 if "S&P" in cenario else -0.20; ticker = '^GSPC' if "S&P" in cenario else 'BTC-USD'
             perda, impact = brain.executar_stress_test(st.session_state['portfolio'], df_precos, fator, ticker)
             st.metric("Impacto", f"R$ {perda:,.2f}"); st.dataframe(pd.DataFrame(impact).T)
+            st.markdown("#### 📜 Biblioteca de Cenários Históricos (multi-fator)")
+            ativos_port = [a for a in st.session_state['portfolio'] if a != 'Caixa']
+            df_fatores = db.buscar_dados_multiticker(list(dict.fromkeys(ativos_port + list(stress.FATORES.values()))), "2y")
+            if ativos_port and not df_fatores.empty:
+                betas_port = stress.matriz_betas(df_fatores, ativos_port)
+                pnl_cen, pct_cen = stress.estressar_carteiras({'Carteira': st.session_state['portfolio']}, df_fatores, betas=betas_port)
+                cols_cen = st.columns(len(stress.CENARIOS))
+                for col, (nome, dados_cen) in zip(cols_cen, stress.CENARIOS.items()):
+                    col.metric(f"{nome} ({dados_cen['periodo']})", f"R$ {pnl_cen.iloc[0][nome]:,.2f}", f"{pct_cen.iloc[0][nome]:.2f}%")
+                cen_foco = st.selectbox("Detalhar cenário", list(stress.CENARIOS))
+                st.dataframe(stress.detalhar_cenario(st.session_state['portfolio'], df_fatores, cen_foco, betas=betas_port).style.format({'Valor': "R$ {:,.2f}", 'Choque %': "{:.2f}%", 'P&L (R$)': "R$ {:,.2f}"}), use_container_width=True)
+                with st.expander("Matriz de Betas (ativos x fatores)"): st.dataframe(betas_port.style.format("{:.3f}"), use_container_width=True)
         with t13:
             if st.button("🔍 ESCANEAR PARES"):
                 df_pares = alchemist.escanear_pares(df_precos)
@@ -631,9 +858,17 @@ if 'dados_carregados' in st.session_state and not st.session_state['df_precos'].
             if val_ativos > 0:
                 res_hedge = brain.calcular_hedge_carteira(val_ativos, 1.0, 100, 0.2) # Simplificado
                 st.write(res_hedge)
+                st.markdown("#### 🧮 Grade Strike x Vencimento")
+                franquia = st.slider("Perda máxima aceita antes da proteção (%)", 0, 20, 10) / 100
+                melhor, grade = desk.melhor_hedge(val_ativos, 1.0, 100, 0.2, franquia_max=franquia)
+                if melhor:
+                    st.success(f"Mais barato: put {melhor['Moneyness']*100:.0f}% com {melhor['Dias']} dias — R$ {melhor['Custo (R$)']:,.2f} ({melhor['Custo Anual %']:.2f}% a.a.)")
+                st.plotly_chart(px.imshow(grade.pivot(index='Moneyness', columns='Dias', values='Custo Anual %'), text_auto=".2f", aspect="auto", color_continuous_scale='RdYlGn_r', labels=dict(color="Custo % a.a.")).update_layout(template="plotly_dark"), use_container_width=True)
         with t15:
             perf, _ = maestro.calcular_performance_setorial(df_precos)
             if not perf.empty: st.plotly_chart(px.bar(perf, x='Retorno', y='Setor', orientation='h').update_layout(template="plotly_dark"), use_container_width=True)
+            rrg_set = maestro.calcular_rrg_setorial(df_precos)
+            st.plotly_chart(compass.grafico_rrg(rrg_set, 10, titulo="Rotação Setorial (RRG)"), use_container_width=True)
         with t16:
             if st.button("🕸️ REDE"):
                 fig_n = network.gerar_grafo_correlacao(df_precos)
@@ -714,6 +949,28 @@ if 'dados_carregados' in st.session_state and not st.session_state['df_precos'].
         c3.metric("Faturamento Estimado", f"R$ {len(df_users)*99.90:,.2f}")
         st.markdown("---")
         
+        st.subheader("🛡️ Risco da Família (todas as carteiras)")
+        if st.button("📐 CALCULAR VaR DE TODOS"):
+            ports_familia = vault.carregar_todos_portfolios()
+            universo = sorted({a for p in ports_familia.values() for a in p if a != 'Caixa'})
+            df_universo = db.buscar_dados_multiticker(universo, "1y")
+            tab_familia = risk.avaliar_carteiras(ports_familia, df_universo, horizontes=(1, 10), seed=42) if not df_universo.empty else pd.DataFrame()
+            if not tab_familia.empty:
+                resumo_familia = tab_familia[tab_familia['Confiança'] == 0.99].pivot_table(index='Carteira', columns=['Método', 'Horizonte'], values='VaR %')
+                resumo_familia.index = resumo_familia.index.map(dict(zip(df_users['id'], df_users['username']))).fillna(resumo_familia.index.to_series().astype(str))
+                st.dataframe(resumo_familia.style.format("{:.2f}%").background_gradient(cmap='Reds'), use_container_width=True)
+            else: st.info("Nenhuma posição com preço disponível.")
+        if st.button("💣 STRESS TEST DE TODOS"):
+            ports_familia = vault.carregar_todos_portfolios()
+            universo = sorted({a for p in ports_familia.values() for a in p if a != 'Caixa'})
+            df_universo = db.buscar_dados_multiticker(list(dict.fromkeys(universo + list(stress.FATORES.values()))), "2y")
+            if universo and not df_universo.empty:
+                _, pct_familia = stress.estressar_carteiras(ports_familia, df_universo)
+                pct_familia.index = pct_familia.index.map(dict(zip(df_users['id'], df_users['username']))).fillna(pct_familia.index.to_series().astype(str))
+                st.dataframe(pct_familia.style.format("{:.2f}%").background_gradient(cmap='Reds_r'), use_container_width=True)
+            else: st.info("Nenhuma posição com preço disponível.")
+        st.markdown("---")
+        
         c_lista, c_acoes = st.columns([2, 1])
         with c_lista:
             st.subheader("Lista de Membros")
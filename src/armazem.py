@@ -0,0 +1,167 @@
+# Arquivo: E:\Consigliere\src\armazem.py
+# Módulo: The Warehouse (Local Columnar Price Store)
+# Status: V1.0 - Append-Only / Memory-Mapped
+
+import os
+import re
+import json
+import time
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+import fontes
+
+# Pasta raiz do armazém (uma subpasta por fonte de dados e por ativo, um arquivo binário por coluna)
+ARMAZEM_DIR = "armazem_precos"
+CAMPOS = ['Open', 'High', 'Low', 'Close', 'Volume']
+VALIDADE_SEG = 900 # 15 min: dentro disso o disco é considerado atualizado
+TRAVA_SEG = 60     # trava mais velha que isso é de um processo que morreu no meio da escrita
+
+# Layout em disco:
+#   armazem_precos/<fonte>/<TICKER>/Date.bin    -> int64 (nanosegundos desde epoch)
+#   armazem_precos/<fonte>/<TICKER>/<Campo>.bin -> float64 (um valor por pregão)
+#   armazem_precos/<fonte>/<TICKER>/meta.json   -> início mais antigo já baixado
+# As colunas são gravadas antes da Date, então a Date funciona como "commit":
+# uma escrita interrompida nunca expõe linhas incompletas.
+#   armazem_precos/<fonte>/<TICKER>/.trava      -> existe enquanto alguém grava o ativo
+# Sentinela e Streamlit gravam no mesmo armazém: gravar/substituir seguram a trava.
+
+def _pasta(ticker):
+    nome = re.sub(r'[^A-Za-z0-9._-]', '_', ticker.strip().upper())
+    return os.path.join(ARMAZEM_DIR, fontes.obter_fonte().nome, nome)
+
+def _arquivo(ticker, campo):
+    return os.path.join(_pasta(ticker), f"{campo}.bin")
+
+def _linhas(caminho):
+    if not os.path.exists(caminho): return 0
+    return os.path.getsize(caminho) // 8
+
+def _mapear(caminho, dtype, n):
+    if n == 0: return np.empty(0, dtype=dtype)
+    return np.memmap(caminho, dtype=dtype, mode='r', shape=(n,))
+
+def total_linhas(ticker):
+    """Número de pregões consolidados (limitado pela coluna Date)."""
+    return _linhas(_arquivo(ticker, 'Date'))
+
+def datas(ticker):
+    """Datas armazenadas (int64 ns) mapeadas direto do disco, sem cópia."""
+    return _mapear(_arquivo(ticker, 'Date'), np.int64, total_linhas(ticker))
+
+def ultima_data(ticker):
+    d = datas(ticker)
+    return pd.Timestamp(int(d[-1])) if len(d) else None
+
+def esta_fresco(ticker, validade=None):
+    """True se o ativo foi sincronizado há menos de `validade` segundos."""
+    if validade is None: validade = VALIDADE_SEG
+    caminho = _arquivo(ticker, 'Date')
+    if not os.path.exists(caminho): return False
+    return (time.time() - os.path.getmtime(caminho)) < validade
+
+def marcar_fresco(ticker):
+    caminho = _arquivo(ticker, 'Date')
+    if os.path.exists(caminho): os.utime(caminho, None)
+
+def ler_meta(ticker):
+    try:
+        with open(os.path.join(_pasta(ticker), 'meta.json'), 'r') as f: return json.load(f)
+    except: return {}
+
+def salvar_meta(ticker, **kwargs):
+    meta = ler_meta(ticker)
+    meta.update(kwargs)
+    os.makedirs(_pasta(ticker), exist_ok=True)
+    with open(os.path.join(_pasta(ticker), 'meta.json'), 'w') as f: json.dump(meta, f)
+
+@contextmanager
+def _trava(ticker, espera=30):
+    """Trava de escrita por ativo (arquivo criado com O_EXCL, funciona entre processos)."""
+    os.makedirs(_pasta(ticker), exist_ok=True)
+    caminho = os.path.join(_pasta(ticker), '.trava')
+    limite = time.time() + espera
+    while True:
+        try:
+            os.close(os.open(caminho, os.O_CREAT | os.O_EXCL | os.O_WRONLY)); break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(caminho) > TRAVA_SEG: os.remove(caminho); continue
+            except OSError: continue
+            if time.time() > limite: raise TimeoutError(f"Armazém de {ticker} travado por outro processo")
+            time.sleep(0.05)
+    try: yield
+    finally:
+        try: os.remove(caminho)
+        except OSError: pass
+
+def ler(ticker, inicio=None):
+    """
+    Lê o histórico OHLCV do ativo a partir de `inicio` (inclusive).
+    Os arquivos são mapeados em memória e só a janela pedida é copiada.
+    Se alguma coluna estiver mais curta (arquivo danificado), todas são cortadas
+    na mais curta: nunca devolve colunas faltando nem linhas desalinhadas.
+    """
+    n = min(_linhas(_arquivo(ticker, c)) for c in ['Date'] + CAMPOS)
+    if n == 0: return pd.DataFrame()
+    d = _mapear(_arquivo(ticker, 'Date'), np.int64, n)
+    i0 = 0
+    if inicio is not None:
+        i0 = int(np.searchsorted(d, pd.Timestamp(inicio).value, side='left'))
+    colunas = {campo: np.array(_mapear(_arquivo(ticker, campo), np.float64, n)[i0:n]) for campo in CAMPOS}
+    idx = pd.DatetimeIndex(np.array(d[i0:n]).astype('datetime64[ns]'), name='Date')
+    return pd.DataFrame(colunas, index=idx)
+
+def _truncar(ticker, n):
+    """Corta todas as colunas para `n` linhas (Date primeiro = desfaz o commit)."""
+    for campo in ['Date'] + CAMPOS:
+        caminho = _arquivo(ticker, campo)
+        if os.path.exists(caminho) and _linhas(caminho) > n:
+            os.truncate(caminho, n * 8)
+
+def normalizar(df):
+    df = df.copy()
+    idx = pd.DatetimeIndex(df.index)
+    if idx.tz is not None: idx = idx.tz_localize(None)
+    df.index = idx.astype('datetime64[ns]')
+    df = df[~df.index.duplicated(keep='last')].sort_index()
+    if 'Close' in df.columns: df = df.dropna(subset=['Close'])
+    return df
+
+def gravar(ticker, df):
+    """
+    Acrescenta barras ao final do arquivo do ativo.
+    Linhas já armazenadas com data >= primeira data nova são substituídas
+    (o último pregão pode ter sido gravado ainda em andamento).
+    """
+    with _trava(ticker): return _gravar(ticker, df)
+
+def _gravar(ticker, df):
+    if df is None or df.empty: return 0
+    df = normalizar(df)
+    if df.empty: return 0
+    os.makedirs(_pasta(ticker), exist_ok=True)
+
+    # Alinha colunas (caso uma escrita anterior tenha sido interrompida)
+    n = min(_linhas(_arquivo(ticker, c)) for c in ['Date'] + CAMPOS)
+    _truncar(ticker, n)
+
+    novas_datas = df.index.values.astype(np.int64)
+    d = datas(ticker)
+    corte = int(np.searchsorted(d, novas_datas[0], side='left')) if len(d) else 0
+    del d
+    _truncar(ticker, corte)
+
+    for campo in CAMPOS:
+        valores = df[campo].values if campo in df.columns else np.full(len(df), np.nan)
+        with open(_arquivo(ticker, campo), 'ab') as f:
+            f.write(np.ascontiguousarray(valores, dtype=np.float64).tobytes())
+    with open(_arquivo(ticker, 'Date'), 'ab') as f:
+        f.write(np.ascontiguousarray(novas_datas, dtype=np.int64).tobytes())
+    return len(df)
+
+def substituir(ticker, df):
+    """Reescreve todo o histórico do ativo (usado em downloads completos)."""
+    with _trava(ticker):
+        _truncar(ticker, 0)
+        return _gravar(ticker, df)
@@ -2,8 +2,38 @@
 # Módulo: The Time Machine (Multi-Strategy Engine)
 # Status: V1.0
 
+import itertools
+import os
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import indicadores as engine
+
+ESTRATEGIAS = ("RSI (Reversão)", "Golden Cross (Tendência)", "Bollinger (Volatilidade)", "Larry Williams 9.1")
+
+# Parâmetros que o backtest sempre usou (preparar_dados). Bollinger: média None = janela + 1
+# (bandas de 20 desvios em torno da SMA21, como sempre foi).
+PARAMETROS_PADRAO = {
+    "RSI (Reversão)": {'periodo': 14, 'compra': 30, 'venda': 70},
+    "Golden Cross (Tendência)": {'rapida': 50, 'lenta': 200},
+    "Bollinger (Volatilidade)": {'janela': 20, 'desvios': 2, 'media': None},
+    "Larry Williams 9.1": {'span': 9},
+}
+
+# Grades padrão da varredura (contêm sempre o ponto padrão)
+GRADES_PADRAO = {
+    "RSI (Reversão)": {'periodo': [7, 14, 21], 'compra': [20, 25, 30, 35], 'venda': [65, 70, 75, 80]},
+    "Golden Cross (Tendência)": {'rapida': [10, 20, 50, 100], 'lenta': [100, 150, 200]},
+    "Bollinger (Volatilidade)": {'janela': [10, 20, 30, 50], 'desvios': [1.5, 2, 2.5, 3]},
+    "Larry Williams 9.1": {'span': [5, 9, 13, 21, 34]},
+}
+
+# Backtest de carteira: mesmas regras do auto-trader (sentinela)
+LOTE_PADRAO = 5000.0  # R$ por trade (= sentinela.LOTE_PADRAO)
+STOP_ATR = 2.0        # stop = entrada - 2 ATR
+TAKE_ATR = 3.0        # take = entrada + 3 ATR
+DIMENSIONAMENTOS = ('lote', 'volatilidade', 'igual')
 
 def preparar_dados(df):
     """Calcula indicadores necessários para todas as estratégias."""
@@ -22,7 +52,7 @@ def preparar_dados(df):
     rs = gain / loss
     df['RSI'] = 100 - (100 / (1 + rs))
     
-    # Bollinger (20, 2)
+    # Bollinger (20, 2) - bandas centradas na SMA21, como sempre foi
     std = df['Close'].rolling(20).std()
     df['BB_Upper'] = df['SMA21'] + (2 * std)
     df['BB_Lower'] = df['SMA21'] - (2 * std)
@@ -32,84 +62,110 @@ def preparar_dados(df):
     
     return df.dropna()
 
-def rodar_backtest(df_raw, estrategia, capital=100000):
+def _regras(estrategia, serie, p):
     """
-    Simula a estratégia candle a candle.
+    Sinal de todas as barras de uma vez: 1=Compra, -1=Venda, 0=Nada (as 2 primeiras ficam 0,
+    pois as regras olham ontem e anteontem). Compra tem prioridade, como no if/elif antigo.
+    `serie(nome)` devolve o array já calculado ('close', 'rsi', 'rapida', 'lenta',
+    'inferior', 'superior', 'ema') para os parâmetros `p`.
     """
-    df = preparar_dados(df_raw)
-    if df.empty: return df, [], 0, 0
+    sinal = np.zeros(np.shape(serie('close')), dtype=np.int8) # 1 ativo (T) ou painel (T x N)
+    if len(sinal) < 3: return sinal
+    compra = venda = np.zeros(sinal[2:].shape, dtype=bool)
+    hoje, ontem, anteontem = slice(2, None), slice(1, -1), slice(0, -2)
     
-    caixa = capital
-    posicao = 0
-    trades = []
-    equity = []
-    
-    preco_compra = 0
-    
-    # Loop Temporal
-    for i in range(2, len(df)):
-        # Dados Atuais e Passados
-        hoje = df.iloc[i]
-        ontem = df.iloc[i-1]
-        anteontem = df.iloc[i-2]
-        
-        data = df.index[i]
-        preco = hoje['Close']
-        
-        sinal = 0 # 0=Nada, 1=Compra, -1=Venda
-        
-        # --- LÓGICA DAS ESTRATÉGIAS ---
-        
-        if estrategia == "RSI (Reversão)":
-            # Compra < 30, Vende > 70
-            if hoje['RSI'] < 30: sinal = 1
-            elif hoje['RSI'] > 70: sinal = -1
-            
-        elif estrategia == "Golden Cross (Tendência)":
-            # Compra: 50 cruza acima da 200
-            if ontem['SMA50'] < ontem['SMA200'] and hoje['SMA50'] > hoje['SMA200']: sinal = 1
-            # Venda: 50 cruza abaixo da 200
-            elif ontem['SMA50'] > ontem['SMA200'] and hoje['SMA50'] < hoje['SMA200']: sinal = -1
-            
-        elif estrategia == "Bollinger (Volatilidade)":
-            # Compra: Fechou abaixo da banda inferior (espera retorno à média)
-            if hoje['Close'] < hoje['BB_Lower']: sinal = 1
-            # Venda: Tocou na banda superior
-            elif hoje['Close'] > hoje['BB_Upper']: sinal = -1
-            
-        elif estrategia == "Larry Williams 9.1":
-            # Compra: EMA9 virou para cima
-            if anteontem['EMA9'] > ontem['EMA9'] and hoje['EMA9'] > ontem['EMA9']: sinal = 1
-            # Venda: EMA9 virou para baixo
-            elif anteontem['EMA9'] < ontem['EMA9'] and hoje['EMA9'] < ontem['EMA9']: sinal = -1
-
-        # --- EXECUÇÃO SIMULADA ---
-        
-        # Compra
-        if sinal == 1 and caixa > 0 and posicao == 0:
+    if estrategia == "RSI (Reversão)":
+        # Compra < 30, Vende > 70
+        rsi = serie('rsi')
+        compra = rsi[hoje] < p['compra']; venda = rsi[hoje] > p['venda']
+    
+    elif estrategia == "Golden Cross (Tendência)":
+        # 50 cruza acima da 200 (compra) / abaixo (venda)
+        r, l = serie('rapida'), serie('lenta')
+        compra = (r[ontem] < l[ontem]) & (r[hoje] > l[hoje])
+        venda = (r[ontem] > l[ontem]) & (r[hoje] < l[hoje])
+    
+    elif estrategia == "Bollinger (Volatilidade)":
+        # Fechou abaixo da banda inferior (compra) / acima da superior (venda)
+        c = serie('close')
+        compra = c[hoje] < serie('inferior')[hoje]; venda = c[hoje] > serie('superior')[hoje]
+    
+    elif estrategia == "Larry Williams 9.1":
+        # EMA9 virou para cima (compra) / para baixo (venda)
+        e = serie('ema')
+        compra = (e[anteontem] > e[ontem]) & (e[hoje] > e[ontem])
+        venda = (e[anteontem] < e[ontem]) & (e[hoje] < e[ontem])
+    
+    sinal[2:] = np.where(compra, 1, np.where(venda, -1, 0))
+    return sinal
+
+def _gerar_sinais(df, estrategia):
+    """Sinais com os parâmetros padrão, lendo as colunas de preparar_dados()."""
+    colunas = {'close': 'Close', 'rsi': 'RSI', 'rapida': 'SMA50', 'lenta': 'SMA200',
+               'inferior': 'BB_Lower', 'superior': 'BB_Upper', 'ema': 'EMA9'}
+    return _regras(estrategia, lambda nome: df[colunas[nome]].to_numpy(), PARAMETROS_PADRAO.get(estrategia, {}))
+
+def _simular(precos, sinal, capital):
+    """
+    Máquina de estados comprado/zerado (long-only, lote inteiro com todo o caixa).
+    Só as barras com sinal são visitadas: zerado, procura a próxima compra que caiba no
+    caixa; comprado, a próxima venda. Retorna (equity por barra, lista de
+    (barra, tipo, qtd, resultado)). Mesma aritmética do loop barra a barra.
+    """
+    compras, vendas = np.flatnonzero(sinal == 1), np.flatnonzero(sinal == -1)
+    caixa, posicao, preco_compra = capital, 0, 0
+    barras, caixas, posicoes, trades = [], [], [], []
+    t = 0
+    while True:
+        if posicao == 0:
+            if caixa <= 0: break
+            k = np.searchsorted(compras, t)
+            if k >= len(compras): break
+            if caixa // precos[compras[k]] < 1: # sem caixa p/ 1 unidade: pula para a 1ª compra que caiba
+                cabe = np.flatnonzero(caixa // precos[compras[k:]] >= 1)
+                if len(cabe) == 0: break
+                k += cabe[0]
+            i = compras[k]
+            preco = precos[i]
             qtd = int(caixa // preco)
-            if qtd > 0:
-                custo = qtd * preco
-                caixa -= custo
-                posicao = qtd
-                preco_compra = preco
-                trades.append({'Data': data, 'Tipo': 'COMPRA', 'Preço': preco, 'Qtd': qtd, 'Resultado': 0})
-        
-        # Venda
-        elif sinal == -1 and posicao > 0:
+            caixa -= qtd * preco
+            posicao = qtd
+            preco_compra = preco
+            trades.append((i, 'COMPRA', qtd, 0))
+        else:
+            k = np.searchsorted(vendas, t)
+            if k >= len(vendas): break
+            i = vendas[k]
+            preco = precos[i]
             faturamento = posicao * preco
             lucro = faturamento - (posicao * preco_compra)
             caixa += faturamento
-            trades.append({'Data': data, 'Tipo': 'VENDA', 'Preço': preco, 'Qtd': posicao, 'Resultado': lucro})
+            trades.append((i, 'VENDA', posicao, lucro))
             posicao = 0
-            
-        # Marcação a Mercado (Equity Curve)
-        valor_total = caixa + (posicao * preco)
-        equity.append(valor_total)
-        
-    # Ajuste de tamanho do array equity para bater com o DF (removeu 2 primeiros)
+        barras.append(i); caixas.append(caixa); posicoes.append(posicao)
+        t = i + 1
+    # Caixa e posição de cada barra = os do último trade até ela (marcação a mercado)
+    k = np.searchsorted(np.asarray(barras, dtype=int), np.arange(len(precos)), side='right') - 1
+    caixa_b = np.asarray([capital] + caixas, dtype=float)[k + 1]
+    posicao_b = np.asarray([0] + posicoes)[k + 1]
+    return caixa_b + posicao_b * precos, trades
+
+def rodar_backtest(df_raw, estrategia, capital=100000):
+    """
+    Simula a estratégia: sinais vetorizados (_gerar_sinais) + máquina de estados só nas
+    barras com sinal (_simular).
+    """
+    df = preparar_dados(df_raw)
+    if len(df) < 3: return df, [], 0, 0
+    
+    sinal = _gerar_sinais(df, estrategia)
+    precos = df['Close'].to_numpy()
+    equity, eventos = _simular(precos, sinal, capital)
+    trades = [{'Data': df.index[i], 'Tipo': tipo, 'Preço': precos[i], 'Qtd': qtd, 'Resultado': lucro} for i, tipo, qtd, lucro in eventos]
+    
+    # As 2 primeiras barras só servem de "ontem/anteontem"
     df = df.iloc[2:].copy()
-    df['Strategy_Equity'] = equity
+    df['Strategy_Equity'] = equity[2:]
     
     # Benchmark Buy & Hold
     qtd_bh = int(capital // df['Close'].iloc[0])
@@ -119,4 +175,275 @@ def rodar_backtest(df_raw, estrategia, capital=100000):
     retorno_final = ((equity[-1] - capital) / capital) * 100
     retorno_bh = ((df['BuyHold_Equity'].iloc[-1] - capital) / capital) * 100
     
-    return df, trades, retorno_final, retorno_bh
\ No newline at end of file
+    return df, trades, retorno_final, retorno_bh
+
+# --- VARREDURA DE PARÂMETROS ---
+_DADOS = {} # arrays compartilhados com os processos (só leitura; carregados uma vez por processo)
+
+def _carregar_dados(dados):
+    global _DADOS
+    _DADOS = dados
+
+def _executar(funcao, tarefas, dados, processos=None):
+    """Roda `funcao` em cada tarefa num pool de processos (dados entregues no initializer); sem pool, em série."""
+    processos = processos or min(len(tarefas), os.cpu_count() or 1)
+    if processos > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=processos, initializer=_carregar_dados, initargs=(dados,)) as pool:
+                return list(pool.map(funcao, tarefas))
+        except (OSError, NotImplementedError, BrokenProcessPool): pass # só falha do pool cai para a série; erro de tarefa sobe
+    _carregar_dados(dados)
+    return [funcao(t) for t in tarefas]
+
+def _combinacoes(estrategia, grade):
+    """Produto cartesiano da grade sobre os parâmetros padrão (Golden Cross exige rápida < lenta)."""
+    nomes = list(grade)
+    for valores in itertools.product(*(grade[k] for k in nomes)):
+        p = {**PARAMETROS_PADRAO[estrategia], **dict(zip(nomes, valores))}
+        if estrategia == "Golden Cross (Tendência)" and p['rapida'] >= p['lenta']: continue
+        yield p
+
+def _aquecimento(estrategia, p):
+    """Barras até todos os indicadores da combinação existirem."""
+    if estrategia == "RSI (Reversão)": return p['periodo']
+    if estrategia == "Golden Cross (Tendência)": return max(p['rapida'], p['lenta']) - 1
+    if estrategia == "Bollinger (Volatilidade)": return max(p['janela'], p['media'] or p['janela'] + 1) - 1
+    return 0
+
+def _indicador(close, tipo, j):
+    """Indicador de uma série ou painel (T x N) pelo motor vetorizado (as mesmas janelas do pandas)."""
+    return {'sma': engine.sma, 'ema': engine.ema, 'rsi': engine.rsi, 'std': engine.desvio_movel}[tipo](close, j)
+
+def _series_combinacao(close, estrategia, p, memo, inicio):
+    """Arrays da combinação a partir de `inicio`; indicadores ficam em `memo` por (tipo, janela)."""
+    def ind(tipo, j):
+        if (tipo, j) not in memo: memo[(tipo, j)] = _indicador(close, tipo, j)
+        return memo[(tipo, j)]
+    def serie(nome):
+        if nome == 'close': x = close
+        elif nome == 'rsi': x = ind('rsi', p['periodo'])
+        elif nome == 'rapida': x = ind('sma', p['rapida'])
+        elif nome == 'lenta': x = ind('sma', p['lenta'])
+        elif nome == 'ema': x = ind('ema', p['span'])
+        else:
+            media = ind('sma', p['media'] or p['janela'] + 1)
+            desvio = ind('std', p['janela'])
+            x = media - (p['desvios'] * desvio) if nome == 'inferior' else media + (p['desvios'] * desvio)
+        return x[inicio:]
+    return serie
+
+def _metricas(equity, n_trades, capital):
+    rets = np.diff(equity) / equity[:-1] if len(equity) > 1 else np.zeros(0)
+    dp = rets.std(ddof=1) if len(rets) > 1 else 0.0
+    pico = np.maximum.accumulate(equity)
+    return {'Retorno %': (equity[-1] / capital - 1) * 100 if len(equity) else 0.0,
+            'Sharpe': rets.mean() / dp * np.sqrt(252) if dp > 0 else 0.0,
+            'Max DD %': ((equity / pico) - 1).min() * 100 if len(equity) else 0.0,
+            'Trades': n_trades}
+
+def _varrer_ativo(tarefa):
+    """Todas as combinações num ativo (roda dentro do processo; preços vêm de _DADOS)."""
+    ticker, estrategia, combinacoes, inicio, capital = tarefa
+    close = _DADOS[ticker]
+    memo, linhas = {}, []
+    if len(close) - inicio < 3: return linhas
+    for p in combinacoes:
+        sinal = _regras(estrategia, _series_combinacao(close, estrategia, p, memo, inicio), p)
+        equity, eventos = _simular(close[inicio:], sinal, capital)
+        linhas.append({'Ativo': ticker, **p, **_metricas(equity[2:], len(eventos), capital)})
+    return linhas
+
+def varrer_parametros(precos, estrategia, grade=None, capital=100000, processos=None):
+    """
+    Grid search de uma estratégia em vários ativos. `precos`: DataFrame de fechamentos
+    (colunas = tickers) ou {ticker: DataFrame com 'Close'}. Cada ativo vai para um processo
+    do pool com todas as combinações (indicadores reaproveitados entre combinações com a
+    mesma janela); os preços são entregues uma vez por processo, só para leitura.
+    Todas as combinações começam na mesma barra (maior aquecimento da grade, no mínimo o da
+    SMA200 do backtest simples), então o ponto padrão bate com rodar_backtest.
+    Retorna DataFrame: Ativo, parâmetros..., Retorno %, Sharpe, Max DD %, Trades.
+    """
+    grade = grade or GRADES_PADRAO[estrategia]
+    combinacoes = list(_combinacoes(estrategia, grade))
+    if isinstance(precos, pd.DataFrame): precos = {t: precos[t] for t in precos.columns}
+    arrays = {}
+    for t, x in precos.items():
+        if isinstance(x, pd.DataFrame): x = x['Close']
+        arr = x.dropna().to_numpy(dtype=float)
+        if len(arr): arrays[t] = arr
+    if not combinacoes or not arrays: return pd.DataFrame()
+    inicio = max([199] + [_aquecimento(estrategia, p) for p in combinacoes])
+    tarefas = [(t, estrategia, combinacoes, inicio, capital) for t in arrays]
+    partes = _executar(_varrer_ativo, tarefas, arrays, processos)
+    return pd.DataFrame([linha for parte in partes for linha in parte])
+
+def mapa_calor(resultados, linhas, colunas, metrica='Sharpe'):
+    """Pivot (média entre ativos) de uma métrica sobre dois parâmetros, pronto para px.imshow."""
+    if resultados is None or resultados.empty: return pd.DataFrame()
+    return resultados.pivot_table(index=linhas, columns=colunas, values=metrica, aggfunc='mean')
+
+# --- WALK-FORWARD ---
+def _sinais_grade(close, estrategia, combinacoes):
+    """
+    Sinais de cada combinação no histórico inteiro (combinações x barras). Os indicadores só
+    olham para trás, então o sinal de uma barra é o mesmo em qualquer janela que a contenha:
+    calcula-se uma vez e todas as janelas (sobrepostas ou não) só recortam.
+    """
+    memo = {}
+    return np.vstack([_regras(estrategia, _series_combinacao(close, estrategia, p, memo, 0), p) for p in combinacoes])
+
+def _otimizar_janela(tarefa):
+    """Treino de uma janela: índice da combinação com a maior métrica e o valor dela."""
+    k, a, b, metrica, capital = tarefa
+    close, sinais = _DADOS['close'], _DADOS['sinais']
+    notas = []
+    for sinal in sinais:
+        equity, eventos = _simular(close[a:b], sinal[a:b], capital)
+        notas.append(_metricas(equity, len(eventos), capital)[metrica])
+    notas = np.asarray(notas, dtype=float)
+    melhor = int(np.argmax(np.where(np.isfinite(notas), notas, -np.inf)))
+    return k, melhor, notas[melhor]
+
+def walk_forward(df_raw, estrategia, grade=None, treino=504, teste=126, metrica='Sharpe', capital=100000, processos=None):
+    """
+    Otimização walk-forward: janelas móveis de `treino` barras escolhem os parâmetros (maior
+    `metrica` da grade) e as `teste` barras seguintes são operadas com eles. As janelas de
+    teste são costuradas em uma curva fora da amostra: cada uma começa zerada com o patrimônio
+    final da anterior (posição aberta é marcada a mercado no fim da janela).
+    Sinais vêm de _sinais_grade (calculados uma vez) e as janelas rodam em paralelo.
+    Retorna {'equity': DataFrame (Strategy_Equity, BuyHold_Equity), 'janelas': DataFrame,
+    'trades': lista, 'resumo': métricas da estratégia e do buy & hold no período de teste}.
+    """
+    vazio = {'equity': pd.DataFrame(), 'janelas': pd.DataFrame(), 'trades': [], 'resumo': {}}
+    close = (df_raw['Close'] if isinstance(df_raw, pd.DataFrame) else df_raw).dropna()
+    grade = grade or GRADES_PADRAO[estrategia]
+    combinacoes = list(_combinacoes(estrategia, grade))
+    if not combinacoes: return vazio
+    inicio = max(_aquecimento(estrategia, p) for p in combinacoes)
+    janelas = [(a, a + treino, min(a + treino + teste, len(close)))
+               for a in range(inicio, len(close) - treino - 2, teste)]
+    janelas = [j for j in janelas if j[2] - j[1] >= 3]
+    if not janelas: return vazio
+    x = close.to_numpy(dtype=float)
+    dados = {'close': x, 'sinais': _sinais_grade(x, estrategia, combinacoes)}
+    tarefas = [(k, a, b, metrica, capital) for k, (a, b, _) in enumerate(janelas)]
+    escolhas = sorted(_executar(_otimizar_janela, tarefas, dados, processos), key=lambda r: r[0])
+    
+    # Teste em sequência: cada janela começa zerada com o patrimônio final da anterior
+    patrimonio, curvas, trades, linhas = capital, [], [], []
+    for (k, melhor, nota), (a, b, c) in zip(escolhas, janelas):
+        equity, eventos = _simular(x[b:c], dados['sinais'][melhor][b:c], patrimonio)
+        curvas.append(equity)
+        for i, tipo, qtd, lucro in eventos:
+            trades.append({'Data': close.index[b + i], 'Tipo': tipo, 'Preço': x[b + i], 'Qtd': qtd, 'Resultado': lucro, 'Janela': k + 1})
+        linhas.append({'Janela': k + 1, 'Treino': f"{close.index[a]:%d/%m/%Y} - {close.index[b - 1]:%d/%m/%Y}",
+                       'Teste': f"{close.index[b]:%d/%m/%Y} - {close.index[c - 1]:%d/%m/%Y}",
+                       **{n: v for n, v in combinacoes[melhor].items() if n in grade},
+                       f'{metrica} Treino': nota, 'Retorno Teste %': (equity[-1] / patrimonio - 1) * 100, 'Trades Teste': len(eventos)})
+        patrimonio = float(equity[-1])
+    
+    b0, c1 = janelas[0][1], janelas[-1][2]
+    curva = np.concatenate(curvas)
+    qtd_bh = int(capital // x[b0])
+    bh = qtd_bh * x[b0:c1] + (capital - qtd_bh * x[b0])
+    saida = pd.DataFrame({'Strategy_Equity': curva, 'BuyHold_Equity': bh}, index=close.index[b0:c1])
+    resumo = {'Estratégia': _metricas(curva, len(trades), capital), 'Buy & Hold': _metricas(bh, 1, capital)}
+    return {'equity': saida, 'janelas': pd.DataFrame(linhas), 'trades': trades, 'resumo': resumo}
+
+# --- CARTEIRA (MULTI-ATIVO, CAIXA ÚNICO) ---
+def _sinais_painel(C, estrategia, params=None):
+    """Sinais da estratégia em todas as colunas (T x N), cada ativo no próprio histórico (sem os NaN)."""
+    p = {**PARAMETROS_PADRAO[estrategia], **(params or {})}
+    P, ordem, n = engine.compactar(C)
+    sinal = _regras(estrategia, _series_combinacao(P, estrategia, p, {}, 0), p)
+    return np.nan_to_num(engine.expandir(sinal.astype(float), ordem, n)).astype(np.int8)
+
+def rodar_backtest_carteira(painel, estrategia, capital=100000, dimensionamento='lote', lote=LOTE_PADRAO,
+                            max_posicoes=10, stop_atr=STOP_ATR, take_atr=TAKE_ATR, risco=0.01, params=None):
+    """
+    Backtest da estratégia na watchlist inteira com um caixa só.
+    `painel`: PainelOHLCV (usa High/Low para o ATR) ou DataFrame de fechamentos (sem
+    High/Low o ATR é fechamento a fechamento; 5% do preço só antes de haver ATR).
+    A cada barra, para todos os ativos de uma vez (execução no fechamento):
+      1. saídas: stop (preço <= entrada - stop_atr·ATR), take (>= entrada + take_atr·ATR) ou sinal de venda;
+      2. entradas: sinais de compra sem posição, na ordem da watchlist, até `max_posicoes`
+         e enquanto houver caixa (quem não cabe é pulado, o próximo ainda pode entrar). Tamanho por `dimensionamento`:
+         'lote' = R$ `lote` fixo (exige caixa >= lote), 'igual' = patrimônio / max_posicoes,
+         'volatilidade' = arrisca `risco` do patrimônio até o stop (qtd = risco·PL / (stop_atr·ATR));
+      3. marcação a mercado (último preço de cada ativo).
+    Retorna {'equity': DataFrame (Strategy_Equity, Caixa, Posições, BuyHold_Equity),
+    'trades': DataFrame, 'resumo': métricas da carteira e do buy & hold igual-ponderado}.
+    """
+    vazio = {'equity': pd.DataFrame(), 'trades': pd.DataFrame(), 'resumo': {}}
+    if isinstance(painel, pd.DataFrame):
+        fech = painel; H = L = None
+    else:
+        if painel.vazio: return vazio
+        fech = painel.fechamentos(); H, L = painel.matriz('High'), painel.matriz('Low')
+    if fech.empty or len(fech) < 3: return vazio
+    tickers, datas = list(fech.columns), fech.index
+    C = fech.to_numpy(dtype=float)
+    sinais = _sinais_painel(C, estrategia, params)
+    # Sem High/Low: ATR fechamento a fechamento (|C - C anterior|), não um 5% fixo
+    atr = engine.atr(H, L, C, 14) if H is not None else engine.atr(C, C, C, 14)
+    atr = np.where(atr > 0, atr, C * 0.05)
+    marca = fech.ffill().to_numpy(dtype=float) # preço para marcação a mercado
+    T, N = C.shape
+    
+    caixa = float(capital)
+    qtd = np.zeros(N); entrada = np.zeros(N); stop = np.zeros(N); take = np.zeros(N)
+    equity = np.empty(T); caixas = np.empty(T); n_pos = np.empty(T, dtype=int)
+    trades = []
+    for t in range(T):
+        c, valido, s = C[t], ~np.isnan(C[t]), sinais[t]
+        comprado = qtd > 0
+        # 1. Saídas
+        pode = comprado & valido
+        bateu_stop = pode & (c <= stop); bateu_take = pode & (c >= take) & ~bateu_stop
+        venda = pode & (s == -1) & ~bateu_stop & ~bateu_take
+        saida = bateu_stop | bateu_take | venda
+        if saida.any():
+            idx = np.flatnonzero(saida)
+            caixa += float((qtd[idx] * c[idx]).sum())
+            for i in idx:
+                motivo = 'STOP' if bateu_stop[i] else ('TAKE' if bateu_take[i] else 'SINAL')
+                trades.append({'Data': datas[t], 'Ativo': tickers[i], 'Tipo': 'VENDA', 'Motivo': motivo, 'Preço': c[i],
+                               'Qtd': int(qtd[i]), 'Resultado': qtd[i] * (c[i] - entrada[i])})
+            qtd[idx] = 0
+        # 2. Entradas
+        vagas = max_posicoes - int((qtd > 0).sum())
+        candidatos = np.flatnonzero((qtd == 0) & valido & (s == 1))
+        if len(candidatos) and caixa > 0 and vagas > 0:
+            pl = caixa + float(np.nansum(qtd * marca[t]))
+            pc = c[candidatos]
+            if dimensionamento == 'igual': valor = np.full(len(pc), pl / max_posicoes)
+            elif dimensionamento == 'volatilidade': valor = risco * pl / (stop_atr * atr[t, candidatos]) * pc
+            else: valor = np.full(len(pc), lote) if caixa >= lote else np.zeros(len(pc))
+            q = np.floor(valor / pc)
+            custo = q * pc
+            # Caixa acaba: a fila entra em ordem e cada um só paga se couber no que sobrou
+            # (um candidato recusado não consome caixa dos seguintes)
+            ok = np.zeros(len(pc), dtype=bool); sobra = caixa
+            for k in np.flatnonzero(q > 0):
+                if custo[k] > sobra or (dimensionamento == 'lote' and sobra < lote): continue
+                ok[k] = True; sobra -= custo[k]; vagas -= 1
+                if vagas == 0: break
+            for i, qi, pi in zip(candidatos[ok], q[ok], pc[ok]):
+                trades.append({'Data': datas[t], 'Ativo': tickers[i], 'Tipo': 'COMPRA', 'Motivo': 'SINAL', 'Preço': pi,
+                               'Qtd': int(qi), 'Resultado': 0})
+            sel = candidatos[ok]
+            caixa -= float(custo[ok].sum())
+            qtd[sel] = q[ok]; entrada[sel] = pc[ok]
+            stop[sel] = pc[ok] - stop_atr * atr[t, sel]; take[sel] = pc[ok] + take_atr * atr[t, sel]
+        # 3. Marcação a mercado
+        caixas[t] = caixa
+        equity[t] = caixa + float(np.nansum(qtd * marca[t]))
+        n_pos[t] = int((qtd > 0).sum())
+    
+    r_mercado = fech.pct_change().mean(axis=1).fillna(0).to_numpy()
+    bh = capital * np.cumprod(1 + r_mercado)
+    saida = pd.DataFrame({'Strategy_Equity': equity, 'Caixa': caixas, 'Posições': n_pos, 'BuyHold_Equity': bh}, index=datas)
+    df_trades = pd.DataFrame(trades, columns=['Data', 'Ativo', 'Tipo', 'Motivo', 'Preço', 'Qtd', 'Resultado'])
+    resumo = {'Estratégia': {**_metricas(equity, len(trades), capital), 'Exposição Média %': float(np.mean(1 - caixas / equity)) * 100},
+              'Buy & Hold': _metricas(bh, N, capital)}
+    return {'equity': saida, 'trades': df_trades, 'resumo': resumo}
@@ -68,7 +68,7 @@ def processar_pergunta(texto, lista_ativos):
             # Pergunta sobre TENDÊNCIA / GRÁFICO / ANÁLISE TÉCNICA
             elif any(x in texto_lower for x in ['grafico', 'tendencia', 'tecnica', 'subir', 'cair', 'analise', 'como esta', 'como está']):
                 # Usa o gerador de narrativa
-                sups, ress = brain.calcular_suporte_resistencia_auto(df)
+                sups, ress = brain.calcular_suporte_resistencia_auto(df, ticker=ticker)
                 sup = sups[-1] if len(sups) > 0 else 0
                 res = ress[-1] if len(ress) > 0 else 0
                 narrativa = story.gerar_parecer_tecnico(ticker, df, rsi, sup, res)
@@ -4,19 +4,22 @@
 
 import pandas as pd
 import numpy as np
+import painel as ledger
+import indicadores as engine
+import padroes as candles
 
 def calcular_indicadores_base(df):
     """Calcula indicadores necessários para os setups."""
     df = df.copy()
-    df['MME9'] = df['Close'].ewm(span=9, adjust=False).mean()
-    df['SMA20'] = df['Close'].rolling(window=20).mean()
-    df['SMA50'] = df['Close'].rolling(window=50).mean()
-    df['SMA200'] = df['Close'].rolling(window=200).mean()
+    ind = engine.calcular_indicadores(df['Close'], smas=(20, 50, 200), emas=(9,))
+    df['MME9'] = ind['EMA9']
+    df['SMA20'] = ind['SMA20']
+    df['SMA50'] = ind['SMA50']
+    df['SMA200'] = ind['SMA200']
     
     # Bollinger
-    std = df['Close'].rolling(20).std()
-    df['BB_Upper'] = df['SMA20'] + (2 * std)
-    df['BB_Lower'] = df['SMA20'] - (2 * std)
+    df['BB_Upper'] = ind['BB_Upper']
+    df['BB_Lower'] = ind['BB_Lower']
     
     return df
 
@@ -93,50 +96,70 @@ def setup_inside_bar(df):
         
     return None
 
+def _ultimas(matriz, ordem, k=3):
+    """Últimas `k` linhas válidas de cada coluna (ordem = compactação pelo fechamento)."""
+    return np.take_along_axis(np.asarray(matriz, dtype=float), ordem, axis=0)[-k:]
+
 def escanear_estrategias(df_precos):
     """
     Roda todos os setups para todos os ativos.
+    Com um PainelOHLCV, todos os setups (inclusive Inside Bar e Bollinger IFFD) são avaliados;
+    com um DataFrame só de fechamentos, apenas os setups de médias.
+    Os indicadores saem do indicadores em uma única passada sobre o painel inteiro e as
+    regras (as mesmas das funções setup_* acima) rodam vetorizadas nas 3 últimas barras.
     """
-    resultados = []
+    tem_ohlc = isinstance(df_precos, ledger.PainelOHLCV)
+    if tem_ohlc:
+        if df_precos.vazio: return pd.DataFrame()
+        tickers = df_precos.tickers
+        close = df_precos.matriz('Close')
+    else:
+        if df_precos.empty: return pd.DataFrame()
+        tickers = list(df_precos.columns)
+        close = df_precos.to_numpy(dtype=float)
     
-    for ticker in df_precos.columns:
-        # Pega dados do ativo e remove NaNs
-        df_ativo = df_precos[ticker].dropna()
-        if df_ativo.empty: continue
-        
-        # Precisamos de OHLC (Open, High, Low, Close)
-        # Como o df_precos original do app pode ter vindo só com 'Close' se for download em lote simples,
-        # precisamos garantir que temos dados completos.
-        # O app atual baixa 'Adj Close' ou 'Close'. 
-        # Para setups complexos (Inside Bar), precisamos de High/Low.
-        # SE o df_precos for apenas de fechamento, rodamos apenas setups de médias.
-        
-        # Para o MVP, assumiremos que vamos calcular apenas setups baseados em Fechamento (Médias)
-        # ou faremos o download detalhado sob demanda na função principal do app.
-        
-        # Vamos converter a série de preços em um DataFrame genérico para calcular médias
-        df_calc = pd.DataFrame({'Close': df_ativo})
-        df_calc = calcular_indicadores_base(df_calc)
-        
-        setups_ativos = []
-        
-        # 1. Larry Williams 9.1
-        res_91 = setup_9_1_larry_williams(df_calc)
-        if res_91: setups_ativos.append(f"Larry W. {res_91}")
-        
-        # 2. Cruzamentos
-        res_cross = setup_golden_death_cross(df_calc)
-        if res_cross: setups_ativos.append(res_cross)
-        
-        # Se tivermos High/Low/Open no futuro, ativamos os outros.
-        # Por enquanto, focamos em tendência.
+    ind = engine.calcular_indicadores(close, smas=(20, 50, 200), emas=(9,))
+    _, ordem, n = engine.compactar(close)
+    c = _ultimas(close, ordem); e9 = _ultimas(ind['EMA9'], ordem)
+    s50 = _ultimas(ind['SMA50'], ordem); s200 = _ultimas(ind['SMA200'], ordem)
+    
+    # Vetor de rótulos por setup ('' = nada detectado)
+    vazio = np.full(len(tickers), '', dtype=object)
+    
+    # 1. Larry Williams 9.1
+    larry = np.where((n >= 3) & (e9[0] > e9[1]) & (e9[2] > e9[1]), "Larry W. COMPRA (9.1 Armado)",
+            np.where((n >= 3) & (e9[0] < e9[1]) & (e9[2] < e9[1]), "Larry W. VENDA (9.1 Armado)", vazio))
+    
+    # 2. Cruzamentos
+    cross = np.where((n >= 201) & (s50[1] < s200[1]) & (s50[2] > s200[2]), "GOLDEN CROSS (Alta Longa)",
+            np.where((n >= 201) & (s50[1] > s200[1]) & (s50[2] < s200[2]), "DEATH CROSS (Baixa Longa)", vazio))
+    colunas = [larry, cross]
+    
+    # 3. Setups que dependem de High/Low (só com painel OHLCV)
+    if tem_ohlc:
+        up = _ultimas(ind['BB_Upper'], ordem); lo = _ultimas(ind['BB_Lower'], ordem)
+        iffd = np.where((n >= 3) & (c[1] > up[1]) & (c[2] < up[2]), "Bollinger VENDA (IFFD - Reversão)",
+               np.where((n >= 3) & (c[1] < lo[1]) & (c[2] > lo[2]), "Bollinger COMPRA (IFFD - Reversão)", vazio))
+        h = _ultimas(df_precos.matriz('High'), ordem); l = _ultimas(df_precos.matriz('Low'), ordem)
+        ib = np.where((n >= 2) & (h[2] < h[1]) & (l[2] > l[1]), "INSIDE BAR (Aguardar Rompimento)", vazio)
+        colunas += [iffd, ib]
         
+        # 4. Padrões de candle no último pregão (Inside Bar já é setup próprio)
+        ev = candles.eventos_padroes(df_precos, ultimas=1)
+        ev = ev[ev['Padrão'] != 'Inside Bar']
+        por_ativo = ev.groupby('Ativo')['Padrão'].agg(lambda p: ", ".join(f"Candle {x}" for x in p))
+        colunas.append(np.array([por_ativo.get(t, '') for t in tickers], dtype=object))
+    
+    resultados = []
+    for i, ticker in enumerate(tickers):
+        if n[i] == 0: continue
+        setups_ativos = [col[i] for col in colunas if col[i]]
         if setups_ativos:
             resultados.append({
                 'Ativo': ticker,
-                'Preço': df_ativo.iloc[-1],
+                'Preço': c[2, i],
                 'Setups Detectados': ", ".join(setups_ativos),
-                'Tendência MME9': "Alta" if df_calc['MME9'].iloc[-1] > df_calc['MME9'].iloc[-2] else "Baixa"
+                'Tendência MME9': "Alta" if e9[2, i] > e9[1, i] else "Baixa"
             })
             
-    return pd.DataFrame(resultados)
\ No newline at end of file
+    return pd.DataFrame(resultados)
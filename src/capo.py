@@ -8,6 +8,8 @@ import cerebro as brain
 import valuation as val
 import oraculo as oracle
 import macro as governor # --- MELHORIA: Importando o Macro
+import painel as ledger
+import indicadores as engine
 
 def calcular_score_tecnico(df):
     """Avalia a tendência e momento (0-100)."""
@@ -36,9 +38,38 @@ def calcular_score_tecnico(df):
     
     return max(0, min(100, score))
 
+def calcular_score_tecnico_estado(estado):
+    """calcular_score_tecnico a partir de um fluxo.EstadoAtivo (O(1), sem reler o histórico)."""
+    if not estado.barras: return 50
+    score = 50
+    ind = estado.indicadores()
+    preco = ind['Close']
+    
+    if estado.barras > 50:
+        sma50 = ind['SMA50']
+        sma200 = ind['SMA200'] if estado.barras > 200 else sma50
+        if preco > sma50: score += 10
+        if sma50 > sma200: score += 10 
+        elif sma50 < sma200: score -= 10
+    
+    rsi = ind['RSI'] if estado.barras >= 14 else 50
+    if rsi < 30: score += 15 
+    elif rsi < 45: score += 5
+    elif rsi > 70: score -= 15 
+    
+    if preco < ind['VWAP_Lower']: score += 10
+    elif preco > ind['VWAP_Upper']: score -= 10
+    
+    return max(0, min(100, score))
+
+def _usa_fundamentos(ticker):
+    return not (".SA" not in ticker and "USD" in ticker)
+
 def calcular_score_fundamentalista(ticker, preco_atual):
-    if ".SA" not in ticker and "USD" in ticker: return 50 
-    dados = val.obter_dados_fundamentos(ticker)
+    if not _usa_fundamentos(ticker): return 50 
+    return _pontuar_fundamentos(val.obter_dados_fundamentos(ticker), preco_atual)
+
+def _pontuar_fundamentos(dados, preco_atual):
     if not dados: return 50
     score = 50
     vi = val.calcular_graham(dados['lpa'], dados['vpa'])
@@ -55,9 +86,11 @@ def calcular_score_ia(ticker, df):
     prob, _, _ = oracle.prever_tendencia_ml(ticker, df)
     return prob 
 
-def gerar_conselho_final(ticker, df_precos):
+def gerar_conselho_final(ticker, df_precos, contexto_macro=None):
     """
     Calcula a média ponderada e aplica PENALIDADE MACRO.
+    `contexto_macro` (macro.montar_contexto_macro) deve ser calculado uma vez
+    por ranking/ciclo; se omitido, usa o contexto cacheado do Governor.
     """
     if df_precos.empty: return {'Ticker': ticker, 'Score': 0, 'Veredito': "Sem Dados"}
     
@@ -66,33 +99,28 @@ def gerar_conselho_final(ticker, df_precos):
     s_tec = calcular_score_tecnico(df_precos)
     s_fund = calcular_score_fundamentalista(ticker, preco_atual)
     s_ia = calcular_score_ia(ticker, df_precos)
-    
+    return combinar_scores(ticker, preco_atual, s_tec, s_fund, s_ia, contexto_macro)
+
+def combinar_scores(ticker, preco_atual, s_tec, s_fund, s_ia, contexto_macro=None):
+    """Ponderação técnico/fundamentos/IA + penalidade macro -> conselho (usado também pelo replay)."""
     # Ponderação Base
     if ".SA" not in ticker: 
         score_final = (s_tec * 0.4) + (s_ia * 0.6)
     else:
         score_final = (s_tec * 0.3) + (s_fund * 0.4) + (s_ia * 0.3)
 
-    # --- MELHORIA: AJUSTE MACROECONÔMICO (O Veto) ---
-    # O Capo olha pela janela antes de autorizar.
+    # --- AJUSTE MACROECONÔMICO (O Veto) ---
+    # O Capo olha pela janela antes de autorizar (uma janela por ciclo, não por ativo).
     try:
-        # Puxa dados macro rápidos (cacheado se possível, ou puxa fresh)
-        # Para performance, o ideal seria passar o df_macro como argumento, 
-        # mas para manter compatibilidade, vamos puxar leve.
-        df_macro = governor.coletar_dados_macro()
-        regime, _, _ = governor.definir_regime_mercado(df_macro)
-        
-        penalidade = 0
-        if "PANIC" in regime or "CAPITULATION" in regime:
-            penalidade = 30 # Tira 30 pontos do score em pânico
-        elif "RECESSION" in regime or "INFLATION" in regime:
-            penalidade = 15 # Tira 15 pontos em cenários ruins
-        
+        if contexto_macro is None: contexto_macro = governor.obter_contexto_macro()
+        penalidade = contexto_macro['penalidade']
         score_final = score_final - penalidade
-        
     except:
         penalidade = 0 # Segue o jogo se falhar macro
         
+    return _montar_conselho(ticker, preco_atual, s_tec, s_fund, s_ia, score_final, penalidade)
+
+def _montar_conselho(ticker, preco_atual, s_tec, s_fund, s_ia, score_final, penalidade):
     # Garante limites
     score_final = max(0, min(100, score_final))
 
@@ -121,14 +149,93 @@ def gerar_conselho_final(ticker, df_precos):
         'Detalhes': f"Tec:{s_tec} | Fund:{s_fund} | IA:{int(s_ia)} | Macro Penal:-{penalidade}"
     }
 
-def ranquear_oportunidades(lista_tickers, df_multiticker):
-    ranking = []
-    for t in lista_tickers:
-        if t in df_multiticker.columns:
-            df_ativo = df_multiticker[t].dropna().to_frame(name='Close')
-            res = gerar_conselho_final(t, df_ativo)
-            ranking.append(res)
+def gerar_conselho_estado(ticker, estado, contexto_macro=None, historico=None):
+    """
+    gerar_conselho_final para a sentinela: técnico e features da IA vêm do estado
+    incremental; `historico()` (OHLCV completo) só é lido se o modelo precisar de treino.
+    """
+    if not estado.barras: return {'Ticker': ticker, 'Score': 0, 'Veredito': "Sem Dados"}
+    preco_atual = estado.preco
+    
+    s_tec = calcular_score_tecnico_estado(estado)
+    s_fund = calcular_score_fundamentalista(ticker, preco_atual)
+    s_ia, _, _ = oracle.prever_tendencia_ml_features(ticker, estado.features_ml(), estado.barras, historico)
+    return combinar_scores(ticker, preco_atual, s_tec, s_fund, s_ia, contexto_macro)
+
+# --- MOTOR EM LOTE (RANKING DA WATCHLIST INTEIRA) ---
+def calcular_scores_tecnicos_lote(df_multiticker, df_volume=None):
+    """
+    calcular_score_tecnico para todas as colunas de uma vez (NumPy, sem loop por ativo).
+    `df_volume` (mesmo formato) liga as bandas de VWAP; sem ele a VWAP é o próprio preço,
+    exatamente como no cálculo por ativo.
+    """
+    if df_multiticker.empty: return pd.Series(dtype=int)
+    bruto = df_multiticker.to_numpy(dtype=float)
+    # Valores válidos empurrados para o fim: a última linha é o último preço de cada ativo
+    M, ordem, n = engine.compactar(bruto)
+    # Mesmos núcleos do cálculo por ativo (rolling do pandas, 1º delta NaN -> 0 como no
+    # cerebro.calcular_rsi): os dois caminhos empatam bit a bit, inclusive em trechos parados
+    preco = M[-1]
+    sma50 = engine._media_movel(M, 50)[-1]
+    sma200 = np.where(n > 200, engine._media_movel(M, 200)[-1], sma50)
+    rsi = np.where(n < 14, 50.0, engine._rsi(M, 14)[-1])
+    desvio = engine._desvio_movel(M, 20)[-1]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # 1. Tendência
+        tendencia = 10 * (preco > sma50) + 10 * (sma50 > sma200) - 10 * (sma50 < sma200)
+        score = 50 + np.where(n > 50, tendencia, 0)
+
+        # 2. Momento (RSI 14 por médias simples, igual ao cerebro)
+        score = score + np.select([rsi < 30, rsi < 45, rsi > 70], [15, 5, -15], 0)
+
+        # 3. Volatilidade (VWAP ± 2 desvios de 20 pregões)
+        if df_volume is not None:
+            V = np.take_along_axis(df_volume.reindex_like(df_multiticker).to_numpy(dtype=float), ordem, axis=0)
+            vwap = np.nansum(M * V, axis=0) / np.nansum(np.where(np.isnan(M), np.nan, V), axis=0)
+        else:
+            vwap = preco
+        score = score + np.select([preco < vwap - 2 * desvio, preco > vwap + 2 * desvio], [10, -10], 0)
+
+    score = np.clip(score, 0, 100)
+    return pd.Series(score.astype(int), index=df_multiticker.columns)[n > 0]
+
+def pontuar_lote(lista_tickers, df_multiticker, contexto_macro=None, df_volume=None):
+    """
+    Pipeline em lote do Capo: técnico vetorizado, fundamentos em lote (cache),
+    IA em uma única chamada e regime macro lido uma vez.
+    Retorna a lista de conselhos no mesmo formato de gerar_conselho_final.
+    """
+    tickers = [t for t in dict.fromkeys(lista_tickers) if t in df_multiticker.columns]
+    if not tickers: return []
+    if contexto_macro is None: contexto_macro = governor.obter_contexto_macro()
+
+    painel = df_multiticker[tickers]
+    s_tec = calcular_scores_tecnicos_lote(painel, df_volume[tickers] if df_volume is not None else None)
+    historicos = {t: painel[t].dropna().to_frame(name='Close') for t in s_tec.index}
+    fundamentos = val.obter_dados_fundamentos_lote([t for t in historicos if _usa_fundamentos(t)])
+    previsoes = oracle.prever_tendencia_ml_lote(historicos)
+
+    conselhos = []
+    for t in tickers:
+        if t not in historicos:
+            conselhos.append({'Ticker': t, 'Score': 0, 'Veredito': "Sem Dados"}); continue
+        preco_atual = historicos[t]['Close'].iloc[-1]
+        tec = int(s_tec[t])
+        fund = _pontuar_fundamentos(fundamentos.get(t), preco_atual) if _usa_fundamentos(t) else 50
+        ia = previsoes[t][0]
+        conselhos.append(combinar_scores(t, preco_atual, tec, fund, ia, contexto_macro))
+    return conselhos
+
+def ranquear_oportunidades(lista_tickers, df_multiticker, contexto_macro=None):
+    """Aceita o DataFrame de fechamentos ou um PainelOHLCV (que liga as bandas de VWAP com volume)."""
+    df_volume = None
+    if isinstance(df_multiticker, ledger.PainelOHLCV):
+        df_volume = df_multiticker.campo('Volume')
+        df_multiticker = df_multiticker.fechamentos()
+    # Regime macro calculado UMA vez para a lista inteira; o resto roda em lote
+    ranking = pontuar_lote(lista_tickers, df_multiticker, contexto_macro, df_volume)
     df_rank = pd.DataFrame(ranking)
     if not df_rank.empty:
         df_rank = df_rank.sort_values('Score', ascending=False)
-    return df_rank
\ No newline at end of file
+    return df_rank
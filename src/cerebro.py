@@ -4,28 +4,31 @@
 
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
 from datetime import timedelta
-from scipy.optimize import minimize
-from scipy.stats import norm
+import indicadores as engine
+import padroes as candles
+import niveis as levels
+import perfil_volume as profile
+import montecarlo as casino
+import opcoes as desk
+import risco as risk
+import estresse as stress
+import otimizador as architect
+import covariancia as abacus
+import previsao as prophet
+import sensibilidade as shadow
+import rotacao as compass
 
 # --- INDICADORES TÉCNICOS ---
+# Os cálculos vivem no indicadores (vetorizado, N ativos de uma vez); aqui ficam as
+# versões de um único ativo usadas pelo app, com os mesmos retornos de sempre.
 def calcular_rsi(series, period=14):
     if len(series) < period: return pd.Series(50, index=series.index)
-    delta = series.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
+    return engine.rsi(series, period)
 
 def calcular_atr(df, period=14):
     if df.empty or 'High' not in df.columns or 'Low' not in df.columns: return pd.Series(0, index=df.index if not df.empty else [])
-    high_low = df['High'] - df['Low']
-    high_close = np.abs(df['High'] - df['Close'].shift())
-    low_close = np.abs(df['Low'] - df['Close'].shift())
-    ranges = pd.concat([high_low, high_close, low_close], axis=1)
-    true_range = np.max(ranges, axis=1)
-    return true_range.rolling(window=period).mean()
+    return engine.atr(df['High'], df['Low'], df['Close'], period)
 
 def calcular_vwap(df):
     if df.empty or 'Volume' not in df.columns: return df['Close'] if not df.empty else pd.Series()
@@ -36,19 +39,14 @@ def calcular_vwap(df):
 def calcular_vwap_bands(df):
     if df.empty: return pd.Series(), pd.Series(), pd.Series()
     vwap = calcular_vwap(df)
-    rolling_std = df['Close'].rolling(20).std()
+    rolling_std = engine.desvio_movel(df['Close'], 20)
     upper = vwap + (2 * rolling_std)
     lower = vwap - (2 * rolling_std)
     return vwap, upper, lower
 
 def calcular_macd(series):
     if len(series) < 26: return pd.Series(), pd.Series(), pd.Series()
-    exp1 = series.ewm(span=12, adjust=False).mean()
-    exp2 = series.ewm(span=26, adjust=False).mean()
-    macd = exp1 - exp2
-    signal = macd.ewm(span=9, adjust=False).mean()
-    hist = macd - signal
-    return macd, signal, hist
+    return engine.macd(series, 12, 26, 9)
 
 def calcular_fibonacci(df):
     if df.empty or 'High' not in df.columns or 'Low' not in df.columns: return {}
@@ -56,35 +54,21 @@ def calcular_fibonacci(df):
     return {'0%': min_p, '23.6%': min_p+0.236*diff, '38.2%': min_p+0.382*diff, '50%': min_p+0.5*diff, '61.8%': min_p+0.618*diff, '100%': max_p}
 
 def identificar_padroes_candle(df):
+    """Lista (data, preço, ícone, direção) de todos os padrões do padroes (a partir da 3ª barra)."""
     if df.empty or 'Open' not in df.columns: return []
-    df = df.copy()
-    df['Body'] = abs(df['Close'] - df['Open'])
-    df['Wick_Upper'] = df['High'] - np.maximum(df['Close'], df['Open'])
-    df['Wick_Lower'] = np.minimum(df['Close'], df['Open']) - df['Low']
-    patterns = []
-    for i in range(2, len(df)):
-        curr = df.iloc[i]; date = df.index[i]
-        if (curr['Wick_Lower'] > 2 * curr['Body']) and (curr['Wick_Upper'] < curr['Body'] * 0.2):
-            patterns.append((date, curr['Low'], "🔨", "Bull"))
-    return patterns
-
-def calcular_suporte_resistencia_auto(df, window=20):
-    if df.empty or 'Low' not in df.columns: return [], []
-    df['Min'] = df['Low'].rolling(window, center=True).min()
-    df['Max'] = df['High'].rolling(window, center=True).max()
-    return df[df['Low']==df['Min']]['Low'].unique()[-3:], df[df['High']==df['Max']]['High'].unique()[-3:]
+    ev = candles.eventos_padroes(df)
+    ev = ev[ev['Data'] >= df.index[min(2, len(df) - 1)]] if len(df) > 2 else ev.iloc[0:0]
+    return list(zip(ev['Data'], ev['Preço'], ev['Ícone'], ev['Direção']))
+
+def calcular_suporte_resistencia_auto(df, window=20, ticker=None):
+    """Últimos 3 fundos/topos distintos (niveis, O(n), sem alterar o df; cache por `ticker`)."""
+    return levels.niveis_recentes(df, window, ticker)
 
 # --- INSTITUTIONAL TOOLS ---
 def identificar_zonas_liquidez(df, n_zonas=3):
+    """Centros das faixas de preço com mais volume (perfil de volume em 50 faixas fixas)."""
     if df.empty or 'Volume' not in df.columns: return []
-    try:
-        df = df.copy()
-        df['Price_Bucket'] = pd.qcut(df['Close'], q=50, duplicates='drop')
-        volume_profile = df.groupby('Price_Bucket')['Volume'].sum().sort_values(ascending=False)
-        zonas = []
-        for i in range(min(n_zonas, len(volume_profile))):
-            zonas.append(volume_profile.index[i].mid)
-        return zonas
+    try: return profile.PerfilVolume.de_historico(df, 50).niveis_volume(n_zonas)
     except: return []
 
 def calcular_pressao_compradora(df):
@@ -106,108 +90,54 @@ def calcular_performance_trader(historico):
     volume_total = (vendas['Qtd'] * vendas['Preço']).sum()
     return {'total_trades': total_trades, 'volume_girado': volume_total, 'ultimo_trade': vendas.iloc[0]['Data']}
 
-def calcular_matriz_correlacao_raw(df_precos):
+def calcular_matriz_correlacao_raw(df_precos, metodo='amostral'):
     if df_precos.empty: return pd.DataFrame()
-    retornos = df_precos.pct_change().dropna()
-    return retornos.corr()
+    return abacus.correlacao(df_precos, metodo)
 
 # --- RISK (VaR, Stress & HEDGE) ---
-def calcular_var_portfolio(portfolio, df_precos, confianca=0.95):
+def _motor_carteira(portfolio, df_precos):
     ativos_validos = [a for a in portfolio.keys() if a != 'Caixa' and a in df_precos.columns]
-    if not ativos_validos: return 0.0, 0.0
-    
-    valores = []
-    for a in ativos_validos:
-        qtd = portfolio[a]['qtd']
-        preco = df_precos[a].iloc[-1]
-        valores.append(qtd * preco)
-        
-    valor_total_ativos = sum(valores)
-    if valor_total_ativos == 0: return 0.0, 0.0
-    
-    pesos = np.array(valores) / valor_total_ativos
-    retornos = df_precos[ativos_validos].pct_change().dropna()
-    if retornos.empty: return 0.0, 0.0
-    
-    cov_matrix = retornos.cov()
-    port_vol_diaria = np.sqrt(np.dot(pesos.T, np.dot(cov_matrix, pesos)))
-    z_score = norm.ppf(confianca)
-    var_pct = port_vol_diaria * z_score
-    var_financeiro = valor_total_ativos * var_pct
-    
-    return var_financeiro, var_pct * 100
+    if not ativos_validos: return None, None
+    motor = risk.MotorRisco(df_precos, ativos_validos)
+    expo = risk.exposicoes({'Carteira': portfolio}, df_precos)
+    if motor.vazio or expo.to_numpy().sum() == 0: return None, None
+    return motor, expo
+
+def calcular_var_portfolio(portfolio, df_precos, confianca=0.95):
+    motor, expo = _motor_carteira(portfolio, df_precos)
+    if motor is None: return 0.0, 0.0
+    r = motor.avaliar(expo, ('parametrico',), (1,), (confianca,)).iloc[0]
+    return r['VaR'], r['VaR %']
 
 def calcular_cvar_portfolio(portfolio, df_precos, confianca=0.95):
-    ativos_validos = [a for a in portfolio.keys() if a != 'Caixa' and a in df_precos.columns]
-    if not ativos_validos: return 0.0
-    valores = [portfolio[a]['qtd'] * df_precos[a].iloc[-1] for a in ativos_validos]
-    valor_total = sum(valores)
-    if valor_total == 0: return 0.0
-    pesos = np.array(valores) / valor_total
-    retornos = df_precos[ativos_validos].pct_change().dropna()
-    if retornos.empty: return 0.0
-    retornos_port = retornos.dot(pesos)
-    var_cutoff = retornos_port.quantile(1 - confianca)
-    cvar_pct = retornos_port[retornos_port <= var_cutoff].mean()
-    return abs(cvar_pct) * valor_total
+    motor, expo = _motor_carteira(portfolio, df_precos)
+    if motor is None: return 0.0
+    return abs(motor.avaliar(expo, ('historico',), (1,), (confianca,)).iloc[0]['ES'])
 
 def executar_stress_test(portfolio, df_precos, cenario_pct=-0.10, ativo_choque='^GSPC'):
+    """Choque único em um benchmark. Cenários históricos multi-fator: estresse.estressar_carteiras."""
     ativos_validos = [a for a in portfolio.keys() if a != 'Caixa' and a in df_precos.columns]
     if not ativos_validos: return 0.0, {}
-    
-    # Blindagem contra falta de benchmark
-    if ativo_choque in df_precos.columns:
-        ret_bench = df_precos[ativo_choque].pct_change().fillna(0)
-    else:
-        # Fallback: Usa média do mercado se S&P falhar
-        ret_bench = df_precos.pct_change().mean(axis=1).fillna(0)
-        
-    impactos = {}
-    perda_total = 0
-    
-    for a in ativos_validos:
-        ret_ativo = df_precos[a].pct_change().fillna(0)
-        # Verifica se tem dados suficientes
-        if len(ret_ativo) < 2 or len(ret_bench) < 2:
-            beta = 1.0
-        else:
-            try:
-                cov = np.cov(ret_ativo, ret_bench)[0][1]
-                var = np.var(ret_bench)
-                beta = cov / var if var != 0 else 1.0
-            except: beta = 1.0
-            
-        queda_estimada = beta * cenario_pct
-        valor_posicao = portfolio[a]['qtd'] * df_precos[a].iloc[-1]
-        perda_posicao = valor_posicao * queda_estimada
-        impactos[a] = {'beta': beta, 'queda_est': queda_estimada * 100, 'perda_monetaria': perda_posicao}
-        perda_total += perda_posicao
-        
-    return perda_total, impactos
+    betas = stress.betas_simples(df_precos, ativos_validos, ativo_choque)
+    valores = risk.exposicoes({'Carteira': portfolio}, df_precos).iloc[0]
+    quedas = betas * cenario_pct
+    perdas = valores.reindex(betas.index) * quedas
+    impactos = {a: {'beta': betas[a], 'queda_est': quedas[a] * 100, 'perda_monetaria': perdas[a]} for a in ativos_validos}
+    return perdas.sum(), impactos
 
 # --- NOVO: HEDGE CALCULATOR (Black-Scholes) ---
 def calcular_black_scholes(S, K, T, r, sigma, tipo='call'):
     if sigma == 0 or T == 0: return 0, 0
-    d1 = (np.log(S/K) + (r + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
-    
-    if tipo == 'call':
-        price = S * norm.cdf(d1) - K * np.exp(-r*T) * norm.cdf(d2)
-        delta = norm.cdf(d1)
-    else: # Put
-        price = K * np.exp(-r*T) * norm.cdf(-d2) - S * norm.cdf(-d1)
-        delta = norm.cdf(d1) - 1
-    return price, delta
-
-def calcular_hedge_carteira(valor_carteira, beta_carteira, preco_indice, volatilidade_indice):
+    res = desk.precificar(S, K, T, r, sigma, tipo)
+    return float(res['preco']), float(res['delta'])
+
+def calcular_hedge_carteira(valor_carteira, beta_carteira, preco_indice, volatilidade_indice, r=0.11, T=1/12, K=None):
+    """Put do índice (ATM de 1 mês por padrão) dimensionada pelo delta. Grade completa: opcoes.melhor_hedge."""
     nocional_risco = valor_carteira * beta_carteira
     S = preco_indice
-    K = preco_indice 
-    T = 1/12
-    r = 0.11 
-    sigma = volatilidade_indice
+    if K is None: K = preco_indice
     
-    preco_put, delta_put = calcular_black_scholes(S, K, T, r, sigma, 'put')
+    preco_put, delta_put = calcular_black_scholes(S, K, T, r, volatilidade_indice, 'put')
     
     if abs(delta_put) > 0:
         qtd_opcoes = nocional_risco / (S * abs(delta_put))
@@ -253,9 +183,9 @@ def calcular_rrg_lite(df_asset, df_bench, window=14):
     df = pd.concat([df_asset['Close'], df_bench['Close']], axis=1, keys=['Asset', 'Bench']).dropna()
     if df.empty: return 0, 0, pd.Series(), pd.Series()
     
-    rs_raw = df['Asset'] / df['Bench']
-    rs_ratio = (rs_raw / rs_raw.rolling(window=window*2).mean()) * 100
-    rs_momentum = (rs_ratio / rs_ratio.shift(window)) * 100
+    # Mesma conta do The Compass (que faz a watchlist inteira de uma vez)
+    res = compass.calcular(df[['Asset']], df['Bench'], window)
+    rs_ratio, rs_momentum = res['ratio']['Asset'].rename(None), res['momentum']['Asset'].rename(None)
     return rs_ratio.iloc[-1], rs_momentum.iloc[-1], rs_ratio.tail(5), rs_momentum.tail(5)
 
 def calcular_sentimento_global(macro_data):
@@ -280,14 +210,13 @@ def detectar_baleia(df):
 def calcular_beta_alpha(a, m):
     # BLINDAGEM: Verifica se séries são válidas
     if a.empty or m.empty: return 1.0, 0.0
-    
-    df = pd.concat([a, m], axis=1).dropna()
-    if df.empty or len(df) < 10: return 1.0, 0.0
-    
+    # Conta no The Shadow (pares válidos, beta com a mesma normalização em cov e var)
     try:
-        beta = np.cov(df.iloc[:,0], df.iloc[:,1])[0][1] / np.var(df.iloc[:,1])
-        alpha = (df.iloc[:,0].mean() - beta*df.iloc[:,1].mean()) * 252
-        return beta, alpha
+        df = pd.concat([a, m], axis=1)
+        est = shadow.estatisticas(df.iloc[:, :1], df.iloc[:, 1:2])
+        beta, alpha = est['Beta'][0, 0], est['Alfa'][0, 0]
+        if np.isnan(beta): return 1.0, 0.0
+        return float(beta), float(alpha)
     except: return 1.0, 0.0
 
 def calcular_zscore_arbitragem(a, b, w=20):
@@ -340,37 +269,23 @@ def gerar_relatorio_tactico(t, s, r, pl, dy, atr, roe, mrg, sent):
     return txt
 
 def projecao_propheta(hist, dias=30):
+    """Tendência linear (OLS fechada). Watchlist inteira / log / intervalos: previsao.projetar."""
     if hist.empty: return [], [], 0
     last = pd.to_datetime(hist.index[-1])
-    df = hist.reset_index(); X = np.arange(len(df)).reshape(-1,1); y=df['Close'].values
-    mod = LinearRegression().fit(X,y)
-    fut = np.arange(len(df), len(df)+dias).reshape(-1,1)
-    return [last + timedelta(days=i) for i in range(1, dias+1)], mod.predict(fut), np.std(y-mod.predict(X))
-
-def monte_carlo_sim(p, c, d=252, s=50):
-    r = p.pct_change().dropna()
+    y = hist['Close'] if isinstance(hist, pd.DataFrame) else hist
+    fit = prophet.ajustar(y.to_numpy(dtype=float))
+    prev = fit['ajuste'][0] + fit['inclinacao'][0] * np.arange(1, dias + 1)
+    return [last + timedelta(days=i) for i in range(1, dias+1)], prev, np.sqrt(fit['sse'][0] / fit['n'][0])
+
+def monte_carlo_sim(p, c, d=252, s=50, pesos=None, seed=None, metodo_cov='amostral'):
+    """Caminhos (d x s) da carteira; pesos iguais por padrão. Bandas p/ muitas simulações: montecarlo.simular_carteira."""
+    r = abacus.retornos(p)
     if r.empty: return np.zeros((d, s))
-    mu = r.mean(); cov = r.cov(); w = np.full(len(p.columns), 1/len(p.columns))
-    re = np.sum(mu*w); ve = np.sqrt(np.dot(w.T, np.dot(cov, w)))
-    paths = np.zeros((d, s))
-    for i in range(s):
-        val = [c]; pr = c
-        for _ in range(d):
-            pr *= (1 + np.random.normal(re, ve))
-            val.append(pr)
-        paths[:,i] = val[1:]
-    return paths
-
-def otimizar_portfolio(p):
-    r = p.pct_change().dropna()
-    if r.empty: return {}
-    mu = r.mean()*252; cov = r.cov()*252; n = len(p.columns)
-    def ns(w): 
-        risk = np.sqrt(np.dot(w.T, np.dot(cov, w)))
-        if risk == 0: return 0
-        return -(np.sum(mu*w)/risk)
-    res = minimize(ns, np.full(n, 1/n), method='SLSQP', bounds=tuple((0,1) for _ in range(n)), constraints=({'type':'eq', 'fun':lambda x:np.sum(x)-1}))
-    return dict(zip(p.columns, res.x))
+    return casino.simular_caminhos(r, pesos, c, d, s, seed=seed, cov=abacus.estimador(r).matriz(metodo_cov).to_numpy())
+
+def otimizar_portfolio(p, rf=0.0, limites=(0, 1)):
+    res = architect.otimizar_precos(p, 'max_sharpe', rf, limites=limites)
+    return res['Pesos'] if res else {}
 
 def gerar_rebalanceamento(port, prices, weights):
     if not weights: return pd.DataFrame()
@@ -388,7 +303,9 @@ def gerar_rebalanceamento(port, prices, weights):
             if abs(q)>0: ords.append({'Ativo':a, 'Ação': "COMPRAR" if q>0 else "VENDER", 'Qtd': abs(q), 'Preço': p, 'Fin': abs(q*p), 'Peso Ideal': w*100})
     return pd.DataFrame(ords)
 
-def analisar_risco_portfolio(port, prices, betas):
+def analisar_risco_portfolio(port, prices, betas=None, df_precos=None):
+    # Sem betas prontos: lê do The Shadow (proxy de mercado da watchlist)
+    if betas is None: betas = shadow.betas(df_precos) if df_precos is not None else {}
     tot = 0; w = {}
     for a, d in port.items():
         if a == 'Caixa': tot += d
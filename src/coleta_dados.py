@@ -2,8 +2,7 @@
 # Módulo: Coleta de Dados de Mercado
 # Status: MVP 1.1 (Corrigido para nova API)
 
-import yfinance as yf
-import pandas as pd
+import fontes
 
 def buscar_historico(tickers, periodo="1y"):
     """
@@ -12,13 +11,10 @@ def buscar_historico(tickers, periodo="1y"):
     print(f"--- CONSIGLIERE: Iniciando coleta para {tickers} ---")
     
     try:
-        # ATUALIZAÇÃO: auto_adjust=True garante que o preço já vem limpo (dividendos/splits)
-        # A coluna agora se chama 'Close', não mais 'Adj Close'
-        dados = yf.download(tickers, period=periodo, progress=False, auto_adjust=True)['Close']
-        
-        # Se for apenas um ativo, o pandas retorna uma Series, convertemos para DataFrame para padronizar
-        if isinstance(dados, pd.Series):
-            dados = dados.to_frame()
+        # A fonte já entrega preços ajustados (dividendos/splits) na coluna 'Close',
+        # um ativo por coluna mesmo quando só um ticker é pedido
+        dados = fontes.obter_fonte().historico(tickers, periodo)
+        if dados.empty: raise ValueError("fonte não retornou dados")
             
         print("--- Dados coletados com sucesso. ---")
         return dados
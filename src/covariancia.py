@@ -0,0 +1,142 @@
+# Arquivo: E:\Consigliere\src\covariancia.py
+# Módulo: The Abacus (Shared Covariance Service - Sample / EWMA / Ledoit-Wolf)
+# Status: V1.0 - Incremental / Cache por universo
+
+import numpy as np
+import pandas as pd
+
+METODOS = ('amostral', 'ewma', 'ledoit_wolf')
+LAMBDA_RISKMETRICS = 0.94
+DIAS_ANO = 252
+_ESTIMADORES = {} # (ativos, janela, lambda) -> EstimadorCovariancia
+_ESTIMADORES_MAX = 64
+
+def retornos(df_precos, ativos=None):
+    """Retornos diários só dos dias em que todos os ativos têm preço (mesma base de todo o sistema)."""
+    precos = df_precos if ativos is None else df_precos[list(ativos)]
+    return precos.pct_change().dropna()
+
+class EstimadorCovariancia:
+    """
+    Estatísticas suficientes de um universo de ativos que sempre descrevem exatamente as
+    linhas de retorno guardadas (as últimas `janela`, se houver). A cada chamada só a
+    diferença é aplicada: linhas que saem pelo início, a última barra revisada (pregão em
+    andamento) e as linhas novas no fim.
+    - amostral: somas de 1ª e 2ª ordem em torno de um deslocamento fixo (evita cancelamento);
+    - EWMA (RiskMetrics, média zero): S = Σ λ^idade r rᵀ / Σ λ^idade;
+    - Ledoit-Wolf: encolhimento da amostral para μ·I, intensidade ótima estimada das próprias linhas.
+    As somas são refeitas do zero quando as alterações acumuladas passam do tamanho do
+    histórico, para não acumular erro de arredondamento.
+    """
+
+    def __init__(self, ativos, janela=None, lam=LAMBDA_RISKMETRICS):
+        self.ativos = list(ativos)
+        self.janela = janela
+        self.lam = lam
+        self._recalcular(np.empty((0, len(self.ativos))), pd.DatetimeIndex([]))
+
+    @property
+    def n_obs(self): return len(self.R)
+
+    def _recalcular(self, R, datas):
+        self.R, self.datas = R, datas
+        self.desloc = R.mean(axis=0) if len(R) else np.zeros(len(self.ativos))
+        X = R - self.desloc
+        self.s1 = X.sum(axis=0); self.s2 = X.T @ X
+        pesos = self.lam ** np.arange(len(R) - 1, -1, -1)
+        self.ewma_num = (R * pesos[:, None]).T @ R; self.ewma_den = pesos.sum()
+        self._alteracoes = 0
+        self._resultados = {}
+
+    def _somar(self, linhas, idades, sinal):
+        X = linhas - self.desloc
+        self.s1 += sinal * X.sum(axis=0); self.s2 += sinal * (X.T @ X)
+        pesos = self.lam ** idades
+        self.ewma_num += sinal * ((linhas * pesos[:, None]).T @ linhas); self.ewma_den += sinal * pesos.sum()
+        self._alteracoes += len(linhas)
+
+    def atualizar(self, rets):
+        """Leva o estado até as linhas de `rets` (colunas = ativos) aplicando só a diferença."""
+        rets = rets[self.ativos]
+        if self.janela: rets = rets.iloc[-self.janela:]
+        alvo, datas = rets.to_numpy(dtype=float), rets.index
+        n = len(self.datas)
+        if n == 0 or len(datas) == 0 or datas[0] not in self.datas or self.datas[-1] > datas[-1]:
+            self._recalcular(alvo, datas); return self
+        inicio = self.datas.get_loc(datas[0])
+        comum = n - inicio # linhas guardadas que continuam no alvo
+        if comum > len(datas) or not datas[:comum].equals(self.datas[inicio:]) or \
+                not np.array_equal(alvo[:comum - 1], self.R[inicio:n - 1]):
+            self._recalcular(alvo, datas); return self
+        mudou = False
+        if inicio > 0: # saem pelo início
+            self._somar(self.R[:inicio], np.arange(n - 1, n - 1 - inicio, -1), -1); mudou = True
+        if not np.array_equal(alvo[comum - 1], self.R[-1]): # última barra revisada
+            self._somar(self.R[-1:], np.zeros(1), -1); self._somar(alvo[comum - 1:comum], np.zeros(1), 1); mudou = True
+        k = len(datas) - comum
+        if k > 0: # entram no fim: as idades das antigas sobem k
+            self.ewma_num *= self.lam ** k; self.ewma_den *= self.lam ** k
+            self._somar(alvo[comum:], np.arange(k - 1, -1, -1), 1); mudou = True
+        self.R, self.datas = alvo, datas
+        if self._alteracoes >= max(len(alvo), 1): self._recalcular(alvo, datas)
+        elif mudou: self._resultados = {}
+        return self
+
+    # --- LEITURAS (DIÁRIAS) ---
+    def media(self):
+        n = max(self.n_obs, 1)
+        return pd.Series(self.desloc + self.s1 / n, index=self.ativos)
+
+    def _amostral(self):
+        n = self.n_obs
+        if n < 2: return np.full((len(self.ativos),) * 2, np.nan)
+        S = (self.s2 - np.outer(self.s1, self.s1) / n) / (n - 1)
+        return (S + S.T) / 2
+
+    def _ewma(self):
+        if self.ewma_den <= 0: return np.full((len(self.ativos),) * 2, np.nan)
+        S = self.ewma_num / self.ewma_den
+        return (S + S.T) / 2
+
+    def _ledoit_wolf(self):
+        """Ledoit & Wolf (2004): alvo μ·I, mesma fórmula do sklearn (intensidade limitada a [0, 1])."""
+        n, N = self.R.shape
+        if n < 2: return np.full((N, N), np.nan)
+        X = self.R - self.R.mean(axis=0)
+        S = X.T @ X / n
+        mu = np.trace(S) / N
+        d2 = ((S - mu * np.eye(N)) ** 2).sum()
+        b2 = (((X ** 2).T @ (X ** 2)) / n - S ** 2).sum() / n
+        encolhimento = min(b2, d2) / d2 if d2 > 0 else 0.0
+        C = encolhimento * mu * np.eye(N) + (1 - encolhimento) * S
+        return C * n / (n - 1) # mesma escala (ddof=1) da amostral
+
+    def matriz(self, metodo='amostral'):
+        if metodo not in self._resultados:
+            calc = {'amostral': self._amostral, 'ewma': self._ewma, 'ledoit_wolf': self._ledoit_wolf}[metodo]
+            self._resultados[metodo] = pd.DataFrame(calc(), index=self.ativos, columns=self.ativos)
+        return self._resultados[metodo]
+
+# --- SERVIÇO ---
+def estimador(rets, janela=None, lam=LAMBDA_RISKMETRICS):
+    """Estimador compartilhado do universo (colunas de `rets`), já atualizado com `rets`."""
+    chave = (tuple(rets.columns), janela, lam)
+    if chave not in _ESTIMADORES:
+        if len(_ESTIMADORES) >= _ESTIMADORES_MAX: _ESTIMADORES.clear()
+        _ESTIMADORES[chave] = EstimadorCovariancia(rets.columns, janela, lam)
+    return _ESTIMADORES[chave].atualizar(rets)
+
+def media_e_covariancia(df_precos, metodo='amostral', janela=None, ativos=None, anualizar=False):
+    """(média diária, covariância) do universo; com `anualizar`, ambos x 252."""
+    est = estimador(retornos(df_precos, ativos), janela)
+    fator = DIAS_ANO if anualizar else 1
+    return est.media() * fator, est.matriz(metodo) * fator
+
+def covariancia(df_precos, metodo='amostral', janela=None, ativos=None, anualizar=False):
+    return media_e_covariancia(df_precos, metodo, janela, ativos, anualizar)[1]
+
+def correlacao(df_precos, metodo='amostral', janela=None, ativos=None):
+    cov = covariancia(df_precos, metodo, janela, ativos)
+    d = np.sqrt(np.diag(cov.to_numpy()))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return cov / np.outer(d, d)
@@ -1,47 +1,113 @@
 # Arquivo: E:\Consigliere\src\dados.py
 # Função: Data Feed Enhanced (ROE & Margins)
 
-import yfinance as yf
 import pandas as pd
 import numpy as np
+import armazem
+import fontes
+import painel
 
-def buscar_dados_multiticker(tickers, periodo="1y"):
-    if not tickers: return pd.DataFrame()
+# --- ARMAZÉM LOCAL: SÓ BAIXA O QUE FALTA ---
+def _separar_por_ticker(dados, tickers):
+    """Quebra o retorno do yf.download em um DataFrame OHLCV por ativo."""
+    res = {}
+    if dados is None or dados.empty: return res
+    if isinstance(dados.columns, pd.MultiIndex):
+        nivel = dados.columns.get_level_values(1)
+        for t in tickers:
+            if t in nivel: res[t] = dados.xs(t, axis=1, level=1)
+    elif len(tickers) == 1:
+        res[tickers[0]] = dados
+    for t in list(res.keys()):
+        df = res[t][[c for c in armazem.CAMPOS if c in res[t].columns]].dropna(subset=['Close'])
+        if df.empty: del res[t]
+        else: res[t] = df
+    return res
+
+def _baixar_completo(tickers, periodo, inicio):
+    dados = fontes.obter_fonte().baixar(tickers, periodo)
+    for t, df in _separar_por_ticker(dados, tickers).items():
+        armazem.substituir(t, df)
+        armazem.salvar_meta(t, inicio=str(inicio.date()) if inicio is not None else 'max')
+
+def sincronizar_armazem(tickers, periodo="1y"):
+    """
+    Garante que o armazém local cobre `periodo` para todos os ativos.
+    Ativos já armazenados baixam só as barras após o penúltimo pregão gravado;
+    se o penúltimo pregão mudou (dividendo/split reajustou a série), o ativo
+    é rebaixado por completo.
+    """
+    inicio = fontes.inicio_periodo(periodo)
+    completos, incrementais = [], {}
+    for t in dict.fromkeys(tickers):
+        n = armazem.total_linhas(t)
+        meta_inicio = armazem.ler_meta(t).get('inicio')
+        cobre = meta_inicio == 'max' or (meta_inicio is not None and inicio is not None and pd.Timestamp(meta_inicio) <= inicio)
+        if n < 2 or not cobre: completos.append(t)
+        elif not armazem.esta_fresco(t):
+            d = armazem.datas(t)
+            incrementais[t] = (pd.Timestamp(int(d[-2])), armazem.ler(t, pd.Timestamp(int(d[-2])))['Close'].iloc[0])
+            del d
+
+    if incrementais:
+        desde = min(v[0] for v in incrementais.values())
+        dados = fontes.obter_fonte().baixar(list(incrementais), inicio=desde)
+        novos = _separar_por_ticker(dados, list(incrementais))
+        for t, (penultima, close_gravado) in incrementais.items():
+            df = novos.get(t)
+            if df is None or df.empty:
+                armazem.marcar_fresco(t); continue
+            df = armazem.normalizar(df)
+            if penultima in df.index and close_gravado:
+                if abs(df.loc[penultima, 'Close'] / close_gravado - 1) > 1e-4:
+                    completos.append(t); continue
+            df = df[df.index > penultima]
+            if df.empty: armazem.marcar_fresco(t)
+            else: armazem.gravar(t, df)
+
+    if completos:
+        _baixar_completo(completos, periodo, inicio)
+
+def buscar_painel(tickers, periodo="1y", dtype=np.float64):
+    """
+    Painel OHLCV (ativo x tempo x campo) da lista inteira: um único download
+    incremental para todos os ativos e nenhuma busca por ativo depois disso.
+    """
+    if not tickers: return painel.PainelOHLCV.de_dataframes({})
     try:
-        dados = yf.download(tickers, period=periodo, progress=False, auto_adjust=True)
-        if 'Close' in dados: precos = dados['Close']
-        else: precos = dados
-        
-        if isinstance(precos, pd.Series):
-            precos = precos.to_frame()
-            precos.columns = tickers
-        return precos
+        sincronizar_armazem(tickers, periodo)
+        inicio = fontes.inicio_periodo(periodo)
+        return painel.PainelOHLCV.de_dataframes({t: armazem.ler(t, inicio) for t in dict.fromkeys(tickers)}, dtype=dtype)
+    except: return painel.PainelOHLCV.de_dataframes({})
+
+def ler_armazem(ticker, inicio=None, periodo="1y"):
+    """OHLCV direto do armazém (sem sincronizar) a partir de `inicio` ou do começo do período."""
+    try: return armazem.ler(ticker, inicio if inicio is not None else fontes.inicio_periodo(periodo))
     except: return pd.DataFrame()
 
+def buscar_dados_multiticker(tickers, periodo="1y"):
+    if not tickers: return pd.DataFrame()
+    p = buscar_painel(tickers, periodo)
+    if p.vazio: return pd.DataFrame()
+    return p.fechamentos()
+
 def buscar_dados_detalhados(ticker, periodo="1y"):
     try:
-        df = yf.download(ticker, period=periodo, interval="1d", progress=False, auto_adjust=True)
-        if isinstance(df.columns, pd.MultiIndex): df.columns = df.columns.droplevel(1)
-        return df
+        sincronizar_armazem([ticker], periodo)
+        return armazem.ler(ticker, fontes.inicio_periodo(periodo))
     except: return pd.DataFrame()
 
 def buscar_preco_atual_blindado(ticker):
-    try:
-        t = yf.Ticker(ticker)
-        price = t.info.get('currentPrice') or t.info.get('regularMarketPrice')
-        if price: return price
-        hist = t.history(period='1d')
-        if not hist.empty: return hist['Close'].iloc[-1]
-        return 0.0
+    try: return fontes.obter_fonte().cotacao(ticker)
     except: return 0.0
 
 def buscar_macro():
     tickers = {'Dólar': 'USDBRL=X', 'Bitcoin': 'BTC-USD', 'S&P 500': '^GSPC'}
     res = {}
+    hist = fontes.obter_fonte().historico(list(tickers.values()), "5d")
     for nome, t in tickers.items():
         try:
-            df = yf.download(t, period="5d", progress=False)['Close']
-            if isinstance(df, pd.DataFrame): df = df.iloc[:, 0]
+            df = hist[t].dropna()
             if len(df) > 1:
                 val = df.iloc[-1]
                 var = ((val - df.iloc[-2])/df.iloc[-2])*100
@@ -53,8 +119,7 @@ def buscar_macro():
 # --- ATUALIZADO: MAIS DADOS FUNDAMENTALISTAS ---
 def buscar_info_fundamentalista(ticker):
     try:
-        t = yf.Ticker(ticker)
-        i = t.info
+        i = fontes.obter_fonte().fundamentos(ticker)
         raw_dy = i.get('dividendYield', 0) or 0
         
         # Novos Dados
@@ -104,6 +104,19 @@ def carregar_portfolio(uid):
             else: port[r['ativo']] = {'qtd':r['qtd'], 'pm':r['preco_medio']}
     return port
 
+def carregar_todos_portfolios():
+    """{user_id: portfolio} de todos os membros em uma única consulta (relatórios e GOD MODE)."""
+    conn = get_connection()
+    try: df = pd.read_sql("SELECT user_id, ativo, qtd, preco_medio FROM portfolio", conn)
+    except: df = pd.DataFrame()
+    conn.close()
+    ports = {}
+    for uid, ativo, qtd, pm in df.itertuples(index=False):
+        port = ports.setdefault(int(uid), {})
+        if ativo == 'Caixa': port['Caixa'] = qtd
+        else: port[ativo] = {'qtd': qtd, 'pm': pm}
+    return ports
+
 def carregar_historico(uid):
     conn = get_connection()
     try: df = pd.read_sql("SELECT * FROM trades WHERE user_id=? ORDER BY id DESC", conn, params=(uid,))
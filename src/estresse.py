@@ -0,0 +1,112 @@
+# Arquivo: E:\Consigliere\src\estresse.py
+# Módulo: The Hitman (Multi-Factor Betas & Historical Stress Scenarios)
+# Status: V1.0 - Regressão única / Cenários em lote
+
+import numpy as np
+import pandas as pd
+import risco as risk
+import sensibilidade as shadow
+
+# nome do fator -> ticker
+FATORES = {
+    'S&P 500': '^GSPC',
+    'Ibovespa': '^BVSP',
+    'Dólar': 'USDBRL=X',
+    'Petróleo': 'CL=F',
+    'Juros EUA 10a': '^TNX',
+}
+
+# Movimentos aproximados dos fatores em cada episódio (variação % do nível, pico -> vale do evento).
+# Fator ausente = 0. ^TNX é a taxa em si, então +100% = juro dobrou.
+CENARIOS = {
+    'Crise 2008 (Lehman)': {
+        'periodo': 'set-nov/2008',
+        'choques': {'S&P 500': -0.40, 'Ibovespa': -0.45, 'Dólar': 0.35, 'Petróleo': -0.50, 'Juros EUA 10a': -0.30}},
+    'Covid Crash': {
+        'periodo': '19/fev-23/mar/2020',
+        'choques': {'S&P 500': -0.34, 'Ibovespa': -0.45, 'Dólar': 0.17, 'Petróleo': -0.57, 'Juros EUA 10a': -0.50}},
+    'Joesley Day': {
+        'periodo': '17-18/mai/2017',
+        'choques': {'S&P 500': -0.018, 'Ibovespa': -0.088, 'Dólar': 0.081, 'Petróleo': 0.0, 'Juros EUA 10a': -0.02}},
+    'Choque de Juros 2022': {
+        'periodo': 'jan-jun/2022',
+        'choques': {'S&P 500': -0.23, 'Ibovespa': -0.07, 'Dólar': -0.09, 'Petróleo': 0.55, 'Juros EUA 10a': 1.15}},
+}
+
+# --- BETAS ---
+def _retornos(df_precos, colunas):
+    """Retornos com dias sem negociação valendo 0 (preço repetido), como o stress antigo."""
+    return df_precos[colunas].ffill().pct_change().iloc[1:].fillna(0)
+
+def matriz_betas(df_precos, ativos=None, fatores=FATORES):
+    """
+    Betas de todos os ativos contra todos os fatores numa única regressão (lstsq com
+    intercepto; as colunas de resposta são os ativos). Retorna DataFrame ativos x
+    (fatores..., 'Alfa', 'R²'). Fatores sem dados ficam com beta 0.
+    """
+    nomes = [n for n, t in fatores.items() if t in df_precos.columns]
+    if ativos is None: ativos = [c for c in df_precos.columns if c not in fatores.values()]
+    ativos = [a for a in ativos if a in df_precos.columns]
+    saida = pd.DataFrame(0.0, index=pd.Index(ativos, name='Ativo'), columns=list(fatores) + ['Alfa', 'R²'])
+    if not ativos or not nomes: return saida
+    rets = _retornos(df_precos, list(dict.fromkeys([fatores[n] for n in nomes] + ativos)))
+    if len(rets) <= len(nomes) + 1: return saida
+    F = rets[[fatores[n] for n in nomes]].to_numpy(dtype=float)
+    Y = rets[ativos].to_numpy(dtype=float)
+    X = np.column_stack([np.ones(len(F)), F])
+    coef = np.linalg.lstsq(X, Y, rcond=None)[0] # (1 + fatores) x ativos
+    resid = Y - X @ coef
+    sst = ((Y - Y.mean(axis=0)) ** 2).sum(axis=0)
+    saida[nomes] = coef[1:].T
+    saida['Alfa'] = coef[0]
+    saida['R²'] = np.where(sst > 0, 1 - (resid ** 2).sum(axis=0) / np.where(sst > 0, sst, 1), 0.0)
+    return saida
+
+def betas_simples(df_precos, ativos, benchmark):
+    """Beta de cada ativo contra um único benchmark (na falta dele, a média do mercado), via The Shadow."""
+    ativos = [a for a in ativos if a in df_precos.columns]
+    if benchmark in df_precos.columns: bench = _retornos(df_precos, [benchmark])[benchmark]
+    else: bench = _retornos(df_precos, list(df_precos.columns)).mean(axis=1)
+    est = shadow.estatisticas(_retornos(df_precos, ativos), bench, None, min_obs=2)
+    return pd.Series(est['Beta'][:, 0], index=ativos).fillna(1.0)
+
+# --- CENÁRIOS ---
+def matriz_cenarios(cenarios=CENARIOS, fatores=FATORES):
+    """DataFrame cenários x fatores com os choques (0 onde o cenário não fala do fator)."""
+    return pd.DataFrame({n: {f: c['choques'].get(f, 0.0) for f in fatores} for n, c in cenarios.items()}).T
+
+def choques_ativos(betas, cenarios=CENARIOS, fatores=FATORES):
+    """
+    Choque de cada ativo em cada cenário (cenários x ativos) = cenários x fatores @ betas.
+    Um ativo que É um fator recebe o choque do próprio fator; perda limitada a -100%.
+    """
+    S = matriz_cenarios(cenarios, fatores)
+    choques = S.to_numpy() @ betas[list(fatores)].to_numpy().T
+    choques = pd.DataFrame(choques, index=S.index, columns=betas.index)
+    for nome, ticker in fatores.items():
+        if ticker in choques.columns: choques[ticker] = S[nome]
+    return choques.clip(lower=-1.0)
+
+def estressar_carteiras(portfolios, df_precos, cenarios=CENARIOS, fatores=FATORES, betas=None):
+    """
+    P&L (R$) de todas as carteiras em todos os cenários numa passada:
+    exposições (carteiras x ativos) @ choquesᵀ (ativos x cenários).
+    Retorna (DataFrame carteiras x cenários em R$, DataFrame em % do investido).
+    """
+    expo = risk.exposicoes(portfolios, df_precos)
+    if expo.shape[1] == 0: return pd.DataFrame(index=expo.index, columns=list(cenarios)), pd.DataFrame(index=expo.index, columns=list(cenarios))
+    if betas is None: betas = matriz_betas(df_precos, list(expo.columns), fatores)
+    choques = choques_ativos(betas, cenarios, fatores).reindex(columns=expo.columns, fill_value=0.0)
+    pnl = expo.fillna(0.0) @ choques.T
+    investido = expo.sum(axis=1)
+    pct = pnl.div(investido.where(investido > 0), axis=0).fillna(0.0) * 100
+    return pnl, pct
+
+def detalhar_cenario(portfolio, df_precos, cenario, cenarios=CENARIOS, fatores=FATORES, betas=None):
+    """Impacto ativo a ativo de um cenário numa carteira: Valor, Choque %, P&L (R$)."""
+    expo = risk.exposicoes({'Carteira': portfolio}, df_precos)
+    if expo.shape[1] == 0: return pd.DataFrame(columns=['Valor', 'Choque %', 'P&L (R$)'])
+    if betas is None: betas = matriz_betas(df_precos, list(expo.columns), fatores)
+    choque = choques_ativos(betas, {cenario: cenarios[cenario]}, fatores).iloc[0].reindex(expo.columns, fill_value=0.0)
+    valor = expo.iloc[0]
+    return pd.DataFrame({'Valor': valor, 'Choque %': choque * 100, 'P&L (R$)': valor * choque})
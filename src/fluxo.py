@@ -0,0 +1,300 @@
+# Arquivo: E:\Consigliere\src\fluxo.py
+# Módulo: The Pulse (Streaming Indicators - O(1) por barra)
+# Status: V1.0
+
+import os
+import copy
+import math
+import pickle
+from collections import deque
+import fontes
+
+# Cada indicador guarda só o estado mínimo (somas + janela) e avança uma barra por
+# atualizar(). Os valores batem com as versões do cerebro/indicadores calculadas
+# sobre o histórico inteiro, exceto a VWAP, que é acumulada desde a 1ª barra vista.
+
+ESTADO_FILE = "estado_sentinela.pkl"
+VERSAO_ESTADO = 1
+NAN = float('nan')
+
+# --- BLOCOS BÁSICOS ---
+class MediaMovel:
+    """Média simples das últimas `janela` observações (NaN até encher a janela)."""
+
+    def __init__(self, janela):
+        self.janela = janela
+        self.valores = deque(maxlen=janela)
+        self.soma = 0.0
+        self._desde_recalculo = 0
+
+    def atualizar(self, x):
+        if len(self.valores) == self.janela: self.soma -= self.valores[0]
+        self.valores.append(x)
+        self.soma += x
+        # Recalcula a soma de tempos em tempos para não acumular erro de ponto flutuante
+        self._desde_recalculo += 1
+        if self._desde_recalculo >= self.janela:
+            self.soma = math.fsum(self.valores); self._desde_recalculo = 0
+        return self.valor
+
+    @property
+    def cheia(self): return len(self.valores) == self.janela
+
+    @property
+    def valor(self): return self.soma / self.janela if self.cheia else NAN
+
+class DesvioMovel:
+    """Desvio padrão móvel (ddof=1 por padrão, igual ao pandas rolling().std())."""
+
+    def __init__(self, janela, ddof=1):
+        self.janela = janela
+        self.ddof = ddof
+        self.valores = deque(maxlen=janela)
+        self.ref = None
+        self.s1 = 0.0; self.s2 = 0.0
+        self._desde_recalculo = 0
+
+    def _recalcular(self):
+        # Recentraliza na média atual da janela (mantém as somas pequenas e estáveis)
+        self.ref = math.fsum(self.valores) / len(self.valores)
+        self.s1 = math.fsum(v - self.ref for v in self.valores)
+        self.s2 = math.fsum((v - self.ref) ** 2 for v in self.valores)
+        self._desde_recalculo = 0
+
+    def atualizar(self, x):
+        if self.ref is None: self.ref = x
+        if len(self.valores) == self.janela:
+            y = self.valores[0] - self.ref
+            self.s1 -= y; self.s2 -= y * y
+        self.valores.append(x)
+        y = x - self.ref
+        self.s1 += y; self.s2 += y * y
+        self._desde_recalculo += 1
+        if self._desde_recalculo >= self.janela: self._recalcular()
+        return self.valor
+
+    @property
+    def valor(self):
+        n = len(self.valores)
+        if n < self.janela or n <= self.ddof: return NAN
+        return math.sqrt(max((self.s2 - self.s1 * self.s1 / n) / (n - self.ddof), 0.0))
+
+class MME:
+    """Média móvel exponencial com adjust=False (a 1ª barra semeia a média)."""
+
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1.0)
+        self.valor = NAN
+
+    def atualizar(self, x):
+        self.valor = x if math.isnan(self.valor) else self.alpha * x + (1 - self.alpha) * self.valor
+        return self.valor
+
+class RSI:
+    """
+    RSI incremental.
+    modo='simples': médias simples de ganhos/perdas (igual ao cerebro.calcular_rsi).
+    modo='wilder': suavização de Wilder (semeada pela média simples dos 1ºs períodos).
+    """
+
+    def __init__(self, periodo=14, modo='simples'):
+        self.periodo = periodo
+        self.modo = modo
+        self.anterior = None
+        self.ganhos = MediaMovel(periodo)
+        self.perdas = MediaMovel(periodo)
+        self.media_ganho = NAN; self.media_perda = NAN
+
+    def atualizar(self, preco):
+        # A 1ª barra entra com variação 0 (o pandas faz o mesmo com o delta NaN)
+        delta = 0.0 if self.anterior is None else preco - self.anterior
+        self.anterior = preco
+        g, l = max(delta, 0.0), max(-delta, 0.0)
+        if self.modo == 'wilder':
+            if math.isnan(self.media_ganho):
+                self.ganhos.atualizar(g); self.perdas.atualizar(l)
+                if self.ganhos.cheia: self.media_ganho, self.media_perda = self.ganhos.valor, self.perdas.valor
+            else:
+                p = self.periodo
+                self.media_ganho = (self.media_ganho * (p - 1) + g) / p
+                self.media_perda = (self.media_perda * (p - 1) + l) / p
+        else:
+            self.media_ganho = self.ganhos.atualizar(g)
+            self.media_perda = self.perdas.atualizar(l)
+        return self.valor
+
+    @property
+    def valor(self):
+        g, l = self.media_ganho, self.media_perda
+        if math.isnan(g) or math.isnan(l): return NAN
+        if l == 0: return 100.0 if g > 0 else NAN
+        return 100 - (100 / (1 + g / l))
+
+class ATR:
+    """Average True Range (média simples do True Range, como o cerebro)."""
+
+    def __init__(self, periodo=14):
+        self.fechamento_anterior = None
+        self.media = MediaMovel(periodo)
+
+    def atualizar(self, high, low, close):
+        faixas = [high - low]
+        if self.fechamento_anterior is not None:
+            faixas += [abs(high - self.fechamento_anterior), abs(low - self.fechamento_anterior)]
+        faixas = [f for f in faixas if not math.isnan(f)]
+        self.fechamento_anterior = close
+        if faixas: self.media.atualizar(max(faixas))
+        return self.valor
+
+    @property
+    def valor(self): return self.media.valor
+
+class VWAP:
+    """VWAP acumulada desde a primeira barra recebida."""
+
+    def __init__(self):
+        self.pv = 0.0; self.v = 0.0
+
+    def atualizar(self, preco, volume):
+        if not math.isnan(volume):
+            self.pv += preco * volume; self.v += volume
+        return self.valor
+
+    @property
+    def valor(self): return self.pv / self.v if self.v > 0 else NAN
+
+# --- ESTADO COMPLETO DE UM ATIVO ---
+class EstadoAtivo:
+    """
+    Todos os indicadores que a sentinela usa para um ativo, atualizados barra a barra.
+    A última barra recebida pode estar em formação (pregão aberto), então ela nunca
+    é consolidada: o estado "confirmado" vai até a penúltima barra e cada atualizar()
+    reaplica só a barra corrente sobre uma cópia (custo fixo, independente do histórico).
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.ultima_data = None
+        self.ultimo_close = None
+        self.sma20 = MediaMovel(20); self.sma50 = MediaMovel(50); self.sma200 = MediaMovel(200)
+        self.desvio20 = DesvioMovel(20)
+        self.mme9 = MME(9)
+        self.rsi = RSI(14)
+        self.rsi_wilder = RSI(14, modo='wilder')
+        self.atr = ATR(14)
+        self.vwap = VWAP()
+        # Features do oráculo (retorno, volatilidade de 5, momentum de 4 barras)
+        self.retornos = DesvioMovel(5)
+        self.retorno = NAN
+        self.closes = deque(maxlen=5)
+        self.corrente = None # cópia com a barra em formação aplicada
+
+    def _aplicar(self, data, o, h, l, c, v):
+        self.retorno = c / self.ultimo_close - 1 if self.ultimo_close else NAN
+        if not math.isnan(self.retorno): self.retornos.atualizar(self.retorno)
+        self.closes.append(c)
+        for ind in (self.sma20, self.sma50, self.sma200, self.desvio20, self.mme9, self.rsi, self.rsi_wilder):
+            ind.atualizar(c)
+        self.atr.atualizar(h, l, c)
+        self.vwap.atualizar(c, v)
+        self.n += 1
+        self.ultima_data = data
+        self.ultimo_close = c
+
+    def avancar(self, data, o, h, l, c, v):
+        """Consolida uma barra já fechada (replay histórico: uma barra por vez, sem cópia)."""
+        self.corrente = None
+        self._aplicar(data, o, h, l, c, v)
+
+    def retomar_de(self):
+        """Data a partir da qual o próximo lote de barras deve ser lido (inclusive)."""
+        return self.ultima_data
+
+    def atualizar(self, df):
+        """
+        Consome as barras de `df` (OHLCV) posteriores ao estado confirmado.
+        `df` deve começar na data de retomar_de() (ou ser o histórico inteiro num estado novo).
+        Retorna False se a barra confirmada mudou (ajuste de proventos, nova série):
+        nesse caso o estado deve ser reconstruído do zero.
+        """
+        if df is None or df.empty: return True
+        if self.ultima_data is not None:
+            if df.index[0] != self.ultima_data: return False
+            if abs(df['Close'].iloc[0] / self.ultimo_close - 1) > 1e-9: return False
+            df = df.iloc[1:]
+        linhas = list(zip(df.index, *(df[c].to_numpy(dtype=float) if c in df.columns else [NAN] * len(df)
+                                      for c in ['Open', 'High', 'Low', 'Close', 'Volume'])))
+        for linha in linhas[:-1]: self._aplicar(*linha)
+        if linhas:
+            self.corrente = None
+            self.corrente = copy.deepcopy(self)
+            self.corrente._aplicar(*linhas[-1])
+        return True
+
+    @property
+    def atual(self):
+        """Estado incluindo a barra mais recente (a que ainda pode mudar)."""
+        return self.corrente if self.corrente is not None else self
+
+    # --- LEITURAS (SEMPRE COM A BARRA CORRENTE) ---
+    @property
+    def barras(self): return self.atual.n
+
+    @property
+    def preco(self): return self.atual.ultimo_close
+
+    def indicadores(self):
+        e = self.atual
+        vwap, dp = e.vwap.valor, e.desvio20.valor
+        return {
+            'Close': e.ultimo_close, 'SMA20': e.sma20.valor, 'SMA50': e.sma50.valor, 'SMA200': e.sma200.valor,
+            'MME9': e.mme9.valor, 'RSI': e.rsi.valor, 'RSI_Wilder': e.rsi_wilder.valor, 'ATR': e.atr.valor,
+            'VWAP': vwap, 'VWAP_Upper': vwap + 2 * dp, 'VWAP_Lower': vwap - 2 * dp, 'STD20': dp
+        }
+
+    def features_ml(self):
+        """Última linha de features do oráculo (mesmas colunas de oraculo.FEATURES, NaN -> 0)."""
+        e = self.atual
+        momento = e.ultimo_close - e.closes[0] if len(e.closes) == 5 else NAN
+        feats = {
+            'Retorno': e.retorno,
+            'Volatilidade': e.retornos.valor,
+            'RSI': e.rsi.valor,
+            'Momentum': momento,
+            'SMA_Diff': e.ultimo_close - e.sma20.valor
+        }
+        return {k: (0.0 if v is None or math.isnan(v) else v) for k, v in feats.items()}
+
+# --- PERSISTÊNCIA ENTRE REINÍCIOS ---
+def carregar_estados(caminho=ESTADO_FILE):
+    """{ticker: EstadoAtivo} salvo pela última execução (vazio se não existir/for de outra fonte)."""
+    try:
+        with open(caminho, 'rb') as f: salvo = pickle.load(f)
+        if salvo.get('versao') != VERSAO_ESTADO or salvo.get('fonte') != fontes.obter_fonte().nome: return {}
+        return salvo['ativos']
+    except: return {}
+
+def salvar_estados(estados, caminho=ESTADO_FILE):
+    try:
+        tmp = caminho + ".tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump({'versao': VERSAO_ESTADO, 'fonte': fontes.obter_fonte().nome, 'ativos': estados}, f)
+        os.replace(tmp, caminho)
+        return True
+    except Exception as e:
+        print(f"Erro ao salvar estado: {e}")
+        return False
+
+def sincronizar_estado(estados, ticker, ler_barras):
+    """
+    Avança (ou cria) o estado de `ticker`.
+    `ler_barras(inicio)` devolve o OHLCV a partir de `inicio` (None = histórico inteiro).
+    Só as barras novas são lidas; se a série mudou, reconstrói do histórico inteiro.
+    """
+    estado = estados.get(ticker)
+    if estado is not None and estado.atualizar(ler_barras(estado.retomar_de())):
+        return estado
+    estado = EstadoAtivo()
+    estado.atualizar(ler_barras(None))
+    estados[ticker] = estado
+    return estado
@@ -0,0 +1,231 @@
+# Arquivo: E:\Consigliere\src\fontes.py
+# Módulo: The Wire (Market Data Providers)
+# Status: V1.0 - Yahoo + Offline (Fixtures / GBM Sintético)
+
+import os
+import json
+import zlib
+import re
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+CAMPOS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+def inicio_periodo(periodo):
+    """Converte o período do Yahoo ('6mo', '1y', 'ytd'...) na data inicial."""
+    hoje = pd.Timestamp.today().normalize()
+    if periodo == 'max': return None
+    if periodo == 'ytd': return pd.Timestamp(year=hoje.year, month=1, day=1)
+    m = re.fullmatch(r'(\d+)(d|wk|mo|y)', periodo)
+    if not m: return hoje - pd.DateOffset(years=1)
+    n, unidade = int(m.group(1)), m.group(2)
+    if unidade == 'd': return hoje - pd.Timedelta(days=n)
+    if unidade == 'wk': return hoje - pd.Timedelta(weeks=n)
+    if unidade == 'mo': return hoje - pd.DateOffset(months=n)
+    return hoje - pd.DateOffset(years=n)
+
+def _log_erro(contexto, e):
+    print(f"Erro Fonte ({contexto}): {e}")
+
+def _vazio_multiindex():
+    return pd.DataFrame(columns=pd.MultiIndex.from_tuples([], names=['Price', 'Ticker']))
+
+class FonteDados:
+    """
+    Contrato comum dos provedores de dados de mercado.
+    Todas as fontes devolvem os MESMOS formatos do yf.download(auto_adjust=True):
+    - baixar(): colunas MultiIndex (Campo, Ticker), índice 'Date' diário.
+    - historico(): só 'Close', um ativo por coluna.
+    - ohlcv(): OHLCV de um único ativo, colunas simples.
+    Falhas nunca propagam: retornam DataFrame vazio, {} ou 0.0.
+    """
+    nome = "base"
+
+    def _baixar(self, tickers, periodo=None, inicio=None):
+        raise NotImplementedError
+
+    def _info(self, ticker):
+        raise NotImplementedError
+
+    def baixar(self, tickers, periodo="1y", inicio=None):
+        if isinstance(tickers, str): tickers = [tickers]
+        if not tickers: return _vazio_multiindex()
+        try:
+            dados = self._baixar(list(tickers), None if inicio is not None else periodo, inicio)
+            return dados if dados is not None else _vazio_multiindex()
+        except Exception as e:
+            _log_erro(f"{self.nome}.baixar", e)
+            return _vazio_multiindex()
+
+    def historico(self, tickers, periodo="1y"):
+        if isinstance(tickers, str): tickers = [tickers]
+        dados = self.baixar(tickers, periodo)
+        if dados.empty or 'Close' not in dados.columns.get_level_values(0): return pd.DataFrame()
+        precos = dados['Close']
+        if isinstance(precos, pd.Series):
+            precos = precos.to_frame()
+            precos.columns = tickers
+        return precos
+
+    def ohlcv(self, ticker, periodo="1y"):
+        dados = self.baixar([ticker], periodo)
+        if dados.empty: return pd.DataFrame()
+        if isinstance(dados.columns, pd.MultiIndex): dados = dados.xs(ticker, axis=1, level=1)
+        return dados
+
+    def fundamentos(self, ticker):
+        """Dicionário no formato do yf.Ticker(t).info (chaves ausentes = sem dado)."""
+        try: return self._info(ticker) or {}
+        except Exception as e:
+            _log_erro(f"{self.nome}.fundamentos", e)
+            return {}
+
+    def cotacao(self, ticker):
+        info = self.fundamentos(ticker)
+        preco = info.get('currentPrice') or info.get('regularMarketPrice')
+        if preco: return preco
+        hist = self.historico([ticker], "5d")
+        if not hist.empty and ticker in hist.columns:
+            serie = hist[ticker].dropna()
+            if not serie.empty: return serie.iloc[-1]
+        return 0.0
+
+# --- YAHOO FINANCE (PRODUÇÃO) ---
+class FonteYahoo(FonteDados):
+    nome = "yahoo"
+
+    def _baixar(self, tickers, periodo=None, inicio=None):
+        if inicio is not None:
+            return yf.download(tickers, start=pd.Timestamp(inicio).strftime('%Y-%m-%d'), interval="1d", progress=False, auto_adjust=True)
+        return yf.download(tickers, period=periodo, interval="1d", progress=False, auto_adjust=True)
+
+    def _info(self, ticker):
+        return yf.Ticker(ticker).info
+
+    def cotacao(self, ticker):
+        try:
+            t = yf.Ticker(ticker)
+            price = t.info.get('currentPrice') or t.info.get('regularMarketPrice')
+            if price: return price
+            hist = t.history(period='1d')
+            if not hist.empty: return hist['Close'].iloc[-1]
+            return 0.0
+        except: return 0.0
+
+# --- OFFLINE (FIXTURES EM DISCO OU GBM SINTÉTICO) ---
+class FonteOffline(FonteDados):
+    """
+    Fonte determinística e sem rede, para testes e benchmarks.
+    Se `pasta` tiver <TICKER>.csv (Date,Open,High,Low,Close,Volume), usa o arquivo;
+    senão gera um Movimento Browniano Geométrico semeado pelo nome do ativo.
+    A série sintética parte sempre de `origem`, então qualquer janela do mesmo
+    ativo devolve exatamente os mesmos preços.
+    """
+    nome = "offline"
+
+    def __init__(self, pasta=None, seed=42, origem="2000-01-03", mu=0.08, sigma=0.25):
+        self.pasta = pasta
+        self.seed = seed
+        self.origem = pd.Timestamp(origem)
+        self.mu = mu
+        self.sigma = sigma
+        self._cache = {}
+
+    def _rng(self, ticker):
+        return np.random.default_rng([self.seed, zlib.crc32(ticker.encode())])
+
+    def _arquivo(self, ticker):
+        if not self.pasta: return None
+        caminho = os.path.join(self.pasta, f"{ticker}.csv")
+        return caminho if os.path.exists(caminho) else None
+
+    def _gerar(self, ticker):
+        if ticker in self._cache: return self._cache[ticker]
+        caminho = self._arquivo(ticker)
+        if caminho:
+            df = pd.read_csv(caminho, index_col=0, parse_dates=True)
+            df.index.name = 'Date'
+            df = df[[c for c in CAMPOS if c in df.columns]]
+        else:
+            hoje = pd.Timestamp.today().normalize()
+            # Cripto negocia todos os dias; o resto segue dias úteis
+            if ticker.endswith('-USD'): idx = pd.date_range(self.origem, hoje, freq='D', name='Date')
+            else: idx = pd.bdate_range(self.origem, hoje, name='Date')
+            n = len(idx)
+            rng = self._rng(ticker)
+            sigma = self.sigma * rng.uniform(0.6, 1.6)
+            dt = 1 / 252
+            log_ret = (self.mu - 0.5 * sigma**2) * dt + sigma * np.sqrt(dt) * rng.standard_normal(n)
+            close = rng.uniform(10, 200) * np.exp(np.cumsum(log_ret))
+            abertura = np.concatenate([[close[0]], close[:-1]]) * (1 + 0.002 * rng.standard_normal(n))
+            pavio = np.abs(rng.standard_normal((2, n))) * sigma * np.sqrt(dt) * 0.5
+            df = pd.DataFrame({
+                'Open': abertura,
+                'High': np.maximum(abertura, close) * (1 + pavio[0]),
+                'Low': np.minimum(abertura, close) * (1 - pavio[1]),
+                'Close': close,
+                'Volume': np.round(rng.lognormal(14, 0.5, n))
+            }, index=idx)
+        self._cache[ticker] = df
+        return df
+
+    def _baixar(self, tickers, periodo=None, inicio=None):
+        if inicio is None: inicio = inicio_periodo(periodo or "1y")
+        blocos = {}
+        for t in dict.fromkeys(tickers):
+            df = self._gerar(t)
+            blocos[t] = df[df.index >= pd.Timestamp(inicio)] if inicio is not None else df
+        dados = pd.concat(blocos, axis=1)
+        dados.columns.names = ['Ticker', 'Price']
+        return dados.swaplevel(0, 1, axis=1).sort_index(axis=1)
+
+    def _info(self, ticker):
+        if self.pasta:
+            caminho = os.path.join(self.pasta, "fundamentos.json")
+            if os.path.exists(caminho):
+                with open(caminho, 'r', encoding='utf-8') as f: base = json.load(f)
+                if ticker in base: return base[ticker]
+        rng = self._rng(ticker + "#info")
+        preco = float(self._gerar(ticker)['Close'].iloc[-1])
+        lpa = preco / rng.uniform(4, 25)
+        return {
+            'currentPrice': preco,
+            'regularMarketPrice': preco,
+            'trailingEps': lpa,
+            'trailingPE': preco / lpa,
+            'bookValue': preco / rng.uniform(0.6, 3.0),
+            'dividendYield': rng.uniform(0, 0.12),
+            'returnOnEquity': rng.uniform(-0.05, 0.30),
+            'profitMargins': rng.uniform(-0.02, 0.25),
+            'sector': 'Sintético',
+            'longName': f"{ticker} (Offline)"
+        }
+
+    def cotacao(self, ticker):
+        try: return float(self._gerar(ticker)['Close'].iloc[-1])
+        except Exception as e:
+            _log_erro(f"{self.nome}.cotacao", e)
+            return 0.0
+
+# --- SELEÇÃO DA FONTE ATIVA ---
+_FONTE_ATIVA = None
+
+def obter_fonte():
+    """
+    Fonte usada por todo o sistema.
+    CONSIGLIERE_FONTE=offline liga a fonte sem rede (CONSIGLIERE_FIXTURES = pasta de CSVs).
+    """
+    global _FONTE_ATIVA
+    if _FONTE_ATIVA is None:
+        if os.getenv("CONSIGLIERE_FONTE", "yahoo").lower() == "offline":
+            _FONTE_ATIVA = FonteOffline(pasta=os.getenv("CONSIGLIERE_FIXTURES"))
+        else:
+            _FONTE_ATIVA = FonteYahoo()
+    return _FONTE_ATIVA
+
+def definir_fonte(fonte):
+    """Troca a fonte ativa (ex.: FonteOffline() em testes e benchmarks)."""
+    global _FONTE_ATIVA
+    _FONTE_ATIVA = fonte
+    return fonte
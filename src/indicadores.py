@@ -0,0 +1,183 @@
+# Arquivo: E:\Consigliere\src\indicadores.py
+# Módulo: The Engine Room (Vectorized Multi-Asset Indicators)
+# Status: V1.0 - NumPy / 2-D
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+# Todas as funções recebem uma matriz (tempo x ativos) — ndarray, DataFrame ou Series —
+# e devolvem matrizes alinhadas no mesmo formato de entrada.
+# Cada coluna é tratada como o histórico do ativo SEM os NaN (igual ao dropna() que o
+# cerebro faz por ativo): os valores válidos são compactados no fim da matriz, os
+# indicadores rodam de uma vez para todas as colunas e o resultado volta às datas originais.
+
+# --- COMPACTAÇÃO (EQUIVALENTE VETORIZADO DO dropna POR COLUNA) ---
+def compactar(matriz, referencia=None):
+    """
+    Empurra os valores válidos de cada coluna para o fim, preservando a ordem.
+    `referencia` define quais linhas são válidas (padrão: a própria matriz).
+    Retorna (matriz_compactada, ordem, n_validos).
+    """
+    base = matriz if referencia is None else referencia
+    validos = ~np.isnan(base)
+    ordem = np.argsort(validos, axis=0, kind='stable')
+    return np.take_along_axis(matriz, ordem, axis=0), ordem, validos.sum(axis=0)
+
+def expandir(compacta, ordem, n_validos):
+    """Desfaz compactar(): devolve cada valor à sua data original (NaN onde não havia dado)."""
+    T = compacta.shape[0]
+    compacta = np.where(np.arange(T)[:, None] >= T - n_validos, compacta, np.nan)
+    saida = np.empty_like(compacta)
+    np.put_along_axis(saida, ordem, compacta, axis=0)
+    return saida
+
+def _entrada(x):
+    """Normaliza a entrada para ndarray 2-D float e devolve a função que reconstrói o formato original."""
+    if isinstance(x, pd.DataFrame):
+        return x.to_numpy(dtype=float), lambda a: pd.DataFrame(a, index=x.index, columns=x.columns)
+    if isinstance(x, pd.Series):
+        return x.to_numpy(dtype=float)[:, None], lambda a: pd.Series(a[:, 0], index=x.index, name=x.name)
+    arr = np.asarray(x, dtype=float)
+    if arr.ndim == 1: return arr[:, None], lambda a: a[:, 0]
+    return arr, lambda a: a
+
+# --- NÚCLEOS (MATRIZ JÁ COMPACTADA: SÓ NaN NO TOPO) ---
+def _media_movel(X, janela, validos=None):
+    """
+    Média móvel simples (exige `janela` valores válidos). Janela a janela pelo rolling do
+    pandas, não por diferença de somas acumuladas: trechos parados e empates (SMA50 = SMA200)
+    saem exatos, sem resíduo de ±1e-17.
+    """
+    if validos is not None: X = np.where(validos, X, np.nan)
+    return pd.DataFrame(X).rolling(janela).mean().to_numpy()
+
+def _desvio_movel(X, janela, ddof=1):
+    """Desvio padrão móvel pelo rolling do pandas (janela constante dá 0 exato)."""
+    if janela <= ddof: return np.full(X.shape, np.nan)
+    return pd.DataFrame(X).rolling(janela).std(ddof=ddof).to_numpy()
+
+def _ema(X, span):
+    """EMA com adjust=False (mesma recursão do pandas ewm) em todas as colunas via lfilter."""
+    alpha = 2.0 / (span + 1.0)
+    validos = ~np.isnan(X)
+    if not validos.any(): return np.full(X.shape, np.nan)
+    primeiro = validos.argmax(axis=0)
+    x0 = X[primeiro, np.arange(X.shape[1])]
+    # Padding no topo recebe o 1º valor válido: a EMA fica constante até o dado começar
+    Y = np.where(validos, X, x0)
+    Y = np.nan_to_num(Y)
+    zi = ((1 - alpha) * np.nan_to_num(x0))[None, :]
+    out, _ = lfilter([alpha], [1.0, -(1 - alpha)], Y, axis=0, zi=zi)
+    out[~validos] = np.nan
+    return out
+
+def _rsi(X, periodo=14):
+    """RSI por médias simples de ganhos/perdas (a mesma fórmula do cerebro.calcular_rsi)."""
+    validos = ~np.isnan(X)
+    delta = np.full(X.shape, np.nan)
+    delta[1:] = X[1:] - X[:-1]
+    # Igual ao pandas .where(delta > 0, 0): o primeiro delta (NaN) vira 0
+    ganho = np.where(delta > 0, delta, 0.0)
+    perda = np.where(delta < 0, -delta, 0.0)
+    g = _media_movel(ganho, periodo, validos)
+    l = _media_movel(perda, periodo, validos)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = g / l
+        return 100 - (100 / (1 + rs))
+
+def _true_range(H, L, C):
+    c_ant = np.full(C.shape, np.nan); c_ant[1:] = C[:-1]
+    faixas = np.stack([H - L, np.abs(H - c_ant), np.abs(L - c_ant)])
+    with np.errstate(invalid='ignore'):
+        todas_nan = np.isnan(faixas).all(axis=0)
+        tr = np.nanmax(np.where(np.isnan(faixas), -np.inf, faixas), axis=0)
+    tr[todas_nan] = np.nan
+    return tr
+
+# --- API PÚBLICA (QUALQUER FORMATO, COM NaN EM QUALQUER LUGAR) ---
+def _aplicar(x, nucleo, *args):
+    arr, montar = _entrada(x)
+    P, ordem, n = compactar(arr)
+    return montar(expandir(nucleo(P, *args), ordem, n))
+
+def sma(x, janela):
+    return _aplicar(x, _media_movel, janela)
+
+def desvio_movel(x, janela=20, ddof=1):
+    return _aplicar(x, _desvio_movel, janela, ddof)
+
+def ema(x, span):
+    return _aplicar(x, _ema, span)
+
+def rsi(x, periodo=14):
+    return _aplicar(x, _rsi, periodo)
+
+def macd(x, rapida=12, lenta=26, sinal=9):
+    """Retorna (macd, sinal, histograma)."""
+    arr, montar = _entrada(x)
+    P, ordem, n = compactar(arr)
+    linha = _ema(P, rapida) - _ema(P, lenta)
+    sig = _ema(linha, sinal)
+    return tuple(montar(expandir(m, ordem, n)) for m in (linha, sig, linha - sig))
+
+def bollinger(x, janela=20, k=2.0):
+    """Retorna (média, banda superior, banda inferior)."""
+    arr, montar = _entrada(x)
+    P, ordem, n = compactar(arr)
+    media = _media_movel(P, janela)
+    dp = _desvio_movel(P, janela)
+    return tuple(montar(expandir(m, ordem, n)) for m in (media, media + k * dp, media - k * dp))
+
+def atr(high, low, close, periodo=14):
+    """Average True Range (média simples do True Range, como o cerebro)."""
+    C, montar = _entrada(close)
+    H = _entrada(high)[0]; L = _entrada(low)[0]
+    Pc, ordem, n = compactar(C)
+    Ph = np.take_along_axis(H, ordem, axis=0); Pl = np.take_along_axis(L, ordem, axis=0)
+    return montar(expandir(_media_movel(_true_range(Ph, Pl, Pc), periodo), ordem, n))
+
+def vwap(close, volume):
+    """VWAP acumulada desde o início do histórico de cada ativo."""
+    C, montar = _entrada(close)
+    V = _entrada(volume)[0]
+    Pc, ordem, n = compactar(C)
+    Pv = np.take_along_axis(V, ordem, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = np.nancumsum(Pc * Pv, axis=0) / np.nancumsum(np.where(np.isnan(Pc), np.nan, Pv), axis=0)
+    return montar(expandir(out, ordem, n))
+
+def calcular_indicadores(close, high=None, low=None, volume=None,
+                         smas=(20, 50, 200), emas=(9,), periodo_rsi=14, janela_bb=20, k_bb=2.0):
+    """
+    Bateria completa em UMA passada sobre o painel (tempo x ativos).
+    Retorna {nome: matriz} no formato da entrada ('RSI', 'SMA50', 'EMA9', 'MACD',
+    'BB_Upper', 'STD20', 'ATR', 'VWAP'...). ATR exige high/low; VWAP exige volume.
+    """
+    C, montar = _entrada(close)
+    P, ordem, n = compactar(C)
+    brutos = {}
+    for j in smas: brutos[f'SMA{j}'] = _media_movel(P, j)
+    for s in emas: brutos[f'EMA{s}'] = _ema(P, s)
+    brutos['RSI'] = _rsi(P, periodo_rsi)
+    linha = _ema(P, 12) - _ema(P, 26); sig = _ema(linha, 9)
+    brutos['MACD'] = linha; brutos['MACD_Signal'] = sig; brutos['MACD_Hist'] = linha - sig
+    media_bb = brutos.get(f'SMA{janela_bb}')
+    if media_bb is None: media_bb = _media_movel(P, janela_bb)
+    dp = _desvio_movel(P, janela_bb)
+    brutos[f'STD{janela_bb}'] = dp
+    brutos['BB_Upper'] = media_bb + k_bb * dp
+    brutos['BB_Lower'] = media_bb - k_bb * dp
+    if high is not None and low is not None:
+        Ph = np.take_along_axis(_entrada(high)[0], ordem, axis=0)
+        Pl = np.take_along_axis(_entrada(low)[0], ordem, axis=0)
+        brutos['ATR'] = _media_movel(_true_range(Ph, Pl, P), 14)
+    if volume is not None:
+        Pv = np.take_along_axis(_entrada(volume)[0], ordem, axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            brutos['VWAP'] = np.nancumsum(P * Pv, axis=0) / np.nancumsum(np.where(np.isnan(P), np.nan, Pv), axis=0)
+    return {k: montar(expandir(v, ordem, n)) for k, v in brutos.items()}
+
+def calcular_indicadores_painel(painel, **kwargs):
+    """Atalho para um PainelOHLCV: usa Close/High/Low/Volume do próprio painel."""
+    return calcular_indicadores(painel.campo('Close'), painel.campo('High'), painel.campo('Low'), painel.campo('Volume'), **kwargs)
@@ -2,13 +2,14 @@
 # Módulo: The Governor (Global Macro Analysis)
 # Status: V1.0 - Market Regimes
 
-import yfinance as yf
 import pandas as pd
 import numpy as np
+import time
+import fontes
 
-def coletar_dados_macro():
+def coletar_dados_macro(periodo="1mo"):
     """
-    Coleta os principais indicadores globais.
+    Coleta os principais indicadores globais (`periodo` maior = histórico para o replay).
     """
     tickers = {
         'Equities (S&P 500)': '^GSPC',
@@ -21,10 +22,7 @@ def coletar_dados_macro():
     
     try:
         # Baixa dados dos últimos 20 dias para pegar tendência curta
-        df = yf.download(list(tickers.values()), period="1mo", progress=False)['Close']
-        
-        # Ajuste se baixar apenas 1 ativo (series) vs vários (dataframe)
-        if isinstance(df, pd.Series): df = df.to_frame()
+        df = fontes.obter_fonte().historico(list(tickers.values()), periodo)
         
         # Renomear colunas para facilitar
         inv_tickers = {v: k for k, v in tickers.items()}
@@ -81,6 +79,44 @@ def definir_regime_mercado(df_macro):
         
     return regime, explicacao, cor
 
+# --- CONTEXTO MACRO COMPARTILHADO (1x POR CICLO) ---
+CONTEXTO_TTL = 900 # 15 min
+_CONTEXTO_CACHE = {'contexto': None}
+
+def calcular_penalidade_regime(regime):
+    """Pontos retirados do score do Capo conforme o regime global."""
+    if "PANIC" in regime or "CAPITULATION" in regime: return 30 # Tira 30 pontos do score em pânico
+    if "RECESSION" in regime or "INFLATION" in regime: return 15 # Tira 15 pontos em cenários ruins
+    return 0
+
+def montar_contexto_macro(df_macro=None):
+    """
+    Fotografia do regime de mercado para ser reaproveitada por todos os ativos
+    de um ranking/ciclo: regime, explicação, cor, penalidade e horário.
+    """
+    if df_macro is None: df_macro = coletar_dados_macro()
+    regime, explicacao, cor = "Dados Indisponíveis", "Neutro", "#FFFFFF"
+    try:
+        res = definir_regime_mercado(df_macro)
+        if len(res) == 3: regime, explicacao, cor = res
+    except Exception as e:
+        print(f"Erro Regime: {e}") # Segue o jogo sem penalidade se falhar macro
+    return {
+        'regime': regime,
+        'explicacao': explicacao,
+        'cor': cor,
+        'penalidade': calcular_penalidade_regime(regime),
+        'timestamp': time.time()
+    }
+
+def obter_contexto_macro(ttl=CONTEXTO_TTL, forcar=False):
+    """Contexto macro cacheado em memória por `ttl` segundos."""
+    ctx = _CONTEXTO_CACHE['contexto']
+    if forcar or ctx is None or (time.time() - ctx['timestamp']) > ttl:
+        ctx = montar_contexto_macro()
+        _CONTEXTO_CACHE['contexto'] = ctx
+    return ctx
+
 def gerar_radar_forcas(df_macro):
     """
     Retorna valores normalizados (0-100) para um gráfico de radar das forças do mercado.
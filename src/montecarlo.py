@@ -0,0 +1,142 @@
+# Arquivo: E:\Consigliere\src\montecarlo.py
+# Módulo: The Casino (Vectorized Multi-Asset Monte Carlo)
+# Status: V1.0 - Cholesky / Bootstrap / Block Bootstrap
+
+import numpy as np
+import pandas as pd
+
+PERCENTIS = (5, 25, 50, 75, 95)
+MEMORIA_MAX = 64 * 1024**2 # bytes por lote de simulação (mantém a RAM limitada)
+N_FAIXAS = 2000            # resolução do histograma por dia usado nos percentis
+
+# --- PREPARO ---
+def pesos_da_carteira(portfolio, df_precos):
+    """
+    Pesos reais da carteira (qtd x último preço / total), só com ativos que têm preço.
+    Retorna (pd.Series de pesos, valor investido).
+    """
+    valores = {}
+    for ativo, dados in portfolio.items():
+        if ativo == 'Caixa' or ativo not in df_precos.columns: continue
+        qtd = dados['qtd'] if isinstance(dados, dict) else dados
+        serie = df_precos[ativo].dropna()
+        if qtd > 0 and not serie.empty: valores[ativo] = qtd * serie.iloc[-1]
+    total = sum(valores.values())
+    if total <= 0: return pd.Series(dtype=float), 0.0
+    return pd.Series(valores) / total, total
+
+def fator_cholesky(cov):
+    """Cholesky da covariância; se não for positiva definida, corrige os autovalores negativos."""
+    cov = np.asarray(cov, dtype=float)
+    try: return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        val, vec = np.linalg.eigh((cov + cov.T) / 2)
+        ajustada = (vec * np.maximum(val, 1e-12)) @ vec.T
+        return np.linalg.cholesky(ajustada + 1e-12 * np.eye(len(cov)))
+
+def _tamanho_lote(dias, n_ativos, n_sims):
+    return int(max(1, min(n_sims, MEMORIA_MAX // (8 * dias * max(n_ativos, 1) * 2))))
+
+def _geradores(seed, n_lotes):
+    """Um gerador independente por lote (SeedSequence.spawn): mesma seed -> mesmo resultado."""
+    return [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(n_lotes)]
+
+def _indices_bootstrap(rng, n, dias, T, bloco):
+    """Índices de dias históricos sorteados; bloco > 1 sorteia trechos contínuos (circulares)."""
+    if bloco <= 1: return rng.integers(0, T, size=(n, dias))
+    n_blocos = -(-dias // bloco)
+    inicios = rng.integers(0, T, size=(n, n_blocos, 1))
+    return ((inicios + np.arange(bloco)) % T).reshape(n, -1)[:, :dias]
+
+# --- CAMINHOS POR ATIVO ---
+def gerar_retornos_ativos(retornos, dias=252, n_sims=1000, metodo='normal', bloco=10, seed=None, cov=None):
+    """
+    Gerador de lotes (n, dias, ativos) de retornos diários correlacionados.
+    metodo='normal': mu + Z·Lᵀ (Cholesky da covariância histórica);
+    'bootstrap' / 'bloco': sorteia dias históricos inteiros (preserva correlação e caudas).
+    `cov` = covariância diária já estimada (ex.: covariancia.covariancia); None = amostral de `retornos`.
+    """
+    R = retornos.to_numpy(dtype=float) if isinstance(retornos, pd.DataFrame) else np.asarray(retornos, dtype=float)
+    T, N = R.shape
+    lote = _tamanho_lote(dias, N, n_sims)
+    n_lotes = -(-n_sims // lote)
+    mu = R.mean(axis=0)
+    if cov is None: cov = np.cov(R, rowvar=False).reshape(N, N)
+    L = fator_cholesky(cov) if metodo == 'normal' else None
+    for k, rng in enumerate(_geradores(seed, n_lotes)):
+        n = min(lote, n_sims - k * lote)
+        if metodo == 'normal': yield mu + rng.standard_normal((n, dias, N)) @ L.T
+        else: yield R[_indices_bootstrap(rng, n, dias, T, bloco if metodo == 'bloco' else 1)]
+
+# --- CARTEIRA ---
+def _retornos_carteira_lotes(retornos, pesos, dias, n_sims, metodo, bloco, seed, cov=None):
+    """
+    Lotes (n, dias) de retornos diários da carteira (rebalanceada diariamente).
+    Como a carteira é w·r, basta projetar antes de sortear: no modo normal
+    w·(mu + L·z) tem exatamente a distribuição N(w·mu, wᵀΣw); no bootstrap o
+    sorteio de dias históricos de R·w equivale a sortear R e projetar depois.
+    """
+    R = retornos.to_numpy(dtype=float) if isinstance(retornos, pd.DataFrame) else np.asarray(retornos, dtype=float)
+    h = R @ np.asarray(pesos, dtype=float)
+    T = len(h)
+    lote = _tamanho_lote(dias, 1, n_sims)
+    n_lotes = -(-n_sims // lote)
+    if cov is None: cov = np.cov(R, rowvar=False).reshape(R.shape[1], R.shape[1])
+    mu = h.mean(); sigma = np.sqrt(np.asarray(pesos) @ np.asarray(cov, dtype=float) @ np.asarray(pesos))
+    for k, rng in enumerate(_geradores(seed, n_lotes)):
+        n = min(lote, n_sims - k * lote)
+        if metodo == 'normal': yield mu + sigma * rng.standard_normal((n, dias))
+        else: yield h[_indices_bootstrap(rng, n, dias, T, bloco if metodo == 'bloco' else 1)]
+
+def simular_carteira(retornos, pesos=None, capital=100000, dias=252, n_sims=10000, metodo='normal',
+                     bloco=10, seed=None, percentis=PERCENTIS, cov=None):
+    """
+    Monte Carlo da carteira sem guardar os caminhos: cada lote alimenta um histograma
+    por dia (em log-valor), de onde saem as bandas de percentis.
+    Retorna {'bandas': DataFrame (dia x percentil), 'media': array, 'prob_perda': float,
+             'final': {percentil: valor final}}.
+    """
+    R = retornos.to_numpy(dtype=float) if isinstance(retornos, pd.DataFrame) else np.asarray(retornos, dtype=float)
+    R = R[~np.isnan(R).any(axis=1)]
+    if len(R) < 2: return None
+    N = R.shape[1]
+    w = np.full(N, 1 / N) if pesos is None else np.asarray(pesos, dtype=float)
+    h = R @ w
+    # Grade de log-valor por dia: ±10 desvios ao redor da média (as pontas acumulam o excedente)
+    lr = np.log1p(np.clip(h, -0.99, None))
+    t = np.arange(1, dias + 1)
+    centro = lr.mean() * t; largura = 10 * max(lr.std(), 1e-6) * np.sqrt(t) + 1e-9
+    lo = centro - largura; passo = 2 * largura / N_FAIXAS
+    contagem = np.zeros(dias * N_FAIXAS)
+    soma = np.zeros(dias); perdas = 0
+    for lote in _retornos_carteira_lotes(R, w, dias, n_sims, metodo, bloco, seed, cov):
+        logv = np.cumsum(np.log1p(np.clip(lote, -0.99, None)), axis=1)
+        soma += capital * np.exp(logv).sum(axis=0)
+        perdas += int((logv[:, -1] < 0).sum())
+        idx = np.clip(((logv - lo) / passo).astype(np.int64), 0, N_FAIXAS - 1) + np.arange(dias) * N_FAIXAS
+        contagem += np.bincount(idx.ravel(), minlength=dias * N_FAIXAS)
+    acumulado = np.cumsum(contagem.reshape(dias, N_FAIXAS), axis=1) / n_sims
+    bandas = {}
+    for p in percentis:
+        # Interpolação linear dentro da faixa onde o acumulado cruza o percentil
+        j = np.clip((acumulado < p / 100).sum(axis=1), 0, N_FAIXAS - 1)
+        antes = np.where(j > 0, acumulado[t - 1, j - 1], 0.0)
+        frac = np.where(acumulado[t - 1, j] > antes, (p / 100 - antes) / (acumulado[t - 1, j] - antes), 0.5)
+        bandas[f"P{p}"] = capital * np.exp(lo + passo * (j + np.clip(frac, 0, 1)))
+    df_bandas = pd.DataFrame(bandas, index=pd.RangeIndex(1, dias + 1, name='Dia'))
+    return {
+        'bandas': df_bandas,
+        'media': soma / n_sims,
+        'prob_perda': perdas / n_sims,
+        'final': df_bandas.iloc[-1].to_dict()
+    }
+
+def simular_caminhos(retornos, pesos=None, capital=100000, dias=252, n_sims=50, metodo='normal', bloco=10, seed=None, cov=None):
+    """Caminhos completos (dias x simulações) da carteira — só para poucos caminhos (gráficos/compatibilidade)."""
+    R = retornos.to_numpy(dtype=float) if isinstance(retornos, pd.DataFrame) else np.asarray(retornos, dtype=float)
+    R = R[~np.isnan(R).any(axis=1)]
+    if len(R) < 2: return np.zeros((dias, n_sims))
+    N = R.shape[1]
+    w = np.full(N, 1 / N) if pesos is None else np.asarray(pesos, dtype=float)
+    lotes = list(_retornos_carteira_lotes(R, w, dias, n_sims, metodo, bloco, seed, cov))
+    return capital * np.cumprod(1 + np.concatenate(lotes), axis=1).T
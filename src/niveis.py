@@ -0,0 +1,165 @@
+# Arquivo: E:\Consigliere\src\niveis.py
+# Módulo: The Cartographer (Pivots, Support & Resistance Zones)
+# Status: V1.0 - O(n) / Multi-Ativo
+
+import numpy as np
+import pandas as pd
+import indicadores as engine
+
+JANELA_PADRAO = 20
+TOLERANCIA_PADRAO = 0.015 # níveis a menos de 1,5% um do outro formam a mesma zona
+MEIA_VIDA = 120           # pregões: pivôs antigos pesam metade na força da zona
+_CACHE_NIVEIS = {}        # (ticker, última barra, parâmetros) -> resultado
+_CACHE_MAX = 512
+COLUNAS = ['Tipo', 'Preço', 'Inferior', 'Superior', 'Pivôs', 'Toques', 'Força', 'Idade']
+
+# --- EXTREMOS DESLIZANTES EM O(n) ---
+def _extremo_movel(x, janela, func):
+    """
+    Mínimo/máximo da janela que TERMINA em cada linha, para todas as colunas de uma vez
+    (algoritmo de van Herk/Gil-Werman: acumulados por bloco em O(n), independente da janela).
+    NaN dentro da janela ou janela incompleta -> NaN, como o rolling do pandas.
+    """
+    x = np.asarray(x, dtype=float)
+    T = x.shape[0]
+    out = np.full(x.shape, np.nan)
+    if janela > T or janela < 1: return out
+    blocos = -(-T // janela)
+    pad = np.full((blocos * janela - T,) + x.shape[1:], np.nan)
+    b = np.concatenate([x, pad]).reshape((blocos, janela) + x.shape[1:])
+    prefixo = func.accumulate(b, axis=1).reshape((-1,) + x.shape[1:])
+    sufixo = func.accumulate(b[:, ::-1], axis=1)[:, ::-1].reshape((-1,) + x.shape[1:])
+    fim = np.arange(janela - 1, T)
+    out[janela - 1:] = func(sufixo[fim - janela + 1], prefixo[fim])
+    return out
+
+def _extremo_centrado(x, janela, func):
+    """Mesma janela do rolling(janela, center=True) do pandas."""
+    movel = _extremo_movel(x, janela, func)
+    desloc = (janela - 1) - janela // 2
+    out = np.full(movel.shape, np.nan)
+    if desloc: out[:-desloc] = movel[desloc:]
+    else: out[:] = movel
+    return out
+
+def detectar_pivos(high, low, janela=JANELA_PADRAO):
+    """
+    Pivôs de topo/fundo (a máxima/mínima da barra é o extremo da janela centrada).
+    Aceita 1-D (um ativo) ou tempo x ativos; dias sem negociação (NaN) são pulados,
+    então a janela é sempre de `janela` pregões do próprio ativo.
+    Retorna (fundos, topos) como arrays bool.
+    """
+    high = np.asarray(high, dtype=float); low = np.asarray(low, dtype=float)
+    um_ativo = high.ndim == 1
+    if um_ativo: high, low = high[:, None], low[:, None]
+    Pl, ordem, n = engine.compactar(low)
+    Ph = np.take_along_axis(high, ordem, axis=0)
+    with np.errstate(invalid='ignore'):
+        fundos = (Pl == _extremo_centrado(Pl, janela, np.minimum)).astype(float)
+        topos = (Ph == _extremo_centrado(Ph, janela, np.maximum)).astype(float)
+    fundos = engine.expandir(fundos, ordem, n) == 1
+    topos = engine.expandir(topos, ordem, n) == 1
+    return (fundos[:, 0], topos[:, 0]) if um_ativo else (fundos, topos)
+
+# --- ZONAS ---
+def _agrupar(niveis, idades, tolerancia):
+    """
+    Agrupa níveis em zonas: em ordem crescente, um nível entra na zona aberta enquanto
+    estiver a menos de `tolerancia` do piso dela (a zona nunca passa dessa largura).
+    """
+    ordem = np.argsort(niveis)
+    niveis, idades = niveis[ordem], idades[ordem]
+    grupo = np.empty(len(niveis), dtype=np.int64)
+    g, piso = -1, -np.inf
+    for i, v in enumerate(niveis):
+        if v > piso * (1 + tolerancia): g += 1; piso = v
+        grupo[i] = g
+    return niveis, idades, grupo
+
+def _montar_zonas(high, low, close, fundos, topos, tolerancia, max_zonas):
+    validos = ~np.isnan(close)
+    if not validos.any(): return pd.DataFrame(columns=COLUNAS)
+    ultimo = np.flatnonzero(validos)[-1]
+    preco = close[ultimo]
+    pos = np.concatenate([np.flatnonzero(fundos), np.flatnonzero(topos)])
+    niveis = np.concatenate([low[fundos], high[topos]])
+    if len(niveis) == 0: return pd.DataFrame(columns=COLUNAS)
+    # Idade em pregões (barras sem negociação não contam)
+    sessao = np.cumsum(validos) - 1
+    idades = sessao[ultimo] - sessao[pos]
+    niveis, idades, grupo = _agrupar(niveis, idades, tolerancia)
+    n = grupo[-1] + 1
+    peso = 0.5 ** (idades / MEIA_VIDA)
+    inicios = np.flatnonzero(np.r_[True, np.diff(grupo) > 0])
+    inferior = np.minimum.reduceat(niveis, inicios)
+    superior = np.maximum.reduceat(niveis, inicios)
+    centro = np.bincount(grupo, weights=niveis * peso, minlength=n) / np.bincount(grupo, weights=peso, minlength=n)
+    pivos = np.bincount(grupo, minlength=n)
+    idade = np.full(n, np.iinfo(np.int64).max); np.minimum.at(idade, grupo, idades)
+    # Toques: barras cujo range cruzou a faixa da zona (todas as zonas contra todas as barras)
+    h, l = high[validos], low[validos]
+    with np.errstate(invalid='ignore'):
+        toques = ((l[None, :] <= superior[:, None]) & (h[None, :] >= inferior[:, None])).sum(axis=1)
+    forca_bruta = np.bincount(grupo, weights=peso, minlength=n) * np.log1p(toques)
+    forca = 100 * forca_bruta / forca_bruta.max() if forca_bruta.max() > 0 else np.zeros(n)
+    zonas = pd.DataFrame({
+        'Tipo': np.where(centro < preco, 'Suporte', 'Resistência'),
+        'Preço': centro, 'Inferior': inferior, 'Superior': superior,
+        'Pivôs': pivos, 'Toques': toques, 'Força': forca.round(1), 'Idade': idade
+    })
+    # As mais fortes de cada lado do preço (metade das vagas para suportes, metade para resistências)
+    por_lado = -(-max_zonas // 2)
+    zonas = zonas.sort_values('Força', ascending=False, kind='stable').groupby('Tipo', sort=False).head(por_lado)
+    return zonas.sort_values('Preço').reset_index(drop=True)
+
+def _memo(chave, calcular):
+    if chave is None: return calcular()
+    if chave not in _CACHE_NIVEIS:
+        if len(_CACHE_NIVEIS) >= _CACHE_MAX: _CACHE_NIVEIS.clear()
+        _CACHE_NIVEIS[chave] = calcular()
+    return _CACHE_NIVEIS[chave]
+
+def _chave(ticker, df, *params):
+    if ticker is None or df.empty: return None
+    return (ticker, df.index[-1], len(df), float(df['Close'].iloc[-1])) + params
+
+def mapear_zonas(df, janela=JANELA_PADRAO, tolerancia=TOLERANCIA_PADRAO, max_zonas=6, ticker=None):
+    """
+    Zonas de suporte/resistência de um ativo (OHLC): Tipo, Preço, Inferior, Superior,
+    Pivôs, Toques, Força (0-100, pondera recência e toques), Idade (pregões desde o último pivô).
+    Com `ticker`, o resultado fica em cache até chegar uma barra nova.
+    """
+    if df.empty or not {'High', 'Low', 'Close'} <= set(df.columns): return pd.DataFrame(columns=COLUNAS)
+    def calcular():
+        h, l, c = (df[k].to_numpy(dtype=float) for k in ('High', 'Low', 'Close'))
+        fundos, topos = detectar_pivos(h, l, janela)
+        return _montar_zonas(h, l, c, fundos, topos, tolerancia, max_zonas)
+    return _memo(_chave(ticker, df, 'zonas', janela, tolerancia, max_zonas), calcular).copy()
+
+def mapear_zonas_lote(painel, janela=JANELA_PADRAO, tolerancia=TOLERANCIA_PADRAO, max_zonas=6):
+    """{ticker: zonas} de um PainelOHLCV inteiro; os pivôs saem de uma única passada 2-D."""
+    if painel.vazio: return {}
+    H, L, C = painel.matriz('High'), painel.matriz('Low'), painel.matriz('Close')
+    fundos, topos = detectar_pivos(H, L, janela)
+    return {t: _montar_zonas(H[:, i], L[:, i], C[:, i], fundos[:, i], topos[:, i], tolerancia, max_zonas)
+            for i, t in enumerate(painel.tickers)}
+
+def niveis_recentes(df, janela=JANELA_PADRAO, ticker=None):
+    """
+    (suportes, resistências): os 3 últimos valores distintos de fundos/topos, na ordem
+    em que apareceram (contrato do antigo cerebro.calcular_suporte_resistencia_auto).
+    """
+    if df.empty or 'Low' not in df.columns: return [], []
+    def calcular():
+        h, l = df['High'].to_numpy(dtype=float), df['Low'].to_numpy(dtype=float)
+        fundos, topos = detectar_pivos(h, l, janela)
+        return pd.unique(l[fundos])[-3:], pd.unique(h[topos])[-3:]
+    return _memo(_chave(ticker, df, 'recentes', janela), calcular)
+
+def niveis_proximos(df, janela=JANELA_PADRAO, tolerancia=TOLERANCIA_PADRAO, ticker=None):
+    """(suporte logo abaixo, resistência logo acima) do preço atual; 0 quando não há zona."""
+    zonas = mapear_zonas(df, janela, tolerancia, max_zonas=50, ticker=ticker)
+    if zonas.empty: return 0, 0
+    preco = df['Close'].iloc[-1]
+    abaixo = zonas[zonas['Preço'] < preco]['Preço']; acima = zonas[zonas['Preço'] >= preco]['Preço']
+    return (abaixo.iloc[-1] if not abaixo.empty else 0), (acima.iloc[0] if not acima.empty else 0)
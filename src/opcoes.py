@@ -0,0 +1,127 @@
+# Arquivo: E:\Consigliere\src\opcoes.py
+# Módulo: The Derivatives Desk (Black-Scholes, Greeks, Implied Vol, Hedge Grid)
+# Status: V1.0 - Vetorizado
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+TAXA_PADRAO = 0.11 # juro anual contínuo usado quando o chamador não informa
+
+# Convenções: T em anos, sigma/r/q anuais. Vega e rho por 1.00 (100 p.p.) de vol/juro,
+# theta por ano (divida por 365 para o decaimento diário).
+
+def _eh_call(tipo):
+    t = np.asarray(tipo)
+    if t.dtype == bool: return t
+    return np.char.lower(t.astype(str)) == 'call'
+
+def precificar(S, K, T, r=TAXA_PADRAO, sigma=0.2, tipo='call', q=0.0):
+    """
+    Preço e gregas de calls/puts europeias para arrays inteiros (broadcast do NumPy).
+    Retorna {'preco', 'delta', 'gama', 'vega', 'theta', 'rho'}.
+    Com T <= 0 ou sigma <= 0 o preço é o valor intrínseco (descontado) e as gregas de 2ª ordem zeram.
+    """
+    S, K, T, r, sigma, q = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (S, K, T, r, sigma, q)))
+    call = np.broadcast_to(_eh_call(tipo), S.shape)
+    valido = (T > 0) & (sigma > 0)
+    Ts = np.where(valido, T, 1.0); sig = np.where(valido, sigma, 1.0)
+    raiz = np.sqrt(Ts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (np.log(S / K) + (r - q + 0.5 * sig**2) * Ts) / (sig * raiz)
+    d2 = d1 - sig * raiz
+    dq, dr = np.exp(-q * Ts), np.exp(-r * Ts)
+    pdf1 = norm.pdf(d1)
+    Nd1, Nd2, Nmd1, Nmd2 = norm.cdf(d1), norm.cdf(d2), norm.cdf(-d1), norm.cdf(-d2)
+
+    preco = np.where(call, S * dq * Nd1 - K * dr * Nd2, K * dr * Nmd2 - S * dq * Nmd1)
+    delta = np.where(call, dq * Nd1, dq * (Nd1 - 1))
+    gama = dq * pdf1 / (S * sig * raiz)
+    vega = S * dq * pdf1 * raiz
+    theta_comum = -S * dq * pdf1 * sig / (2 * raiz)
+    theta = np.where(call, theta_comum - r * K * dr * Nd2 + q * S * dq * Nd1,
+                           theta_comum + r * K * dr * Nmd2 - q * S * dq * Nmd1)
+    rho = np.where(call, K * Ts * dr * Nd2, -K * Ts * dr * Nmd2)
+
+    # Vencida ou sem volatilidade: valor intrínseco sobre o forward descontado
+    T0 = np.maximum(T, 0)
+    fwd = S * np.exp(-q * T0) - K * np.exp(-r * T0)
+    intrinseco = np.where(call, np.maximum(fwd, 0), np.maximum(-fwd, 0))
+    dentro = np.where(call, fwd > 0, fwd < 0)
+    return {
+        'preco': np.where(valido, preco, intrinseco),
+        'delta': np.where(valido, delta, np.where(dentro, np.where(call, 1.0, -1.0), 0.0)),
+        'gama': np.where(valido, gama, 0.0),
+        'vega': np.where(valido, vega, 0.0),
+        'theta': np.where(valido, theta, 0.0),
+        'rho': np.where(valido, rho, 0.0),
+    }
+
+def volatilidade_implicita(preco, S, K, T, r=TAXA_PADRAO, tipo='call', q=0.0, tol=1e-8, max_iter=100,
+                           vol_min=1e-4, vol_max=5.0):
+    """
+    Vol implícita de arrays de preços de mercado: Newton-Raphson com salvaguarda de
+    bissecção (cada elemento mantém seu próprio intervalo [lo, hi]; se o passo de
+    Newton sai dele ou a vega some, usa o ponto médio). NaN fora dos limites de arbitragem.
+    """
+    preco, S, K, T, r, q = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (preco, S, K, T, r, q)))
+    call = np.broadcast_to(_eh_call(tipo), preco.shape)
+    lo = np.full(preco.shape, vol_min); hi = np.full(preco.shape, vol_max)
+    p_lo = precificar(S, K, T, r, lo, call, q)['preco']; p_hi = precificar(S, K, T, r, hi, call, q)['preco']
+    possivel = (T > 0) & (preco >= p_lo - tol) & (preco <= p_hi + tol)
+    sigma = np.full(preco.shape, 0.3)
+    ativo = possivel.copy()
+    for _ in range(max_iter):
+        if not ativo.any(): break
+        res = precificar(S, K, T, r, sigma, call, q)
+        erro = res['preco'] - preco
+        convergiu = np.abs(erro) < tol
+        ativo &= ~convergiu
+        # O preço cresce com a vol: erro > 0 -> a vol certa está abaixo
+        hi = np.where(ativo & (erro > 0), sigma, hi)
+        lo = np.where(ativo & (erro < 0), sigma, lo)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = sigma - erro / res['vega']
+        ruim = ~np.isfinite(newton) | (newton <= lo) | (newton >= hi)
+        proximo = np.where(ruim, 0.5 * (lo + hi), newton)
+        sigma = np.where(ativo, proximo, sigma)
+        ativo &= (hi - lo) > tol
+    return np.where(possivel, sigma, np.nan)
+
+# --- HEDGE ---
+def grade_hedge(valor_carteira, beta_carteira, preco_indice, volatilidade_indice, r=TAXA_PADRAO,
+                moneyness=(0.80, 0.85, 0.90, 0.95, 1.00), dias=(21, 42, 63, 126, 252), dimensionamento='delta'):
+    """
+    Custo de proteger o risco beta-ajustado com puts do índice em toda a grade strike x vencimento.
+    dimensionamento='delta': puts suficientes para neutralizar o delta (regra do cerebro);
+    'nocional': uma put por unidade do índice do nocional (piso garantido no strike).
+    """
+    nocional = valor_carteira * beta_carteira
+    m, d = np.meshgrid(np.asarray(moneyness, dtype=float), np.asarray(dias, dtype=float), indexing='ij')
+    K = preco_indice * m; T = d / 252
+    res = precificar(preco_indice, K, T, r, volatilidade_indice, 'put')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if dimensionamento == 'delta': qtd = np.where(np.abs(res['delta']) > 0, nocional / (preco_indice * np.abs(res['delta'])), 0.0)
+        else: qtd = np.full(K.shape, nocional / preco_indice)
+    custo = qtd * res['preco']
+    return pd.DataFrame({
+        'Strike': K.ravel(), 'Moneyness': m.ravel(), 'Dias': d.ravel().astype(int),
+        'Preço Put': res['preco'].ravel(), 'Delta Put': res['delta'].ravel(),
+        'Qtd Puts': qtd.ravel(), 'Custo (R$)': custo.ravel(),
+        'Custo % Carteira': (custo / valor_carteira * 100).ravel() if valor_carteira > 0 else 0.0,
+        'Custo Anual %': (custo / valor_carteira * 100 / T).ravel() if valor_carteira > 0 else 0.0,
+    })
+
+def melhor_hedge(valor_carteira, beta_carteira, preco_indice, volatilidade_indice, r=TAXA_PADRAO,
+                 franquia_max=0.10, dimensionamento='nocional', **kwargs):
+    """
+    Proteção mais barata (menor custo anualizado) entre os strikes que limitam a perda
+    a `franquia_max` abaixo do preço atual. Retorna (linha escolhida como dict, grade completa).
+    Por padrão dimensiona pelo nocional (só assim o piso no strike vale de fato);
+    'delta' continua disponível.
+    """
+    grade = grade_hedge(valor_carteira, beta_carteira, preco_indice, volatilidade_indice, r,
+                        dimensionamento=dimensionamento, **kwargs)
+    elegiveis = grade[(grade['Moneyness'] >= 1 - franquia_max - 1e-12) & (grade['Custo (R$)'] > 0)]
+    if elegiveis.empty: return {}, grade
+    return elegiveis.loc[elegiveis['Custo Anual %'].idxmin()].to_dict(), grade
@@ -10,6 +10,7 @@ from sklearn.metrics import accuracy_score
 import joblib # BIBLIOTECA PARA SALVAR A IA
 import os
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 # Pasta para salvar os cérebros dos ativos
 MODEL_DIR = "modelos_ia"
@@ -36,6 +37,77 @@ def calcular_rsi_interno(series, period=14):
     rs = gain / loss
     return 100 - (100 / (1 + rs))
 
+FEATURES = ['Retorno', 'Volatilidade', 'RSI', 'Momentum', 'SMA_Diff']
+VALIDADE_MODELO = 86400 # 24h
+_MODELOS_MEMORIA = {} # caminho -> (mtime, modelo, acuracia): evita joblib.load repetido
+
+def _caminho_modelo(ticker):
+    return f"{MODEL_DIR}/modelo_{ticker}.pkl"
+
+def _carregar_modelo(nome_arquivo_modelo):
+    """Retorna (modelo, acuracia) se existir um modelo com menos de 24h, senão None."""
+    if not os.path.exists(nome_arquivo_modelo): return None
+    tempo_modificacao = os.path.getmtime(nome_arquivo_modelo)
+    idade_arquivo = datetime.datetime.now().timestamp() - tempo_modificacao
+    # Se o modelo tem menos de 24 horas (86400 seg), usamos ele
+    if idade_arquivo >= VALIDADE_MODELO: return None
+    em_memoria = _MODELOS_MEMORIA.get(nome_arquivo_modelo)
+    if em_memoria and em_memoria[0] == tempo_modificacao: return em_memoria[1], em_memoria[2]
+    try:
+        dados_modelo = joblib.load(nome_arquivo_modelo)
+        _MODELOS_MEMORIA[nome_arquivo_modelo] = (tempo_modificacao, dados_modelo['model'], dados_modelo['acc'])
+        return dados_modelo['model'], dados_modelo['acc']
+    except:
+        return None
+
+def ajustar_modelo(df_original):
+    """Treina o modelo do ativo em memória (sem disco): retorna (modelo, acuracia)."""
+    dados = preparar_dados_ml(df_original)
+    X = dados[FEATURES]
+    y = dados['Target']
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
+    
+    modelo = RandomForestClassifier(n_estimators=100, min_samples_split=10, random_state=42)
+    modelo.fit(X_train, y_train)
+    
+    preds = modelo.predict(X_test)
+    acuracia = accuracy_score(y_test, preds) * 100
+    return modelo, acuracia
+
+def _treinar_modelo(df_original, nome_arquivo_modelo):
+    modelo, acuracia = ajustar_modelo(df_original)
+    
+    # Salva o modelo no disco
+    joblib.dump({'model': modelo, 'acc': acuracia}, nome_arquivo_modelo)
+    _MODELOS_MEMORIA[nome_arquivo_modelo] = (os.path.getmtime(nome_arquivo_modelo), modelo, acuracia)
+    return modelo, acuracia
+
+def _features_recentes(df_original):
+    """Recalcula as features só dos últimos 30 pregões (o suficiente para a última linha)."""
+    df_recente = df_original.iloc[-30:].copy()
+    df_recente['Retorno'] = df_recente['Close'].pct_change()
+    df_recente['Volatilidade'] = df_recente['Retorno'].rolling(5).std()
+    df_recente['RSI'] = calcular_rsi_interno(df_recente['Close'])
+    df_recente['Momentum'] = df_recente['Close'] - df_recente['Close'].shift(4)
+    df_recente['SMA_Diff'] = df_recente['Close'] - df_recente['Close'].rolling(20).mean()
+    return df_recente.iloc[[-1]][FEATURES].fillna(0)
+
+def features_historico(df_original):
+    """Features de TODAS as barras (as mesmas de _features_recentes/EstadoAtivo.features_ml, NaN -> 0)."""
+    df = pd.DataFrame(index=df_original.index)
+    df['Retorno'] = df_original['Close'].pct_change()
+    df['Volatilidade'] = df['Retorno'].rolling(5).std()
+    df['RSI'] = calcular_rsi_interno(df_original['Close'])
+    df['Momentum'] = df_original['Close'] - df_original['Close'].shift(4)
+    df['SMA_Diff'] = df_original['Close'] - df_original['Close'].rolling(20).mean()
+    return df[FEATURES].fillna(0)
+
+def _classificar(probabilidade):
+    sinal = "NEUTRO"
+    if probabilidade > 60: sinal = "ALTA PROVÁVEL 🟢"
+    elif probabilidade < 40: sinal = "BAIXA PROVÁVEL 🔴"
+    return sinal
+
 def prever_tendencia_ml(ticker, df_original):
     """
     Treina OU carrega um modelo para esse ativo.
@@ -43,63 +115,73 @@ def prever_tendencia_ml(ticker, df_original):
     if len(df_original) < 100:
         return 50.0, 0.0, "Dados Insuficientes"
     
-    nome_arquivo_modelo = f"{MODEL_DIR}/modelo_{ticker}.pkl"
-    modelo = None
-    acuracia = 0.0
+    nome_arquivo_modelo = _caminho_modelo(ticker)
     
     # --- MELHORIA: Verifica se já existe um modelo treinado hoje ---
-    re_treinar = True
-    if os.path.exists(nome_arquivo_modelo):
-        tempo_modificacao = os.path.getmtime(nome_arquivo_modelo)
-        idade_arquivo = datetime.datetime.now().timestamp() - tempo_modificacao
-        # Se o modelo tem menos de 24 horas (86400 seg), usamos ele
-        if idade_arquivo < 86400:
-            try:
-                dados_modelo = joblib.load(nome_arquivo_modelo)
-                modelo = dados_modelo['model']
-                acuracia = dados_modelo['acc']
-                re_treinar = False
-            except:
-                re_treinar = True
-
-    features = ['Retorno', 'Volatilidade', 'RSI', 'Momentum', 'SMA_Diff']
-    
-    if re_treinar:
-        try:
-            dados = preparar_dados_ml(df_original)
-            X = dados[features]
-            y = dados['Target']
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
-            
-            modelo = RandomForestClassifier(n_estimators=100, min_samples_split=10, random_state=42)
-            modelo.fit(X_train, y_train)
-            
-            preds = modelo.predict(X_test)
-            acuracia = accuracy_score(y_test, preds) * 100
-            
-            # Salva o modelo no disco
-            joblib.dump({'model': modelo, 'acc': acuracia}, nome_arquivo_modelo)
+    carregado = _carregar_modelo(nome_arquivo_modelo)
+    if carregado: modelo, acuracia = carregado
+    else:
+        try: modelo, acuracia = _treinar_modelo(df_original, nome_arquivo_modelo)
         except Exception as e:
             return 50.0, 0.0, f"Erro Treino: {e}"
 
     # Previsão
     try:
-        # Recalcula features recentes
-        df_recente = df_original.iloc[-30:].copy()
-        df_recente['Retorno'] = df_recente['Close'].pct_change()
-        df_recente['Volatilidade'] = df_recente['Retorno'].rolling(5).std()
-        df_recente['RSI'] = calcular_rsi_interno(df_recente['Close'])
-        df_recente['Momentum'] = df_recente['Close'] - df_recente['Close'].shift(4)
-        df_recente['SMA_Diff'] = df_recente['Close'] - df_recente['Close'].rolling(20).mean()
-        
-        input_predicao = df_recente.iloc[[-1]][features].fillna(0)
+        input_predicao = _features_recentes(df_original)
         probabilidade = modelo.predict_proba(input_predicao)[0][1] * 100
+        return probabilidade, acuracia, _classificar(probabilidade)
         
-        sinal = "NEUTRO"
-        if probabilidade > 60: sinal = "ALTA PROVÁVEL 🟢"
-        elif probabilidade < 40: sinal = "BAIXA PROVÁVEL 🔴"
-        
-        return probabilidade, acuracia, sinal
-        
     except Exception as e:
-        return 50.0, 0.0, f"Erro Predição: {e}"
\ No newline at end of file
+        return 50.0, 0.0, f"Erro Predição: {e}"
+
+def prever_tendencia_ml_features(ticker, features, n_barras, historico):
+    """
+    Mesma previsão de prever_tendencia_ml, mas com as features já prontas
+    (fluxo.EstadoAtivo.features_ml). `historico()` só é chamado quando o modelo
+    precisa ser (re)treinado, então o ciclo normal não relê o histórico.
+    """
+    if n_barras < 100:
+        return 50.0, 0.0, "Dados Insuficientes"
+    carregado = _carregar_modelo(_caminho_modelo(ticker))
+    if carregado: modelo, acuracia = carregado
+    else:
+        try: modelo, acuracia = _treinar_modelo(historico(), _caminho_modelo(ticker))
+        except Exception as e:
+            return 50.0, 0.0, f"Erro Treino: {e}"
+    try:
+        probabilidade = modelo.predict_proba(pd.DataFrame([features])[FEATURES])[0][1] * 100
+        return probabilidade, acuracia, _classificar(probabilidade)
+    except Exception as e:
+        return 50.0, 0.0, f"Erro Predição: {e}"
+
+def prever_tendencia_ml_lote(dfs, max_workers=4):
+    """
+    Inferência da watchlist inteira em uma chamada.
+    `dfs` = {ticker: DataFrame com 'Close'}. Modelos do dia vêm da memória/disco;
+    os vencidos são treinados em paralelo (o RandomForest libera o GIL no fit).
+    Retorna {ticker: (probabilidade, acuracia, sinal)} igual a prever_tendencia_ml.
+    """
+    resultados = {}
+    modelos = {}
+    pendentes = []
+    for ticker, df in dfs.items():
+        if len(df) < 100:
+            resultados[ticker] = (50.0, 0.0, "Dados Insuficientes"); continue
+        carregado = _carregar_modelo(_caminho_modelo(ticker))
+        if carregado: modelos[ticker] = carregado
+        else: pendentes.append(ticker)
+
+    if pendentes:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futuros = {t: pool.submit(_treinar_modelo, dfs[t], _caminho_modelo(t)) for t in pendentes}
+            for t, fut in futuros.items():
+                try: modelos[t] = fut.result()
+                except Exception as e: resultados[t] = (50.0, 0.0, f"Erro Treino: {e}")
+
+    for ticker, (modelo, acuracia) in modelos.items():
+        try:
+            probabilidade = modelo.predict_proba(_features_recentes(dfs[ticker]))[0][1] * 100
+            resultados[ticker] = (probabilidade, acuracia, _classificar(probabilidade))
+        except Exception as e:
+            resultados[ticker] = (50.0, 0.0, f"Erro Predição: {e}")
+    return resultados
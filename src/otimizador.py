@@ -1,65 +1,403 @@
 # Arquivo: E:\Consigliere\src\otimizador.py
 # Módulo: The Architect (Markowitz Efficient Frontier)
-# Status: V1.0 - Monte Carlo Optimization
+# Status: V1.3 - Monte Carlo Vetorizado + QP (ADMM, rho adaptativo e polimento) com warm start
 
+import hashlib
 import numpy as np
 import pandas as pd
+from scipy.optimize import minimize
+import covariancia as abacus
 
-def simular_fronteira_eficiente(df_precos, num_portfolios=5000):
+DIAS_ANO = 252
+_CACHE_OTIMIZACAO = {} # (ativos, digest de mu/cov, objetivo, parâmetros) -> resultado
+_CACHE_MAX = 256
+_PARTIDAS = {}         # (ativos, objetivo) -> (z, dual) da última solução: warm start do ADMM
+
+MEMORIA_MAX = 32 * 1024**2 # bytes por lote de carteiras simuladas
+AMOSTRA_GRAFICO = 5000     # pontos da nuvem guardados para o gráfico (reservoir sampling)
+
+def _pareto(vol, ret):
+    """Índices das carteiras não dominadas (ninguém com menos risco E mais retorno)."""
+    ordem = np.lexsort((-ret, vol)) # por risco crescente (empate: maior retorno primeiro)
+    melhor_ate_aqui = np.maximum.accumulate(ret[ordem])
+    novo = np.r_[True, ret[ordem][1:] > melhor_ate_aqui[:-1]]
+    return ordem[novo]
+
+def simular_fronteira_eficiente(df_precos, num_portfolios=5000, seed=None, amostra=AMOSTRA_GRAFICO, pontos_curva=40, metodo_cov='amostral'):
     """
-    Simula milhares de combinações de pesos para encontrar a Fronteira Eficiente.
-    Retorna um DataFrame com os resultados e os pesos da melhor carteira.
+    Simula milhares (ou milhões) de combinações de pesos para encontrar a Fronteira Eficiente.
+    Os pesos saem de uma Dirichlet(1) em lotes (uma matmul por lote); só ficam na memória
+    a melhor carteira, as não dominadas e uma amostra uniforme da nuvem para o gráfico.
+    Retorna (DataFrame da nuvem amostrada, melhor carteira com 'Fronteira' analítica e 'Eficientes' simuladas).
     """
     # 1. Preparação
-    df_retornos = df_precos.pct_change().dropna()
-    if df_retornos.empty: return None, None, None
+    if abacus.retornos(df_precos).empty: return None, None
     
     num_ativos = len(df_precos.columns)
     ativos = df_precos.columns.tolist()
+    mu, cov = estimar_parametros(df_precos, metodo_cov)
+    mean_returns = mu.to_numpy(); cov_matrix = cov.to_numpy()
     
-    # Matrizes para armazenar resultados
-    results = np.zeros((3, num_portfolios)) # [Retorno, Volatilidade, Sharpe]
-    weights_record = [] # Para guardar os pesos de cada simulação
-    
-    # Matriz de Covariância (Risco)
-    cov_matrix = df_retornos.cov()
-    # Retorno Médio Anualizado
-    mean_returns = df_retornos.mean() * 252 
-    
-    # 2. Simulação de Monte Carlo
-    for i in range(num_portfolios):
-        # Pesos aleatórios normalizados para somar 1 (100%)
-        weights = np.random.random(num_ativos)
-        weights /= np.sum(weights)
-        weights_record.append(weights)
-        
-        # Cálculo de Retorno e Volatilidade da Carteira 'i'
-        portfolio_return = np.sum(mean_returns * weights)
-        portfolio_std_dev = np.sqrt(np.dot(weights.T, np.dot(cov_matrix * 252, weights)))
-        
-        # Armazena
-        results[0,i] = portfolio_return
-        results[1,i] = portfolio_std_dev
-        # Sharpe Ratio (assumindo Risk Free = 0 para simplificar visualização)
-        results[2,i] = results[0,i] / results[1,i]
-        
-    # 3. Identificar a Melhor Carteira (Max Sharpe)
-    idx_max_sharpe = np.argmax(results[2])
-    max_sharpe_ret = results[0, idx_max_sharpe]
-    max_sharpe_vol = results[1, idx_max_sharpe]
-    best_weights = dict(zip(ativos, weights_record[idx_max_sharpe]))
-    
-    # 4. Empacotar dados para o gráfico
-    df_simulacao = pd.DataFrame({
-        'Volatilidade': results[1,:],
-        'Retorno': results[0,:],
-        'Sharpe': results[2,:]
-    })
+    # 2. Simulação em lotes
+    rng = np.random.default_rng(seed)
+    lote = int(max(1, min(num_portfolios, MEMORIA_MAX // (8 * num_ativos * 3))))
+    guardados = {'W': np.empty((0, num_ativos)), 'ret': np.empty(0), 'vol': np.empty(0)} # não dominadas
+    nuvem = {'ret': np.empty(0), 'vol': np.empty(0), 'prio': np.empty(0)}
+    melhor = (-np.inf, None, 0.0, 0.0)
+    for inicio in range(0, num_portfolios, lote):
+        n = min(lote, num_portfolios - inicio)
+        W = rng.standard_exponential((n, num_ativos))
+        W /= W.sum(axis=1, keepdims=True) # Exp(1) normalizada = Dirichlet(1): uniforme no simplex
+        ret = W @ mean_returns
+        vol = np.sqrt(np.maximum(((W @ cov_matrix) * W).sum(axis=1), 0.0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = np.where(vol > 0, ret / vol, 0.0) # Risk Free = 0, como antes
+        i = int(np.argmax(sharpe))
+        if sharpe[i] > melhor[0]: melhor = (sharpe[i], W[i].copy(), ret[i], vol[i])
+        # Fronteira simulada: só o que a fronteira guardada não domina entra na disputa
+        if len(guardados['vol']):
+            pos = np.searchsorted(guardados['vol'], vol, side='right')
+            teto = np.r_[-np.inf, np.maximum.accumulate(guardados['ret'])][pos]
+            novos = ret > teto
+        else: novos = np.ones(n, dtype=bool)
+        Wc = np.vstack([guardados['W'], W[novos]]); rc = np.r_[guardados['ret'], ret[novos]]; vc = np.r_[guardados['vol'], vol[novos]]
+        keep = _pareto(vc, rc)
+        guardados = {'W': Wc[keep], 'ret': rc[keep], 'vol': vc[keep]}
+        # Nuvem: as `amostra` menores prioridades aleatórias = amostra uniforme de tudo que já passou
+        prio = np.r_[nuvem['prio'], rng.random(n)]
+        rc = np.r_[nuvem['ret'], ret]; vc = np.r_[nuvem['vol'], vol]
+        if len(prio) > amostra:
+            keep = np.argpartition(prio, amostra - 1)[:amostra]
+            prio, rc, vc = prio[keep], rc[keep], vc[keep]
+        nuvem = {'ret': rc, 'vol': vc, 'prio': prio}
     
+    # 3. Empacotar dados para o gráfico
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df_simulacao = pd.DataFrame({
+            'Volatilidade': nuvem['vol'],
+            'Retorno': nuvem['ret'],
+            'Sharpe': np.where(nuvem['vol'] > 0, nuvem['ret'] / nuvem['vol'], 0.0)
+        })
+    eficientes = pd.DataFrame({'Volatilidade': guardados['vol'], 'Retorno': guardados['ret']}).sort_values('Volatilidade', ignore_index=True)
     melhor_carteira = {
-        'Retorno': max_sharpe_ret,
-        'Volatilidade': max_sharpe_vol,
-        'Pesos': best_weights
+        'Retorno': melhor[2],
+        'Volatilidade': melhor[3],
+        'Pesos': dict(zip(ativos, melhor[1])),
+        'Eficientes': eficientes,
+        'Fronteira': fronteira_analitica(pd.Series(mean_returns, index=ativos), pd.DataFrame(cov_matrix, index=ativos, columns=ativos), pontos_curva)
     }
     
-    return df_simulacao, melhor_carteira
\ No newline at end of file
+    return df_simulacao, melhor_carteira
+
+# --- OTIMIZAÇÃO QUADRÁTICA (FORMA FECHADA + ADMM) ---
+def estimar_parametros(df_precos, metodo_cov='amostral'):
+    """Retorno médio e covariância anualizados dos retornos diários (serviço compartilhado de covariância)."""
+    return abacus.media_e_covariancia(df_precos, metodo_cov, anualizar=True)
+
+def _limites(limites, n):
+    lo, hi = limites
+    return np.broadcast_to(np.asarray(lo, dtype=float), (n,)).copy(), np.broadcast_to(np.asarray(hi, dtype=float), (n,)).copy()
+
+def _kkt(P, q, A, b):
+    """Solução exata de min ½xᵀPx + qᵀx s.t. Ax = b (sem limites); None se o sistema for singular."""
+    n, m = P.shape[0], A.shape[0]
+    K = np.block([[P, A.T], [A, np.zeros((m, m))]])
+    try: return np.linalg.solve(K, np.concatenate([-q, b]))[:n]
+    except np.linalg.LinAlgError: return None
+
+class _ADMM:
+    """
+    min ½xᵀPx + qᵀx  s.t.  Ax = b,  lo <= Gx <= hi   (splitting Gx = z, estilo OSQP; G = I por padrão).
+    A matriz KKT [P+ρGᵀG Aᵀ; A 0] depende só de P, A, G e ρ: é invertida uma vez por ρ e
+    reaproveitada em todas as resoluções (ex.: vários retornos-alvo). ρ se adapta ao
+    equilíbrio entre os resíduos primal e dual, como no OSQP.
+    Com G = I devolve z (exatamente dentro dos limites); com G geral devolve x.
+    """
+
+    def __init__(self, P, A, lo, hi, rho=None, G=None):
+        self.P, self.A, self.lo, self.hi, self.G = P, A, lo, hi, G
+        self.n = P.shape[0]
+        self.GtG = np.eye(self.n) if G is None else G.T @ G
+        self._inversas = {}
+        self._ajustar_rho(rho if rho is not None else max(float(np.mean(np.diag(P))), 1e-8))
+
+    def _ajustar_rho(self, rho):
+        self.rho = rho
+        if rho not in self._inversas:
+            m = self.A.shape[0]
+            # Sistema pequeno e fixo: a inversa explícita deixa cada iteração numa única matmul
+            K = np.block([[self.P + rho * self.GtG, self.A.T], [self.A, np.zeros((m, m))]])
+            self._inversas[rho] = np.linalg.inv(K)[:self.n]
+        self.inversa = self._inversas[rho]
+
+    def _g(self, x): return x if self.G is None else self.G @ x
+
+    def _gt(self, z): return z if self.G is None else self.G.T @ z
+
+    def _polir(self, q, b, z, y):
+        """
+        Polimento (como no OSQP): fixa as restrições que (z, dual) indicam como ativas e
+        resolve o KKT reduzido exatamente. Devolve (x, dual) se a solução for viável e os
+        multiplicadores tiverem o sinal certo; None se a adivinhação ainda não fecha.
+        """
+        baixo, cima = z - self.lo < -y, self.hi - z < y
+        if self.G is None: return self._polir_caixa(q, b, baixo, cima)
+        G = self.G
+        ativos = np.flatnonzero(baixo | cima)
+        m, k = self.A.shape[0], len(ativos)
+        Ga = G[ativos]
+        K = np.block([[self.P, self.A.T, Ga.T], [self.A, np.zeros((m, m + k))], [Ga, np.zeros((k, m + k))]])
+        try: sol = np.linalg.solve(K, np.concatenate([-q, b, np.where(cima[ativos], self.hi[ativos], self.lo[ativos])]))
+        except np.linalg.LinAlgError: return None
+        x, nu = sol[:self.n], sol[self.n + m:]
+        if not np.isfinite(sol).all(): return None
+        gx = G @ x
+        folga = 1e-9 * max(1.0, np.abs(gx).max())
+        folga_nu = 1e-9 * max(1.0, np.abs(nu).max() if k else 0.0)
+        if (gx < self.lo - folga).any() or (gx > self.hi + folga).any(): return None
+        if (nu[cima[ativos]] < -folga_nu).any() or (nu[baixo[ativos]] > folga_nu).any(): return None
+        dual = np.zeros(len(self.lo)); dual[ativos] = nu
+        return x, dual
+
+    def _polir_caixa(self, q, b, baixo, cima, tentativas=8):
+        """
+        Polimento com G = I: os ativos presos no piso/teto saem do sistema e só os livres
+        entram no KKT. Se a adivinhação falha, corrige o conjunto ativo (prende quem estourou
+        o limite, solta quem tem multiplicador com o sinal errado) e tenta de novo.
+        """
+        m = self.A.shape[0]
+        for _ in range(tentativas):
+            x = np.where(cima, self.hi, np.where(baixo, self.lo, 0.0))
+            livres = ~(baixo | cima)
+            f = int(livres.sum())
+            presos = np.where(livres, 0.0, x)
+            K = np.block([[self.P[np.ix_(livres, livres)], self.A[:, livres].T], [self.A[:, livres], np.zeros((m, m))]])
+            try: sol = np.linalg.solve(K, np.concatenate([-q[livres] - self.P[livres] @ presos, b - self.A @ presos]))
+            except np.linalg.LinAlgError: return None
+            if not np.isfinite(sol).all(): return None
+            x[livres] = sol[:f]
+            nu = -(self.P @ x + q + self.A.T @ sol[f:]) # multiplicadores dos limites ativos
+            nu[livres] = 0.0
+            folga = 1e-9 * max(1.0, np.abs(x).max())
+            folga_nu = 1e-9 * max(1.0, np.abs(nu).max())
+            abaixo, acima = livres & (x < self.lo - folga), livres & (x > self.hi + folga)
+            soltar = (cima & (nu < -folga_nu)) | (baixo & (nu > folga_nu))
+            if not (abaixo.any() or acima.any() or soltar.any()): return x, nu
+            baixo = (baixo & ~soltar) | abaixo; cima = (cima & ~soltar) | acima
+        return None
+
+    def resolver(self, q, b, partida=None, tol=1e-7, max_iter=10000, alfa=1.6, checar=25):
+        """
+        `tol` é relativa (resíduos primal e dual sobre a escala de cada um).
+        `partida` = (z, dual) de uma solução anterior; devolve (solução, nova partida).
+        A cada `checar` iterações: ajusta ρ e, se o conjunto ativo não mudou, tenta o polimento.
+        """
+        k = len(self.lo)
+        if partida is None or len(partida[0]) != k:
+            partida = (np.clip(self._g(np.full(self.n, 1 / self.n)), self.lo, self.hi), np.zeros(k))
+        elif (polido := self._polir(q, b, *partida)) is not None: # warm start com o conjunto ativo certo
+            return self._saida(*polido)
+        z, u = partida[0], partida[1] / self.rho # u = dual escalado por ρ
+        ativo_ant = None
+        for it in range(max_iter):
+            x = self.inversa @ np.concatenate([-q + self.rho * self._gt(z - u), b])
+            gx = self._g(x)
+            x_rel = alfa * gx + (1 - alfa) * z
+            z_ant = z
+            z = np.clip(x_rel + u, self.lo, self.hi)
+            u = u + x_rel - z
+            r_primal = np.abs(gx - z).max() / max(np.abs(gx).max(), np.abs(z).max(), 1e-12)
+            r_dual = self.rho * np.abs(self._gt(z - z_ant)).max() / max(np.abs(self.P @ x).max(), self.rho * np.abs(self._gt(u)).max(), np.abs(q).max(), 1e-12)
+            if r_primal < tol and r_dual < tol: break
+            if it % checar == checar - 1:
+                y = u * self.rho
+                ativo = (z - self.lo < -y) | (self.hi - z < y)
+                if ativo_ant is not None and (ativo == ativo_ant).all() and (polido := self._polir(q, b, z, y)) is not None:
+                    return self._saida(*polido)
+                ativo_ant = ativo
+                if r_dual > 0:
+                    razao = np.sqrt(r_primal / r_dual)
+                    if razao > 5 or razao < 0.2:
+                        rho_ant = self.rho
+                        self._ajustar_rho(float(np.clip(self.rho * razao, 1e-6, 1e6)))
+                        u = u * rho_ant / self.rho
+        return (z if self.G is None else x), (z, u * self.rho)
+
+    def _saida(self, x, dual):
+        z = np.clip(self._g(x), self.lo, self.hi)
+        return (z if self.G is None else x), (z, dual)
+
+def _retorno_maximo(mu, lo, hi):
+    """Maior retorno atingível com soma 1 e limites: parte dos pisos e enche os melhores ativos."""
+    w = lo.copy(); resto = 1 - w.sum()
+    for i in np.argsort(-mu):
+        add = min(hi[i] - w[i], resto); w[i] += add; resto -= add
+        if resto <= 0: break
+    return float(mu @ w)
+
+def _estatisticas(w, mu, cov, rf):
+    ret = float(mu @ w); vol = float(np.sqrt(max(w @ cov @ w, 0.0)))
+    return ret, vol, ((ret - rf) / vol if vol > 0 else 0.0)
+
+def _min_variancia(mu, cov, lo, hi, solver, partida):
+    um = np.ones(len(mu))
+    w = _kkt(cov, np.zeros(len(mu)), um[None, :], np.array([1.0]))
+    if w is not None and (w >= lo - 1e-12).all() and (w <= hi + 1e-12).all(): return w, partida
+    return solver.resolver(np.zeros(len(mu)), np.array([1.0]), partida)
+
+def _alvo(mu, cov, alvo, lo, hi, solver, partida):
+    A = np.vstack([np.ones(len(mu)), mu])
+    w = _kkt(cov, np.zeros(len(mu)), A, np.array([1.0, alvo]))
+    if w is not None and (w >= lo - 1e-12).all() and (w <= hi + 1e-12).all(): return w, partida
+    return solver.resolver(np.zeros(len(mu)), np.array([1.0, alvo]), partida)
+
+def _tangente(mu, cov, rf, lo, hi, partida):
+    """
+    Carteira tangente com limites como um único QP homogêneo (y = κ·w):
+    min yᵀΣy  s.t.  (μ - rf)ᵀy = 1,  lo·κ <= y <= hi·κ,  κ = 1ᵀy >= 0;  w = y / κ.
+    Vale quando alguma carteira viável rende acima de rf (senão o Sharpe máximo é negativo).
+    """
+    n = len(mu); I, um = np.eye(n), np.ones((1, n))
+    # Linhas de G: y - lo·κ >= 0, y - hi·κ <= 0 (só onde o teto pode ficar ativo) e κ >= 0
+    teto = hi < 1 if (lo >= 0).all() else np.isfinite(hi)
+    G = np.vstack([I - lo[:, None] * um, (I - hi[:, None] * um)[teto], um])
+    g_lo = np.r_[np.zeros(n), np.full(teto.sum(), -np.inf), 0.0]
+    g_hi = np.r_[np.full(n, np.inf), np.zeros(teto.sum()), np.inf]
+    excesso = (mu - rf)[None, :]
+    solver = _ADMM(cov, excesso, g_lo, g_hi, rho=max(float(np.mean(np.diag(cov))), 1e-8), G=G)
+    y, partida = solver.resolver(np.zeros(n), np.array([1.0]), partida)
+    kappa = y.sum()
+    if not kappa > 0: return None, partida
+    return y / kappa, partida
+
+def _max_sharpe(mu, cov, rf, lo, hi, solver_mv, partida):
+    """
+    Carteira tangente. Sem limites ativos ela é Σ⁻¹(μ - rf) normalizada (forma fechada);
+    caso contrário, um QP só (_tangente), partindo da solução anterior.
+    Se nenhuma carteira viável passa de rf, o Sharpe é negativo e o ótimo pode sair da fronteira
+    (ex.: um ativo só, mais volátil): ver _sharpe_negativo.
+    """
+    try:
+        y = np.linalg.solve(cov, mu - rf)
+        if y.sum() > 0:
+            w = y / y.sum()
+            if (w >= lo - 1e-12).all() and (w <= hi + 1e-12).all(): return w, partida
+    except np.linalg.LinAlgError: pass
+    if _retorno_maximo(mu, lo, hi) > rf:
+        w, partida = _tangente(mu, cov, rf, lo, hi, partida)
+        if w is not None: return w, partida
+    return _sharpe_negativo(mu, cov, rf, lo, hi, solver_mv), partida
+
+def _vertices(mu, lo, hi):
+    """Para cada ativo, o vértice viável com o máximo de peso nele (o resto por ordem de retorno)."""
+    n = len(mu); ordem = np.argsort(-mu)
+    saida = np.empty((n, n))
+    for i in range(n):
+        w = lo.copy(); w[i] = min(hi[i], lo[i] + 1 - lo.sum())
+        for k in ordem:
+            sobra = 1 - w.sum()
+            if sobra <= 0: break
+            if k != i: w[k] += min(hi[k] - w[k], sobra)
+        saida[i] = w
+    return saida
+
+def _sharpe_negativo(mu, cov, rf, lo, hi, solver_mv, partidas=5):
+    """
+    Sharpe máximo quando nenhuma carteira viável passa de rf. Aí o problema não é convexo
+    (o ótimo pode estar além do retorno máximo, em carteiras mais voláteis), então é uma
+    busca local: busca áurea ao longo da fronteira, mais SLSQP (limites + soma 1) partindo
+    dela, dos pesos iguais e dos `partidas` melhores vértices. Fica com o melhor Sharpe.
+    """
+    sharpe = lambda w: _estatisticas(w, mu, cov, rf)[2]
+    w_mv, _ = _min_variancia(mu, cov, lo, hi, solver_mv, None)
+    a, b = float(mu @ w_mv), _retorno_maximo(mu, lo, hi)
+    candidatos = [w_mv]
+    if b - a > 1e-10:
+        # Busca áurea no retorno-alvo (quase-côncavo na fronteira)
+        solver_alvo = _ADMM(cov, np.vstack([np.ones(len(mu)), mu]), lo, hi)
+        ultima = None
+        def na_fronteira(t):
+            nonlocal ultima
+            w, ultima = _alvo(mu, cov, t, lo, hi, solver_alvo, ultima)
+            candidatos.append(w)
+            return sharpe(w)
+        phi = (np.sqrt(5) - 1) / 2
+        c, d = b - phi * (b - a), a + phi * (b - a)
+        fc, fd = na_fronteira(c), na_fronteira(d)
+        while b - a > 1e-7 * max(1.0, abs(b)):
+            if fc >= fd: b, d, fd = d, c, fc; c = b - phi * (b - a); fc = na_fronteira(c)
+            else: a, c, fc = c, d, fd; d = a + phi * (b - a); fd = na_fronteira(d)
+    vertices = _vertices(mu, lo, hi)
+    partida = [max(candidatos, key=sharpe)] + list(vertices[np.argsort([-sharpe(v) for v in vertices])[:partidas]])
+    iguais = np.full(len(mu), 1 / len(mu))
+    if (iguais >= lo).all() and (iguais <= hi).all(): partida.append(iguais)
+    candidatos += partida
+
+    def objetivo(w):
+        risco = np.sqrt(w @ cov @ w); excesso = mu @ w - rf
+        if risco <= 0: return 0.0, np.zeros(len(w))
+        return -excesso / risco, -(mu / risco - excesso * (cov @ w) / risco ** 3)
+    for w0 in partida:
+        res = minimize(objetivo, w0, jac=True, method='SLSQP', bounds=list(zip(lo, hi)),
+                       constraints=({'type': 'eq', 'fun': lambda w: w.sum() - 1, 'jac': lambda w: np.ones(len(w))},),
+                       options={'maxiter': 500, 'ftol': 1e-12})
+        w = np.clip(res.x, lo, hi)
+        if abs(w.sum() - 1) < 1e-8: candidatos.append(w / w.sum())
+    return max(candidatos, key=sharpe)
+
+def otimizar(mu, cov, objetivo='max_sharpe', rf=0.0, retorno_alvo=None, limites=(0.0, 1.0)):
+    """
+    Pesos ótimos com soma 1 e limites por ativo (`limites` = (piso, teto), escalares ou arrays).
+    objetivo: 'min_variancia', 'max_sharpe' (com taxa livre de risco rf) ou 'alvo' (retorno_alvo anual).
+    Usa forma fechada quando nenhum limite fica ativo e ADMM com warm start quando fica.
+    Resultados ficam em cache pela "foto" de mu/cov. Retorna {'Pesos', 'Retorno', 'Volatilidade', 'Sharpe'}
+    ou None quando os limites são inviáveis.
+    """
+    ativos = tuple(mu.index)
+    m = mu.to_numpy(dtype=float); S = cov.loc[list(ativos), list(ativos)].to_numpy(dtype=float)
+    n = len(m)
+    if n == 0: return None
+    lo, hi = _limites(limites, n)
+    if lo.sum() > 1 + 1e-12 or hi.sum() < 1 - 1e-12 or (lo > hi).any(): return None
+    digest = hashlib.blake2b(m.tobytes() + S.tobytes() + lo.tobytes() + hi.tobytes(), digest_size=16).hexdigest()
+    chave = (ativos, digest, objetivo, float(rf), retorno_alvo)
+    if chave in _CACHE_OTIMIZACAO: return _CACHE_OTIMIZACAO[chave]
+
+    S = (S + S.T) / 2
+    partida = _PARTIDAS.get((ativos, objetivo))
+    solver_mv = _ADMM(S, np.ones((1, n)), lo, hi)
+    if objetivo == 'min_variancia':
+        w, partida = _min_variancia(m, S, lo, hi, solver_mv, partida)
+    elif objetivo == 'alvo':
+        solver_alvo = _ADMM(S, np.vstack([np.ones(n), m]), lo, hi)
+        alvo = min(max(float(retorno_alvo), float(m @ _min_variancia(m, S, lo, hi, solver_mv, None)[0])), _retorno_maximo(m, lo, hi))
+        w, partida = _alvo(m, S, alvo, lo, hi, solver_alvo, partida)
+    else:
+        w, partida = _max_sharpe(m, S, rf, lo, hi, solver_mv, partida)
+    if partida is not None: _PARTIDAS[(ativos, objetivo)] = partida
+
+    w = np.clip(w, lo, hi)
+    ret, vol, sharpe = _estatisticas(w, m, S, rf)
+    res = {'Pesos': dict(zip(ativos, w)), 'Retorno': ret, 'Volatilidade': vol, 'Sharpe': sharpe}
+    if len(_CACHE_OTIMIZACAO) >= _CACHE_MAX: _CACHE_OTIMIZACAO.clear()
+    _CACHE_OTIMIZACAO[chave] = res
+    return res
+
+def fronteira_analitica(mu, cov, pontos=40, limites=(0.0, 1.0)):
+    """Curva exata (Volatilidade, Retorno) da mínima variância até o retorno máximo, com warm start entre os pontos."""
+    base = otimizar(mu, cov, 'min_variancia', limites=limites)
+    if base is None: return pd.DataFrame(columns=['Volatilidade', 'Retorno'])
+    m = mu.to_numpy(dtype=float); S = cov.to_numpy(dtype=float); S = (S + S.T) / 2
+    lo, hi = _limites(limites, len(m))
+    solver = _ADMM(S, np.vstack([np.ones(len(m)), m]), lo, hi)
+    curva, partida = [], None
+    for alvo in np.linspace(base['Retorno'], _retorno_maximo(m, lo, hi), pontos):
+        w, partida = _alvo(m, S, alvo, lo, hi, solver, partida)
+        curva.append(_estatisticas(np.clip(w, lo, hi), m, S, 0.0)[:2])
+    return pd.DataFrame(curva, columns=['Retorno', 'Volatilidade'])[['Volatilidade', 'Retorno']]
+
+def otimizar_precos(df_precos, objetivo='max_sharpe', rf=0.0, retorno_alvo=None, limites=(0.0, 1.0), metodo_cov='amostral'):
+    """Atalho: estima mu/cov dos preços e otimiza."""
+    if abacus.retornos(df_precos).empty: return None
+    mu, cov = estimar_parametros(df_precos, metodo_cov)
+    return otimizar(mu, cov, objetivo, rf, retorno_alvo, limites)
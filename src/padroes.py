@@ -0,0 +1,111 @@
+# Arquivo: E:\Consigliere\src\padroes.py
+# Módulo: The Candle Reader (Vectorized Candlestick Patterns)
+# Status: V1.0 - NumPy / Multi-Ativo
+
+import numpy as np
+import pandas as pd
+import painel as ledger
+import indicadores as engine
+
+# nome -> (ícone, direção, preço de referência do marcador)
+PADROES = {
+    'Martelo':          ("🔨", "Bull", 'Low'),
+    'Estrela Cadente':  ("🌠", "Bear", 'High'),
+    'Engolfo de Alta':  ("🟩", "Bull", 'Low'),
+    'Engolfo de Baixa': ("🟥", "Bear", 'High'),
+    'Doji':             ("✚", "Neutro", 'High'),
+    'Estrela da Manhã': ("🌅", "Bull", 'Low'),
+    'Estrela da Noite': ("🌃", "Bear", 'High'),
+    'Inside Bar':       ("📦", "Neutro", 'High'),
+    'Outside Bar':      ("📣", "Neutro", 'High'),
+}
+
+def _anterior(x, k=1):
+    """Barra k pregões antes (NaN nas primeiras linhas)."""
+    out = np.full(x.shape, np.nan)
+    out[k:] = x[:-k]
+    return out
+
+def _detectar(O, H, L, C):
+    """Regras sobre matrizes já compactadas (linhas consecutivas = pregões consecutivos)."""
+    corpo = np.abs(C - O)
+    topo = np.maximum(C, O); base = np.minimum(C, O)
+    pavio_sup = H - topo; pavio_inf = base - L
+    amplitude = H - L
+    alta = C > O; baixa = C < O
+
+    O1, H1, L1, C1 = (_anterior(x) for x in (O, H, L, C))
+    O2, C2 = _anterior(O, 2), _anterior(C, 2)
+    corpo1 = np.abs(C1 - O1); corpo2 = np.abs(C2 - O2); amp2 = _anterior(amplitude, 2)
+
+    with np.errstate(invalid='ignore'):
+        return {
+            'Martelo': (pavio_inf > 2 * corpo) & (pavio_sup < corpo * 0.2),
+            'Estrela Cadente': (pavio_sup > 2 * corpo) & (pavio_inf < corpo * 0.2),
+            'Engolfo de Alta': (C1 < O1) & alta & (O <= C1) & (C >= O1),
+            'Engolfo de Baixa': (C1 > O1) & baixa & (O >= C1) & (C <= O1),
+            'Doji': (amplitude > 0) & (corpo <= 0.1 * amplitude),
+            # 3 barras: corpo longo, corpo pequeno, reversão além do meio do 1º corpo
+            'Estrela da Manhã': (C2 < O2) & (corpo2 > 0.5 * amp2) & (corpo1 < 0.3 * corpo2) & alta & (C > (O2 + C2) / 2),
+            'Estrela da Noite': (C2 > O2) & (corpo2 > 0.5 * amp2) & (corpo1 < 0.3 * corpo2) & baixa & (C < (O2 + C2) / 2),
+            'Inside Bar': (H < H1) & (L > L1),
+            'Outside Bar': (H > H1) & (L < L1),
+        }
+
+def detectar_padroes(o, h, l, c):
+    """
+    Todos os padrões de uma vez, para um ativo (1-D) ou um painel (tempo x ativos).
+    Dias sem negociação (NaN) são pulados: a "barra anterior" é sempre o pregão anterior do ativo.
+    Retorna {padrão: array bool} no formato de `c`.
+    """
+    C = np.asarray(c, dtype=float)
+    um_ativo = C.ndim == 1
+    campos = [np.asarray(x, dtype=float) for x in (o, h, l, c)]
+    if um_ativo: campos = [x[:, None] for x in campos]
+    Pc, ordem, n = engine.compactar(campos[3])
+    Po, Ph, Pl = (np.take_along_axis(x, ordem, axis=0) for x in campos[:3])
+    saida = {}
+    for nome, mascara in _detectar(Po, Ph, Pl, Pc).items():
+        m = engine.expandir(mascara.astype(float), ordem, n) == 1
+        saida[nome] = m[:, 0] if um_ativo else m
+    return saida
+
+def _tabela(mascaras, datas, precos, ativos=None):
+    linhas = []
+    for nome, m in mascaras.items():
+        icone, direcao, campo = PADROES[nome]
+        idx_t, idx_a = np.nonzero(m if m.ndim == 2 else m[:, None])
+        if len(idx_t) == 0: continue
+        bloco = pd.DataFrame({
+            'Data': datas[idx_t],
+            'Padrão': nome, 'Direção': direcao, 'Ícone': icone,
+            'Preço': precos[campo][idx_t, idx_a] if precos[campo].ndim == 2 else precos[campo][idx_t]
+        })
+        if ativos is not None: bloco.insert(1, 'Ativo', np.asarray(ativos, dtype=object)[idx_a])
+        linhas.append(bloco)
+    colunas = ['Data'] + (['Ativo'] if ativos is not None else []) + ['Padrão', 'Direção', 'Ícone', 'Preço']
+    if not linhas: return pd.DataFrame(columns=colunas)
+    return pd.concat(linhas, ignore_index=True)[colunas].sort_values(['Data'] + (['Ativo'] if ativos is not None else []), kind='stable').reset_index(drop=True)
+
+def eventos_padroes(dados, ultimas=None):
+    """
+    Tabela de eventos (Data, [Ativo], Padrão, Direção, Ícone, Preço).
+    `dados` = DataFrame OHLC de um ativo ou PainelOHLCV.
+    `ultimas` = só as N últimas barras válidas de cada ativo (ex.: 1 para o scanner).
+    """
+    if isinstance(dados, ledger.PainelOHLCV):
+        if dados.vazio: return _tabela({}, None, None, [])
+        precos = {c: dados.matriz(c) for c in ['Open', 'High', 'Low', 'Close']}
+        ativos, datas = dados.tickers, dados.datas
+    else:
+        if dados.empty or not {'Open', 'High', 'Low', 'Close'} <= set(dados.columns): return _tabela({}, None, None)
+        precos = {c: dados[c].to_numpy(dtype=float) for c in ['Open', 'High', 'Low', 'Close']}
+        ativos, datas = None, dados.index
+    mascaras = detectar_padroes(precos['Open'], precos['High'], precos['Low'], precos['Close'])
+    if ultimas:
+        # Posição de cada linha contada a partir do fim do histórico válido do ativo
+        validos = ~np.isnan(precos['Close'])
+        restantes = np.cumsum(validos[::-1], axis=0)[::-1]
+        recentes = validos & (restantes <= ultimas)
+        mascaras = {k: m & recentes for k, m in mascaras.items()}
+    return _tabela(mascaras, datas, precos, ativos)
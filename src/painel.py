@@ -0,0 +1,89 @@
+# Arquivo: E:\Consigliere\src\painel.py
+# Módulo: The Ledger (OHLCV Panel - Ticker x Tempo x Campo)
+# Status: V1.0
+
+import numpy as np
+import pandas as pd
+
+CAMPOS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+class PainelOHLCV:
+    """
+    Painel compacto de preços: um único array (ativo, tempo, campo) com índice de datas
+    compartilhado. Cada ativo ocupa um bloco contíguo, então ativo() entrega um
+    DataFrame OHLCV sem cópia; campo() entrega a matriz tempo x ativos de um campo
+    (ex.: 'Close' = o mesmo formato do antigo buscar_dados_multiticker).
+    Dias em que um ativo não negociou ficam como NaN.
+    """
+
+    def __init__(self, dados, datas, tickers, campos=CAMPOS):
+        self.dados = dados
+        self.datas = pd.DatetimeIndex(datas, name='Date')
+        self.tickers = list(tickers)
+        self.campos = list(campos)
+        self._pos = {t: i for i, t in enumerate(self.tickers)}
+        self._idx_campo = {c: i for i, c in enumerate(self.campos)}
+
+    @classmethod
+    def de_dataframes(cls, dfs, dtype=np.float64):
+        """Monta o painel a partir de {ticker: DataFrame OHLCV}, alinhando pela união das datas."""
+        dfs = {t: df for t, df in dfs.items() if df is not None and not df.empty}
+        if not dfs: return cls(np.empty((0, 0, len(CAMPOS)), dtype=dtype), [], [])
+        datas = dfs[next(iter(dfs))].index
+        for df in list(dfs.values())[1:]:
+            if not df.index.equals(datas): datas = datas.union(df.index)
+        dados = np.full((len(dfs), len(datas), len(CAMPOS)), np.nan, dtype=dtype)
+        for i, df in enumerate(dfs.values()):
+            linhas = datas.get_indexer(df.index)
+            for j, campo in enumerate(CAMPOS):
+                if campo in df.columns: dados[i, linhas, j] = df[campo].to_numpy(dtype=dtype)
+        return cls(dados, datas, dfs.keys())
+
+    # --- ACESSO ---
+    def __contains__(self, ticker): return ticker in self._pos
+    def __len__(self): return len(self.tickers)
+
+    @property
+    def vazio(self): return len(self.tickers) == 0 or len(self.datas) == 0
+
+    @property
+    def shape(self): return self.dados.shape
+
+    def matriz(self, campo='Close'):
+        """Array (tempo, ativos) de um campo. É uma visão (strided) do painel, sem cópia."""
+        return self.dados[:, :, self._idx_campo[campo]].T
+
+    def campo(self, campo='Close'):
+        """DataFrame tempo x ativos de um campo (colunas = tickers)."""
+        return pd.DataFrame(self.matriz(campo), index=self.datas, columns=self.tickers, copy=False)
+
+    def fechamentos(self):
+        return self.campo('Close')
+
+    def visao(self, ticker):
+        """Bloco bruto (tempo x campos) do ativo, com os NaN do calendário compartilhado. Sem cópia."""
+        return pd.DataFrame(self.dados[self._pos[ticker]], index=self.datas, columns=self.campos, copy=False)
+
+    def ativo(self, ticker):
+        """
+        Histórico OHLCV do ativo pronto para o cerebro/capo/cacador (equivale a dropna).
+        Sem lacunas internas, é só um recorte da visão (zero-copy); com lacunas
+        (ex.: feriado da B3 num painel com cripto), devolve uma cópia compactada.
+        """
+        bloco = self.dados[self._pos[ticker]]
+        validos = ~np.isnan(bloco[:, self._idx_campo['Close']])
+        idx = np.flatnonzero(validos)
+        if len(idx) == 0: return pd.DataFrame(columns=self.campos)
+        i0, i1 = idx[0], idx[-1] + 1
+        if len(idx) == i1 - i0:
+            return pd.DataFrame(bloco[i0:i1], index=self.datas[i0:i1], columns=self.campos, copy=False)
+        return pd.DataFrame(bloco[validos], index=self.datas[validos], columns=self.campos)
+
+    def ultimo(self, campo='Close'):
+        """Último valor válido de cada ativo (Series indexada por ticker)."""
+        return self.campo(campo).ffill().iloc[-1] if not self.vazio else pd.Series(dtype=float)
+
+    def selecionar(self, tickers):
+        """Sub-painel com os ativos pedidos (fatia em cópia única, mantendo o calendário)."""
+        tickers = [t for t in tickers if t in self._pos]
+        return PainelOHLCV(self.dados[[self._pos[t] for t in tickers]], self.datas, tickers, self.campos)
@@ -0,0 +1,169 @@
+# Arquivo: E:\Consigliere\src\perfil_volume.py
+# Módulo: The Auction Floor (Volume Profile - POC / Value Area / HVN / LVN)
+# Status: V1.0 - Histograma de faixas fixas (bincount)
+
+import numpy as np
+import pandas as pd
+
+N_BINS_PADRAO = 50
+AREA_VALOR = 0.70 # 70% do volume negociado, a convenção do Market Profile
+
+# --- ANÁLISE DE UM HISTOGRAMA (linhas = ativos, colunas = faixas de preço) ---
+def _area_valor(hist, poc, pct=AREA_VALOR):
+    """
+    Value Area clássica: parte do POC e vai anexando o vizinho (acima ou abaixo)
+    com mais volume até somar `pct` do total. Retorna (faixa_inferior, faixa_superior).
+    """
+    total = hist.sum()
+    if total <= 0: return poc, poc
+    lo = hi = poc
+    acumulado = hist[poc]
+    while acumulado < pct * total and (lo > 0 or hi < len(hist) - 1):
+        abaixo = hist[lo - 1] if lo > 0 else -1.0
+        acima = hist[hi + 1] if hi < len(hist) - 1 else -1.0
+        if acima >= abaixo: hi += 1; acumulado += acima
+        else: lo -= 1; acumulado += abaixo
+    return lo, hi
+
+def _nos(hist):
+    """
+    High/Low Volume Nodes (matriz ativos x faixas): picos e vales do histograma
+    suavizado (1-2-1); HVN acima da média do ativo, LVN abaixo dela e nunca nas bordas.
+    """
+    pad = np.pad(hist, ((0, 0), (1, 1)), mode='edge')
+    suave = (pad[:, :-2] + 2 * pad[:, 1:-1] + pad[:, 2:]) / 4
+    esq = np.pad(suave, ((0, 0), (1, 0)), constant_values=-np.inf)[:, :-1]
+    dir_ = np.pad(suave, ((0, 0), (0, 1)), constant_values=-np.inf)[:, 1:]
+    media = suave.mean(axis=1, keepdims=True)
+    hvn = (suave >= esq) & (suave > dir_) & (suave > media)
+    esq_v = np.pad(suave, ((0, 0), (1, 0)), constant_values=np.inf)[:, :-1]
+    dir_v = np.pad(suave, ((0, 0), (0, 1)), constant_values=np.inf)[:, 1:]
+    lvn = (suave <= esq_v) & (suave < dir_v) & (suave < media)
+    lvn[:, 0] = False; lvn[:, -1] = False
+    return hvn, lvn
+
+class PerfilVolume:
+    """
+    Perfil de volume em faixas de largura fixa (`passo`) ancoradas em `base`.
+    Cresce para cima/baixo quando o preço sai do range, então pode ser atualizado
+    barra a barra sem refazer o histograma. A última barra recebida pode ser
+    substituída (pregão em andamento) sem contar o volume duas vezes.
+    """
+
+    def __init__(self, passo, base):
+        self.passo = float(passo)
+        self.base = float(base)
+        self.volumes = np.zeros(1)
+        self.ultima_data = None
+        self._ultima_barra = None # (preço, volume) da última barra aplicada
+
+    @classmethod
+    def de_historico(cls, df, n_bins=N_BINS_PADRAO, campo='Close'):
+        """Perfil com `n_bins` faixas cobrindo o range atual do histórico."""
+        p = df[campo].to_numpy(dtype=float)
+        p = p[~np.isnan(p)]
+        if len(p) == 0: return cls(1.0, 0.0)
+        lo, hi = p.min(), p.max()
+        passo = (hi - lo) / n_bins if hi > lo else max(abs(hi) * 0.001, 1e-9)
+        perfil = cls(passo, lo)
+        perfil.volumes = np.zeros(n_bins)
+        perfil.atualizar(df, campo)
+        return perfil
+
+    def _indices(self, precos):
+        return np.floor((precos - self.base) / self.passo).astype(np.int64)
+
+    def adicionar(self, precos, volumes, sinal=1.0):
+        precos = np.asarray(precos, dtype=float); volumes = np.asarray(volumes, dtype=float)
+        ok = ~(np.isnan(precos) | np.isnan(volumes))
+        if not ok.any(): return
+        idx = self._indices(precos[ok])
+        # O último preço do range cai na última faixa (e não numa faixa nova só para ele)
+        idx[(idx == len(self.volumes)) & (precos[ok] <= self.base + self.passo * len(self.volumes))] = len(self.volumes) - 1
+        if idx.min() < 0:
+            extra = -idx.min()
+            self.volumes = np.concatenate([np.zeros(extra), self.volumes])
+            self.base -= extra * self.passo; idx += extra
+        if idx.max() >= len(self.volumes):
+            self.volumes = np.concatenate([self.volumes, np.zeros(idx.max() - len(self.volumes) + 1)])
+        self.volumes += sinal * np.bincount(idx, weights=volumes[ok], minlength=len(self.volumes))
+
+    def atualizar(self, df, campo='Close'):
+        """Aplica as barras de `df` posteriores à última vista (a última vista é reaplicada)."""
+        if df is None or df.empty or 'Volume' not in df.columns: return self
+        if self.ultima_data is not None:
+            df = df[df.index >= self.ultima_data]
+            if df.empty: return self
+            if df.index[0] == self.ultima_data and self._ultima_barra is not None:
+                self.adicionar([self._ultima_barra[0]], [self._ultima_barra[1]], sinal=-1.0)
+        self.adicionar(df[campo].to_numpy(dtype=float), df['Volume'].to_numpy(dtype=float))
+        self.ultima_data = df.index[-1]
+        self._ultima_barra = (float(df[campo].iloc[-1]), float(df['Volume'].iloc[-1]))
+        return self
+
+    # --- LEITURAS ---
+    def centros(self):
+        return self.base + self.passo * (np.arange(len(self.volumes)) + 0.5)
+
+    def reamostrar(self, fator):
+        """Mesmo perfil com faixas `fator` vezes mais largas (multi-resolução sem reler preços)."""
+        n = -(-len(self.volumes) // fator) * fator
+        grosso = PerfilVolume(self.passo * fator, self.base)
+        grosso.volumes = np.pad(self.volumes, (0, n - len(self.volumes))).reshape(-1, fator).sum(axis=1)
+        grosso.ultima_data, grosso._ultima_barra = self.ultima_data, self._ultima_barra
+        return grosso
+
+    def resumo(self, pct=AREA_VALOR):
+        """POC, Value Area (VAL/VAH), HVNs e LVNs em preço."""
+        return _resumir(self.volumes[None, :], self.centros()[None, :], self.passo, pct)[0]
+
+    def niveis_volume(self, n=3):
+        """Centros das `n` faixas com mais volume (maior primeiro)."""
+        ordem = np.argsort(-self.volumes, kind='stable')[:n]
+        return [float(c) for c in self.centros()[ordem] if self.volumes.sum() > 0]
+
+def _resumir(hist, centros, passos, pct=AREA_VALOR):
+    passos = np.broadcast_to(np.asarray(passos, dtype=float), (hist.shape[0],))
+    pocs = hist.argmax(axis=1)
+    hvn, lvn = _nos(hist)
+    resumos = []
+    for i in range(hist.shape[0]):
+        if hist[i].sum() <= 0:
+            resumos.append({'POC': np.nan, 'VAL': np.nan, 'VAH': np.nan, 'HVN': [], 'LVN': []}); continue
+        lo, hi = _area_valor(hist[i], pocs[i], pct)
+        resumos.append({
+            'POC': float(centros[i, pocs[i]]),
+            'VAL': float(centros[i, lo] - passos[i] / 2), 'VAH': float(centros[i, hi] + passos[i] / 2),
+            'HVN': [float(x) for x in centros[i, hvn[i]]], 'LVN': [float(x) for x in centros[i, lvn[i]]]
+        })
+    return resumos
+
+# --- ATALHOS ---
+def perfis_multiresolucao(df, n_bins_fino=200, fatores=(1, 2, 4, 8), campo='Close'):
+    """{n_faixas: resumo} a partir de um único histograma fino reagrupado."""
+    fino = PerfilVolume.de_historico(df, n_bins_fino, campo)
+    return {len(p.volumes): p.resumo() for p in (fino.reamostrar(f) for f in fatores)}
+
+def perfis_lote(painel, n_bins=N_BINS_PADRAO, pct=AREA_VALOR, campo='Close'):
+    """
+    POC / Value Area / nós de volume da watchlist inteira com UM bincount
+    (cada ativo ocupa `n_bins` posições de um histograma achatado).
+    Retorna DataFrame indexado por ticker.
+    """
+    if painel.vazio: return pd.DataFrame(columns=['Preço', 'POC', 'VAL', 'VAH', 'Posição', 'HVN', 'LVN'])
+    P = painel.matriz(campo); V = painel.matriz('Volume')
+    ok = ~(np.isnan(P) | np.isnan(V))
+    with np.errstate(invalid='ignore'):
+        lo = np.nanmin(np.where(ok, P, np.nan), axis=0); hi = np.nanmax(np.where(ok, P, np.nan), axis=0)
+        passo = np.where(hi > lo, (hi - lo) / n_bins, np.maximum(np.abs(hi) * 0.001, 1e-9))
+        idx = np.clip(np.floor((P - lo) / passo), 0, n_bins - 1)
+    N = P.shape[1]
+    plano = (np.nan_to_num(idx).astype(np.int64) + np.arange(N) * n_bins)[ok]
+    hist = np.bincount(plano, weights=V[ok], minlength=N * n_bins).reshape(N, n_bins)
+    centros = np.nan_to_num(lo)[:, None] + passo[:, None] * (np.arange(n_bins) + 0.5)
+    tabela = pd.DataFrame(_resumir(hist, centros, passo, pct), index=painel.tickers)
+    ultimo = painel.ultimo(campo)
+    tabela.insert(0, 'Preço', ultimo.reindex(tabela.index))
+    tabela.insert(4, 'Posição', np.select([tabela['Preço'] > tabela['VAH'], tabela['Preço'] < tabela['VAL']],
+                                          ['Acima da VA', 'Abaixo da VA'], 'Dentro da VA'))
+    return tabela
@@ -0,0 +1,136 @@
+# Arquivo: E:\Consigliere\src\previsao.py
+# Módulo: The Prophet (Closed-Form Trend Regressions & Forecast Intervals)
+# Status: V1.0 - OLS por somas acumuladas / Multi-Ativo
+
+import numpy as np
+import pandas as pd
+from scipy.stats import t as student
+import indicadores as engine
+
+MODELOS = ('linear', 'log')
+
+# Regressão de y contra u = posição da barra relativa à última barra da janela (u = -(w-1) .. 0).
+# Com w pontos consecutivos, Σu e Σu² são fórmulas fechadas; só Σy, Σuy e Σy² dependem dos dados.
+def _somas_u(w):
+    w = np.asarray(w, dtype=float)
+    su = -w * (w - 1) / 2
+    suu = (w - 1) * w * (2 * w - 1) / 6
+    return su, suu
+
+def _coeficientes(w, sy, suy, syy):
+    """Inclinação, valor ajustado na última barra (u = 0) e soma dos quadrados dos resíduos."""
+    su, suu = _somas_u(w)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sxx = suu - su * su / w
+        sxy = suy - su * sy / w
+        b = sxy / sxx
+        a = (sy - b * su) / w
+        sse = np.maximum(syy - sy * sy / w - b * sxy, 0.0)
+    return b, a, sse, sxx, su / w
+
+def _preparar(precos, modelo):
+    X = precos.to_numpy(dtype=float) if isinstance(precos, (pd.DataFrame, pd.Series)) else np.asarray(precos, dtype=float)
+    if X.ndim == 1: X = X[:, None]
+    if modelo == 'log':
+        with np.errstate(divide='ignore', invalid='ignore'): X = np.where(X > 0, np.log(X), np.nan)
+    return X
+
+def ajustar(precos, modelo='linear', janela=None):
+    """
+    OLS de tendência de todas as colunas de uma vez, sobre as últimas `janela` barras
+    válidas de cada ativo (None = histórico inteiro). NaN são pulados (cada ativo usa
+    o próprio histórico). Retorna dict de arrays por ativo:
+    inclinacao (por barra), ajuste (valor da reta na última barra), n, sigma (erro padrão
+    da regressão, ddof=2), sse, sxx, u_medio, r2 e referencia (média usada para centralizar).
+    No modelo 'log' tudo está em log-preço.
+    """
+    X = _preparar(precos, modelo)
+    P, _, n_validos = engine.compactar(X)
+    T, N = P.shape
+    w = n_validos.astype(float) if janela is None else np.minimum(n_validos, janela).astype(float)
+    linhas = np.arange(T)[:, None]
+    dentro = linhas >= T - w[None, :]
+    # Centraliza por ativo (só desloca o intercepto) para não perder precisão em Σy²
+    ref = np.nan_to_num(np.nanmean(np.where(dentro, P, np.nan), axis=0)) if dentro.any() else np.zeros(N)
+    Y = np.where(dentro, P - ref, 0.0)
+    u = linhas - (T - 1.0)
+    sy = Y.sum(axis=0); suy = (u * Y).sum(axis=0); syy = (Y * Y).sum(axis=0)
+    b, a, sse, sxx, u_medio = _coeficientes(w, sy, suy, syy)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sst = syy - sy * sy / w
+        r2 = np.where(sst > 0, 1 - sse / sst, 0.0)
+        sigma = np.sqrt(sse / (w - 2))
+    valido = w >= 3
+    nan = lambda v: np.where(valido, v, np.nan)
+    return {'inclinacao': nan(b), 'ajuste': nan(a + ref), 'n': w, 'sigma': nan(sigma), 'sse': nan(sse),
+            'sxx': nan(sxx), 'u_medio': nan(u_medio), 'r2': nan(r2), 'referencia': ref}
+
+def regressao_movel(precos, janela=60, modelo='linear'):
+    """
+    Regressão de tendência em janela móvel para TODAS as barras e ativos (somas acumuladas):
+    retorna dict de matrizes T x N: inclinacao, ajuste (valor da reta na barra), sigma e r2.
+    A janela conta barras válidas do próprio ativo; antes de completar fica NaN.
+    """
+    X = _preparar(precos, modelo)
+    P, ordem, n_validos = engine.compactar(X)
+    T, N = P.shape
+    validos = ~np.isnan(P)
+    ref = np.nan_to_num(np.nanmean(P, axis=0)) if validos.any() else np.zeros(N)
+    Y = np.where(validos, P - ref, 0.0)
+    x = np.arange(T, dtype=float)[:, None]
+    def janela_movel(M):
+        cs = np.cumsum(M, axis=0)
+        out = cs.copy(); out[janela:] -= cs[:-janela]
+        return out
+    sy = janela_movel(Y); sxy = janela_movel(x * Y); syy = janela_movel(Y * Y)
+    cnt = janela_movel(validos.astype(float))
+    suy = sxy - x * sy # Σ(x - t)·y com t = barra atual
+    b, a, sse, _, _ = _coeficientes(float(janela), sy, suy, syy)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sst = syy - sy * sy / janela
+        r2 = np.where(sst > 0, 1 - sse / sst, 0.0)
+        sigma = np.sqrt(sse / (janela - 2))
+    completa = (cnt >= janela) & (janela >= 3)
+    saida = {}
+    for nome, M in (('inclinacao', b), ('ajuste', a + ref), ('sigma', sigma), ('r2', r2)):
+        M = engine.expandir(np.where(completa, M, np.nan), ordem, n_validos)
+        saida[nome] = M[:, 0] if np.ndim(precos) == 1 else M
+    return saida
+
+def projetar(precos, dias=30, modelo='linear', janela=None, confianca=0.95):
+    """
+    Projeção de `dias` barras à frente com intervalo de previsão da OLS:
+    ŷ ± t(n-2)·σ·√(1 + 1/n + (h - ū)²/Sxx). Retorna dict de matrizes dias x ativos
+    'previsao', 'inferior', 'superior' (em preço, também no modelo 'log') e o ajuste usado.
+    """
+    fit = ajustar(precos, modelo, janela)
+    h = np.arange(1, dias + 1, dtype=float)[:, None]
+    centro = fit['ajuste'] + fit['inclinacao'] * h
+    with np.errstate(divide='ignore', invalid='ignore'):
+        q = student.ppf(0.5 + confianca / 2, np.maximum(fit['n'] - 2, 1))
+        meia = q * fit['sigma'] * np.sqrt(1 + 1 / fit['n'] + (h - fit['u_medio']) ** 2 / fit['sxx'])
+    inf, sup = centro - meia, centro + meia
+    if modelo == 'log': centro, inf, sup = np.exp(centro), np.exp(inf), np.exp(sup)
+    return {'previsao': centro, 'inferior': inf, 'superior': sup, 'ajuste': fit}
+
+def datas_futuras(ultima, dias):
+    """Próximos `dias` pregões (dias úteis) depois de `ultima`."""
+    return pd.bdate_range(pd.Timestamp(ultima) + pd.Timedelta(days=1), periods=dias)
+
+def projetar_tabela(df_precos, dias=30, modelo='log', janela=None, confianca=0.95):
+    """
+    Resumo por ativo para a watchlist inteira (um único ajuste matricial):
+    Preço, Projeção, Var %, Inferior, Superior, Tendência %/dia e R².
+    """
+    colunas = ['Preço', 'Projeção', 'Var %', 'Inferior', 'Superior', 'Tendência %/dia', 'R²']
+    if df_precos is None or df_precos.empty: return pd.DataFrame(columns=colunas)
+    res = projetar(df_precos, dias, modelo, janela, confianca)
+    fit = res['ajuste']
+    ultimo = df_precos.ffill().iloc[-1].to_numpy(dtype=float)
+    tendencia = (np.exp(fit['inclinacao']) - 1) * 100 if modelo == 'log' else fit['inclinacao'] / ultimo * 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return pd.DataFrame({
+            'Preço': ultimo, 'Projeção': res['previsao'][-1], 'Var %': (res['previsao'][-1] / ultimo - 1) * 100,
+            'Inferior': res['inferior'][-1], 'Superior': res['superior'][-1],
+            'Tendência %/dia': tendencia, 'R²': fit['r2']
+        }, index=df_precos.columns)
@@ -5,6 +5,7 @@
 import pandas as pd
 import networkx as nx
 import plotly.graph_objects as go
+import covariancia as abacus
 
 def gerar_grafo_correlacao(df_precos, threshold=0.75):
     """
@@ -16,8 +17,7 @@ def gerar_grafo_correlacao(df_precos, threshold=0.75):
     if df_precos.empty: return None
 
     # 1. Calcula Matriz de Correlação
-    retornos = df_precos.pct_change().dropna()
-    corr_matrix = retornos.corr()
+    corr_matrix = abacus.correlacao(df_precos)
     
     # 2. Cria o Grafo
     G = nx.Graph()
@@ -0,0 +1,179 @@
+# Arquivo: E:\Consigliere\src\replay.py
+# Módulo: The Rewind (Historical Replay of the Sentinel / Capo Auto-Trader)
+# Status: V1.0 - Relógio simulado / Cofre em memória / IA por data de treino
+
+import copy
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+import capo
+import oraculo as oracle
+import macro as governor
+import fluxo as stream
+import painel as ledger
+import sentinela as sentinel
+
+RETREINO = 21 # pregões entre re-treinos da IA no replay (a sentinela real re-treina a cada 24h)
+CONTEXTO_NEUTRO = {'regime': "Neutro (replay sem macro)", 'explicacao': "", 'cor': "#FFFFFF", 'penalidade': 0, 'timestamp': 0}
+_MODELOS_REPLAY = {} # (ticker, data do treino, nº de barras, último close) -> (modelo, acuracia)
+_MODELOS_MAX = 2000
+
+class CofreMemoria:
+    """
+    A mesma interface do database que a sentinela usa (config, portfolio, trades, sinais),
+    em memória e com relógio simulado: `agora` é a data da barra que está sendo repetida.
+    A contabilidade de registrar_trade é a mesma do banco (caixa, preço médio, P&L realizado).
+    """
+
+    def __init__(self, capital=100000.0, config=None):
+        self.agora = None
+        self.config = dict(config or {})
+        self.portfolio = {'Caixa': float(capital)}
+        self.trades = []
+        self.sinais = []
+        self._sinais_dia = set()
+
+    def carregar_config(self, k, d=None, user_id=None): return self.config.get(k, d)
+
+    def salvar_config(self, k, v, user_id=None): self.config[k] = str(v)
+
+    def carregar_portfolio(self, uid=None): return copy.deepcopy(self.portfolio)
+
+    def registrar_trade(self, atv, op, qtd, pr, nota, stop=0, take=0, user_id=1):
+        tot = qtd * pr; pnl = 0
+        pos = self.portfolio.get(atv)
+        if op == 'C':
+            self.portfolio['Caixa'] -= tot
+            if pos:
+                nq = pos['qtd'] + qtd
+                pos['pm'] = ((pos['qtd'] * pos['pm']) + (qtd * pr)) / nq; pos['qtd'] = nq
+            else: pos = self.portfolio[atv] = {'qtd': qtd, 'pm': pr, 'stop': 0, 'take': 0}
+            if stop > 0 or take > 0: pos['stop'], pos['take'] = stop, take
+        elif op == 'V':
+            self.portfolio['Caixa'] += tot
+            if pos:
+                pnl = (pr - pos['pm']) * qtd
+                pos['qtd'] -= qtd
+                if pos['qtd'] <= 0.0001: del self.portfolio[atv]
+        self.trades.append({'Data': self.agora, 'Ativo': atv, 'Op': op, 'Qtd': qtd, 'Preço': pr, 'Total': tot, 'Nota': nota, 'PnL': pnl})
+
+    def registrar_sinal(self, atv, sinal, pr, user_id=1):
+        chave = (pd.Timestamp(self.agora).date() if self.agora is not None else None, atv, sinal)
+        if chave in self._sinais_dia: return False
+        self._sinais_dia.add(chave)
+        self.sinais.append({'Data': self.agora, 'Ativo': atv, 'Sinal': sinal, 'Preço': pr})
+        return True
+
+    def patrimonio(self, precos):
+        """Caixa + posições marcadas a mercado em `precos` ({ticker: preço})."""
+        return self.portfolio['Caixa'] + sum(d['qtd'] * precos.get(a, d['pm']) for a, d in self.portfolio.items() if a != 'Caixa')
+
+# --- IA: UM MODELO POR (ATIVO, DATA DE TREINO) ---
+def _treinar(tarefa):
+    ticker, df_treino = tarefa
+    chave = (ticker, df_treino.index[-1], len(df_treino), float(df_treino['Close'].iloc[-1]))
+    if chave not in _MODELOS_REPLAY:
+        if len(_MODELOS_REPLAY) >= _MODELOS_MAX: _MODELOS_REPLAY.clear()
+        try: _MODELOS_REPLAY[chave] = oracle.ajustar_modelo(df_treino)
+        except Exception: _MODELOS_REPLAY[chave] = None
+    return _MODELOS_REPLAY[chave]
+
+def probabilidades_ia(historicos, inicio=None, retreino=RETREINO, min_barras=200, max_workers=4):
+    """
+    Probabilidade de alta da IA em cada pregão de cada ativo, sem olhar o futuro: a cada
+    `retreino` barras um modelo é treinado só com o histórico até aquela data (como a
+    sentinela teria feito) e prevê, de uma vez, as barras até o próximo treino.
+    Modelos ficam em cache por (ativo, data do treino). Retorna {ticker: Series}.
+    """
+    blocos = []
+    for t, df in historicos.items():
+        primeira = max(min_barras - 1, 99, 0 if inicio is None else int(df.index.searchsorted(inicio)))
+        for k in range(primeira, len(df), retreino): blocos.append((t, k, min(k + retreino, len(df))))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool: # o RandomForest libera o GIL no fit
+        modelos = list(pool.map(_treinar, [(t, historicos[t].iloc[:k + 1]) for t, k, _ in blocos]))
+    features = {t: oracle.features_historico(df) for t, df in historicos.items()}
+    saida = {t: pd.Series(50.0, index=df.index) for t, df in historicos.items()}
+    for (t, k, fim), modelo in zip(blocos, modelos):
+        if modelo is None: continue
+        try: saida[t].iloc[k:fim] = modelo[0].predict_proba(features[t].iloc[k:fim])[:, 1] * 100
+        except Exception: pass
+    return saida
+
+def contextos_macro(df_macro, datas):
+    """Regime macro de cada data usando só os dados macro até ela (None = neutro)."""
+    if df_macro is None or df_macro.empty: return {d: CONTEXTO_NEUTRO for d in datas}
+    fins = df_macro.index.searchsorted(datas, side='right')
+    por_fim = {} # datas sem barra macro nova reaproveitam o regime anterior
+    for fim in set(fins):
+        recorte = df_macro.iloc[max(fim - 30, 0):fim]
+        por_fim[fim] = governor.montar_contexto_macro(recorte) if len(recorte) > 20 else CONTEXTO_NEUTRO
+    return {d: por_fim[fim] for d, fim in zip(datas, fins)}
+
+# --- REPLAY ---
+def rodar_replay(painel, inicio=None, capital=100000.0, auto_trade=True, retreino=RETREINO,
+                 df_macro=None, fundamentos=None):
+    """
+    Repete a sentinela (sentinela.processar_ciclo: o laço do ciclo_vigilancia com Capo,
+    SCORE_COMPRA/SCORE_VENDA, lote, stops de 2 ATR / takes de 3 ATR) barra a barra sobre
+    o histórico, com relógio simulado e um CofreMemoria no lugar do banco. Um ciclo por
+    pregão, no fechamento. Diferenças para o ao vivo: o CofreMemoria guarda stop/take e
+    sinais (o database ainda não grava nem lê stop/take, então lá o Guardião não dispara).
+    `painel`: PainelOHLCV ou {ticker: DataFrame OHLCV}; as barras antes de `inicio` só
+    aquecem os indicadores. `df_macro`: histórico de governor.coletar_dados_macro(periodo)
+    para o regime de cada data (None = sem penalidade). `fundamentos`: {ticker: dados} de
+    valuation (não existem "na data": usar os atuais tem viés) ou None = neutro (50).
+    Retorna {'equity': DataFrame, 'trades': DataFrame, 'sinais': DataFrame, 'resumo': dict}.
+    """
+    if isinstance(painel, ledger.PainelOHLCV):
+        historicos = {t: painel.ativo(t) for t in painel.tickers}
+        datas = painel.datas
+    else:
+        historicos = {t: df for t, df in painel.items() if df is not None and not df.empty}
+        datas = pd.DatetimeIndex(sorted(set().union(*[df.index for df in historicos.values()]))) if historicos else pd.DatetimeIndex([])
+    historicos = {t: df for t, df in historicos.items() if len(df)}
+    vazio = {'equity': pd.DataFrame(), 'trades': pd.DataFrame(), 'sinais': pd.DataFrame(), 'resumo': {}}
+    if not historicos or not len(datas): return vazio
+    inicio = pd.Timestamp(inicio) if inicio is not None else datas[0]
+
+    prob_ia = probabilidades_ia(historicos, inicio, retreino)
+    ctx = contextos_macro(df_macro, datas[datas >= inicio])
+    cofre = CofreMemoria(capital, {'auto_trading': 'ON' if auto_trade else 'OFF'})
+    estados = {t: stream.EstadoAtivo() for t in historicos}
+    # Barras de cada ativo por data (tupla OHLCV), lidas uma vez
+    campos = ['Open', 'High', 'Low', 'Close', 'Volume']
+    barras = {}
+    for t, df in historicos.items():
+        valores = np.column_stack([df[c].to_numpy(dtype=float) if c in df.columns else np.full(len(df), np.nan) for c in campos])
+        for d, linha in zip(df.index, valores): barras.setdefault(d, []).append((t, linha))
+
+    def aconselhar(ticker, estado, data):
+        preco = estado.preco
+        s_tec = capo.calcular_score_tecnico_estado(estado)
+        s_ia = prob_ia[ticker].asof(data)
+        fund = capo._pontuar_fundamentos(fundamentos.get(ticker), preco) if fundamentos and capo._usa_fundamentos(ticker) else 50
+        return capo.combinar_scores(ticker, preco, s_tec, fund, s_ia, ctx[data])
+
+    linhas = []
+    for d in datas:
+        cofre.agora = d
+        for t, (o, h, l, c, v) in barras.get(d, []): estados[t].avancar(d, o, h, l, c, v)
+        if d < inicio: continue
+        ativos = {t: e for t, e in estados.items() if e.barras}
+        sentinel.processar_ciclo(cofre, ativos, lambda t, e: aconselhar(t, e, d), auto_trade, registrar=lambda msg: None)
+        precos = {t: e.preco for t, e in ativos.items()}
+        linhas.append({'Data': d, 'Patrimônio': cofre.patrimonio(precos), 'Caixa': cofre.portfolio['Caixa'],
+                       'Posições': len(cofre.portfolio) - 1})
+
+    equity = pd.DataFrame(linhas).set_index('Data') if linhas else pd.DataFrame()
+    trades = pd.DataFrame(cofre.trades, columns=['Data', 'Ativo', 'Op', 'Qtd', 'Preço', 'Total', 'Nota', 'PnL'])
+    resumo = {}
+    if not equity.empty:
+        pl = equity['Patrimônio'].to_numpy(dtype=float)
+        rets = np.diff(pl) / pl[:-1]
+        dp = rets.std(ddof=1) if len(rets) > 1 else 0.0
+        resumo = {'Retorno %': (pl[-1] / capital - 1) * 100,
+                  'Sharpe': rets.mean() / dp * np.sqrt(252) if dp > 0 else 0.0,
+                  'Max DD %': ((pl / np.maximum.accumulate(pl)) - 1).min() * 100,
+                  'Trades': len(trades), 'PnL Realizado': float(trades['PnL'].sum()) if len(trades) else 0.0,
+                  'Sinais': len(cofre.sinais)}
+    return {'equity': equity, 'trades': trades, 'sinais': pd.DataFrame(cofre.sinais), 'resumo': resumo}
@@ -0,0 +1,213 @@
+# Arquivo: E:\Consigliere\src\risco.py
+# Módulo: The Bookmaker (VaR / Expected Shortfall / Backtests - Multi-Carteira)
+# Status: V1.0 - Paramétrico / Histórico / Monte Carlo
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm, chi2
+from scipy.special import xlogy
+import indicadores as engine
+import montecarlo as casino
+import covariancia as abacus
+
+METODOS = ('parametrico', 'historico', 'monte_carlo')
+HORIZONTES = (1, 10)
+CONFIANCAS = (0.95, 0.99)
+N_SIMS_PADRAO = 20000
+MEMORIA_MAX = 64 * 1024**2 # bytes por bloco de janelas no backtest histórico
+COLUNAS = ['Carteira', 'Método', 'Horizonte', 'Confiança', 'Valor', 'VaR', 'ES', 'VaR %', 'ES %']
+
+# --- CARTEIRAS -> MATRIZ DE EXPOSIÇÕES ---
+def exposicoes(portfolios, df_precos):
+    """
+    Matriz carteiras x ativos com o valor de cada posição (qtd x último preço válido).
+    `portfolios` = {id: portfolio no formato do vault}; a Caixa e ativos sem preço ficam de fora.
+    """
+    linhas = [(k, a, d['qtd'] if isinstance(d, dict) else d)
+              for k, port in portfolios.items() for a, d in port.items()
+              if a != 'Caixa' and a in df_precos.columns]
+    if not linhas: return pd.DataFrame(index=pd.Index(list(portfolios.keys()), name='Carteira'), dtype=float)
+    longo = pd.DataFrame(linhas, columns=['Carteira', 'Ativo', 'Qtd'])
+    qtd = longo.pivot_table(index='Carteira', columns='Ativo', values='Qtd', aggfunc='sum', fill_value=0.0)
+    qtd = qtd.reindex(list(portfolios.keys()), fill_value=0.0)
+    qtd.index.name = 'Carteira'
+    return qtd * df_precos[qtd.columns].ffill().iloc[-1]
+
+class MotorRisco:
+    """
+    Retornos, média e covariância calculados UMA vez para um universo de ativos;
+    depois qualquer número de carteiras (linhas de exposição em R$) é avaliado
+    com produtos de matrizes, em todos os métodos, horizontes e confianças.
+    O histórico usa só os dias em que todos os ativos do universo têm retorno; média e
+    covariância vêm do serviço compartilhado (covariancia), `metodo_cov` escolhe o estimador.
+    """
+
+    def __init__(self, df_precos, ativos=None, metodo_cov='amostral'):
+        self.retornos = abacus.retornos(df_precos, ativos)
+        self.ativos = list(self.retornos.columns)
+        self.R = self.retornos.to_numpy(dtype=float)
+        N = len(self.ativos)
+        if len(self.R) > 1:
+            est = abacus.estimador(self.retornos)
+            self.mu = est.media().to_numpy(); self.cov = est.matriz(metodo_cov).to_numpy()
+        else: self.mu, self.cov = np.zeros(N), np.zeros((N, N))
+
+    @property
+    def vazio(self): return len(self.R) < 2 or not self.ativos
+
+    def _matriz(self, expo):
+        """Exposições (DataFrame carteiras x ativos) alinhadas ao universo -> (E, rótulos)."""
+        expo = expo.reindex(columns=self.ativos, fill_value=0.0).fillna(0.0)
+        return expo.to_numpy(dtype=float), expo.index
+
+    # --- VaR / ES ---
+    def _parametrico(self, E, h, c, media):
+        sigma = np.sqrt(np.maximum(((E @ self.cov) * E).sum(axis=1), 0.0)) * np.sqrt(h)
+        m = (E @ self.mu) * h if media else 0.0
+        z = norm.ppf(c)
+        return z * sigma - m, sigma * norm.pdf(z) / (1 - c) - m
+
+    @staticmethod
+    def _caudas(pnl, confiancas):
+        """
+        VaR/ES empíricos de cada linha (carteiras x cenários) em várias confianças: só a cauda
+        esquerda é separada (np.partition) e ordenada. Quantil linear como o pandas;
+        ES = média dos P&L <= quantil. Retorna {confiança: (VaR, ES)} com perdas positivas.
+        """
+        n = pnl.shape[1]
+        pos = {c: (n - 1) * (1 - c) for c in confiancas}
+        K = min(n, int(max(pos.values())) + 2)
+        cauda = np.sort(np.partition(pnl, K - 1, axis=1)[:, :K] if K < n else pnl, axis=1)
+        acum = np.cumsum(cauda, axis=1)
+        linhas = np.arange(len(pnl))
+        res = {}
+        for c, p in pos.items():
+            f = int(p); g = min(f + 1, K - 1)
+            q = cauda[:, f] + (p - f) * (cauda[:, g] - cauda[:, f])
+            k = (cauda <= q[:, None]).sum(axis=1)
+            res[c] = -q, -acum[linhas, k - 1] / k
+        return res
+
+    def _historico(self, E, h, confiancas):
+        pnl = E @ self.R.T # P&L diário em R$ (carteiras x dias)
+        if h > 1:
+            # Janelas sobrepostas de h pregões (soma via acumulados)
+            cs = np.hstack([np.zeros((len(E), 1)), np.cumsum(pnl, axis=1)])
+            pnl = cs[:, h:] - cs[:, :-h]
+        if pnl.shape[1] == 0: return {c: (np.full(len(E), np.nan),) * 2 for c in confiancas}
+        return self._caudas(pnl, confiancas)
+
+    def _monte_carlo(self, E, n_sims, seed, confiancas):
+        """
+        Choques diários N(0, Σ) correlacionados (mesmos sorteios para todas as carteiras).
+        Como o P&L de h dias é o de 1 dia x raiz(h) (+ média), a cauda só é ordenada uma vez.
+        """
+        L = casino.fator_cholesky(self.cov)
+        Z = np.random.default_rng(seed).standard_normal((n_sims, len(self.ativos)))
+        return self._caudas(E @ (Z @ L.T).T, confiancas)
+
+    def avaliar(self, expo, metodos=METODOS, horizontes=HORIZONTES, confiancas=CONFIANCAS,
+                n_sims=N_SIMS_PADRAO, seed=None, media=False):
+        """
+        Tabela (Carteira, Método, Horizonte, Confiança, Valor, VaR, ES, VaR %, ES %) com perdas
+        positivas em R$ para todas as carteiras de `expo` de uma vez.
+        Paramétrico: delta-normal com raiz do tempo; histórico: janelas sobrepostas de h dias;
+        Monte Carlo: choques normais correlacionados.
+        `media=True` desconta o retorno médio esperado no paramétrico e no Monte Carlo.
+        """
+        E, rotulos = self._matriz(expo)
+        if self.vazio or len(E) == 0: return pd.DataFrame(columns=COLUNAS)
+        valor = E.sum(axis=1)
+        mc = self._monte_carlo(E, n_sims, seed, confiancas) if 'monte_carlo' in metodos else None
+        blocos = []
+        for h in horizontes:
+            m = (E @ self.mu) * h if media else 0.0
+            hist = self._historico(E, h, confiancas) if 'historico' in metodos else None
+            for c in confiancas:
+                for metodo in metodos:
+                    if metodo == 'parametrico': var, es = self._parametrico(E, h, c, media)
+                    elif metodo == 'historico': var, es = hist[c]
+                    else: var, es = mc[c][0] * np.sqrt(h) - m, mc[c][1] * np.sqrt(h) - m
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        blocos.append(pd.DataFrame({
+                            'Carteira': rotulos, 'Método': metodo, 'Horizonte': h, 'Confiança': c, 'Valor': valor,
+                            'VaR': var, 'ES': es,
+                            'VaR %': np.where(valor > 0, var / valor * 100, 0.0), 'ES %': np.where(valor > 0, es / valor * 100, 0.0)
+                        }))
+        return pd.concat(blocos, ignore_index=True)[COLUNAS]
+
+    # --- BACKTEST ---
+    def retornos_carteiras(self, expo):
+        """Retornos diários históricos (T x carteiras) com os pesos atuais de cada carteira."""
+        E, rotulos = self._matriz(expo)
+        valor = E.sum(axis=1)
+        W = np.divide(E, valor[:, None], out=np.zeros_like(E), where=valor[:, None] > 0)
+        return pd.DataFrame(self.R @ W.T, index=self.retornos.index, columns=rotulos)
+
+    def backtest(self, expo, janela=250, confianca=0.99, metodo='historico'):
+        """
+        VaR rolante de 1 dia (estimado só com os `janela` pregões anteriores) contra o
+        retorno realizado, para todas as carteiras de uma vez. Retorna
+        {'resumo': testes por carteira, 'var': VaR % por dia, 'violacoes': bool por dia}.
+        """
+        r = self.retornos_carteiras(expo)
+        X = r.to_numpy()
+        T, P = X.shape
+        var = np.full((T, P), np.nan)
+        if T > janela:
+            if metodo == 'parametrico':
+                var[janela:] = norm.ppf(confianca) * engine.desvio_movel(X, janela)[janela - 1:-1]
+            else:
+                janelas = np.lib.stride_tricks.sliding_window_view(X[:-1], janela, axis=0) # (T-janela, P, janela)
+                passo = max(1, MEMORIA_MAX // (8 * P * janela))
+                for i in range(0, len(janelas), passo):
+                    var[janela + i:janela + i + passo] = -np.quantile(janelas[i:i + passo], 1 - confianca, axis=-1)
+        testado = ~np.isnan(var)
+        violacoes = testado & (X < -var)
+        resumo = testes_cobertura(violacoes, testado, 1 - confianca)
+        resumo.index = r.columns
+        return {
+            'resumo': resumo,
+            'var': pd.DataFrame(var * 100, index=r.index, columns=r.columns),
+            'violacoes': pd.DataFrame(violacoes, index=r.index, columns=r.columns)
+        }
+
+# --- TESTES DE COBERTURA ---
+def testes_cobertura(violacoes, testado, p):
+    """
+    Kupiec (proporção de falhas), Christoffersen (independência) e cobertura condicional
+    para cada coluna de uma matriz bool de violações (dias x carteiras).
+    """
+    I = np.asarray(violacoes, dtype=bool); ok = np.asarray(testado, dtype=bool)
+    n = ok.sum(axis=0).astype(float); x = (I & ok).sum(axis=0).astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        phat = np.where(n > 0, x / n, 0.0)
+        lr_pof = -2 * (xlogy(n - x, 1 - p) + xlogy(x, p) - xlogy(n - x, 1 - phat) - xlogy(x, phat))
+        # Transições entre dias testados consecutivos
+        par = ok[:-1] & ok[1:]
+        a, b = I[:-1] & par, I[1:] & par
+        n00 = (~a & ~b & par).sum(axis=0); n01 = (~a & b).sum(axis=0)
+        n10 = (a & ~b).sum(axis=0); n11 = (a & b).sum(axis=0)
+        pi0 = np.where(n00 + n01 > 0, n01 / (n00 + n01), 0.0)
+        pi1 = np.where(n10 + n11 > 0, n11 / (n10 + n11), 0.0)
+        total = n00 + n01 + n10 + n11
+        pi = np.where(total > 0, (n01 + n11) / total, 0.0)
+        lr_ind = -2 * (xlogy(n00 + n10, 1 - pi) + xlogy(n01 + n11, pi)
+                       - xlogy(n00, 1 - pi0) - xlogy(n01, pi0) - xlogy(n10, 1 - pi1) - xlogy(n11, pi1))
+    lr_pof = np.maximum(np.nan_to_num(lr_pof), 0.0); lr_ind = np.maximum(np.nan_to_num(lr_ind), 0.0)
+    lr_cc = lr_pof + lr_ind
+    return pd.DataFrame({
+        'Dias': n.astype(int), 'Violações': x.astype(int), 'Esperado': n * p,
+        'Taxa %': phat * 100,
+        'LR Kupiec': lr_pof, 'p Kupiec': chi2.sf(lr_pof, 1),
+        'LR Indep.': lr_ind, 'p Indep.': chi2.sf(lr_ind, 1),
+        'LR Cond.': lr_cc, 'p Cond.': chi2.sf(lr_cc, 2),
+        'Aprovado': chi2.sf(lr_cc, 2) > 0.05
+    })
+
+# --- ATALHO ---
+def avaliar_carteiras(portfolios, df_precos, **kwargs):
+    """Um motor para o universo inteiro e a tabela de VaR/ES de todas as carteiras."""
+    expo = exposicoes(portfolios, df_precos)
+    if expo.empty or expo.shape[1] == 0: return pd.DataFrame(columns=COLUNAS)
+    return MotorRisco(df_precos, expo.columns).avaliar(expo, **kwargs)
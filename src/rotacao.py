@@ -0,0 +1,106 @@
+# Arquivo: E:\Consigliere\src\rotacao.py
+# Módulo: The Compass (Relative Rotation Graph - Universe Wide)
+# Status: V1.0 - RS-Ratio / RS-Momentum vetorizados / Trilhas completas
+
+import hashlib
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import indicadores as engine
+
+MERCADO = 'Mercado'   # benchmark sintético: índice igual-ponderado da própria watchlist
+QUADRANTES = {        # (ratio >= 100, momentum >= 100) -> quadrante
+    (True, True): 'Liderando', (True, False): 'Enfraquecendo',
+    (False, False): 'Atrasado', (False, True): 'Melhorando'}
+CORES_QUADRANTE = {'Liderando': 'rgba(0,255,0,0.06)', 'Enfraquecendo': 'rgba(255,215,0,0.06)',
+                   'Atrasado': 'rgba(255,75,75,0.06)', 'Melhorando': 'rgba(0,150,255,0.06)'}
+_CACHE_RRG = {}       # digest dos preços + parâmetros -> resultado
+_CACHE_MAX = 32
+
+def indice_mercado(df_precos):
+    """Índice igual-ponderado (base 100) dos ativos da tabela: média dos retornos do dia."""
+    r = df_precos.pct_change().mean(axis=1).fillna(0)
+    return ((1 + r).cumprod() * 100).rename(MERCADO)
+
+def _benchmark(df_precos, benchmark):
+    if isinstance(benchmark, pd.Series): return benchmark.reindex(df_precos.index)
+    if benchmark == MERCADO: return indice_mercado(df_precos)
+    if benchmark in df_precos.columns: return df_precos[benchmark]
+    return pd.Series(np.nan, index=df_precos.index)
+
+def _rrg(P, b, janela, suavizacao):
+    """
+    RS = ativo / benchmark só nos dias em que os dois têm preço (por ativo, via compactação):
+    RS-Ratio = 100 · RS / SMA(RS, 2·janela); RS-Momentum = 100 · Ratio / Ratio `janela` barras antes.
+    suavizacao > 1 aplica uma EMA desse span no Ratio e no Momentum (trilhas menos serrilhadas).
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = np.where(b[:, None] > 0, P / b[:, None], np.nan)
+    C, ordem, n = engine.compactar(rs)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = C / engine._media_movel(C, 2 * janela) * 100
+        if suavizacao > 1: ratio = engine._ema(ratio, suavizacao)
+        anterior = np.full(ratio.shape, np.nan); anterior[janela:] = ratio[:-janela]
+        momentum = ratio / anterior * 100
+        if suavizacao > 1: momentum = engine._ema(momentum, suavizacao)
+    return engine.expandir(ratio, ordem, n), engine.expandir(momentum, ordem, n)
+
+def calcular(df_precos, benchmark=MERCADO, janela=14, suavizacao=1):
+    """
+    RRG de todas as colunas de uma vez contra o benchmark (ticker da tabela, Series de
+    preços ou MERCADO). Retorna {'ratio': DataFrame, 'momentum': DataFrame} com a história
+    inteira (trilhas completas). Cache pela "foto" dos preços.
+    """
+    if df_precos is None or df_precos.empty: return {'ratio': pd.DataFrame(), 'momentum': pd.DataFrame()}
+    P = df_precos.to_numpy(dtype=float)
+    b = _benchmark(df_precos, benchmark).to_numpy(dtype=float)
+    digest = hashlib.blake2b(P.tobytes() + b.tobytes() + str(P.shape).encode(), digest_size=16).hexdigest()
+    chave = (digest, tuple(df_precos.columns), janela, suavizacao)
+    if chave not in _CACHE_RRG:
+        if len(_CACHE_RRG) >= _CACHE_MAX: _CACHE_RRG.clear()
+        ratio, momentum = _rrg(P, b, janela, suavizacao)
+        _CACHE_RRG[chave] = {'ratio': pd.DataFrame(ratio, index=df_precos.index, columns=df_precos.columns),
+                             'momentum': pd.DataFrame(momentum, index=df_precos.index, columns=df_precos.columns)}
+    return _CACHE_RRG[chave]
+
+def quadrante(ratio, momentum):
+    if np.isnan(ratio) or np.isnan(momentum): return None
+    return QUADRANTES[(ratio >= 100, momentum >= 100)]
+
+def posicoes(res):
+    """Último ponto válido de cada ativo: DataFrame ativo x [RS-Ratio, RS-Momentum, Quadrante]."""
+    ratio, momentum = res['ratio'], res['momentum']
+    if ratio.empty: return pd.DataFrame(columns=['RS-Ratio', 'RS-Momentum', 'Quadrante'])
+    ok = ratio.notna() & momentum.notna()
+    r, m = ratio.where(ok).ffill().iloc[-1], momentum.where(ok).ffill().iloc[-1]
+    saida = pd.DataFrame({'RS-Ratio': r, 'RS-Momentum': m})
+    saida['Quadrante'] = [quadrante(a, b) for a, b in zip(r, m)]
+    return saida.dropna(subset=['RS-Ratio', 'RS-Momentum'])
+
+def trilhas(res, pontos=10):
+    """Últimos `pontos` válidos de cada ativo em formato longo: Data, Ativo, RS-Ratio, RS-Momentum."""
+    ratio, momentum = res['ratio'], res['momentum']
+    if ratio.empty: return pd.DataFrame(columns=['Data', 'Ativo', 'RS-Ratio', 'RS-Momentum'])
+    longo = pd.DataFrame({'RS-Ratio': ratio.stack(), 'RS-Momentum': momentum.where(ratio.notna()).stack()}).dropna()
+    longo.index.names = ['Data', 'Ativo']
+    return longo.groupby(level='Ativo', sort=False).tail(pontos).reset_index()
+
+def grafico_rrg(res, pontos=10, destaque=None, titulo="Relative Rotation Graph"):
+    """Gráfico de rotação com os quatro quadrantes e a trilha recente de cada ativo."""
+    tr = trilhas(res, pontos)
+    fig = go.Figure()
+    if tr.empty: return fig.update_layout(template="plotly_dark", title=titulo)
+    x0, x1 = min(tr['RS-Ratio'].min(), 99), max(tr['RS-Ratio'].max(), 101)
+    y0, y1 = min(tr['RS-Momentum'].min(), 99), max(tr['RS-Momentum'].max(), 101)
+    for (dx, dy), nome in QUADRANTES.items():
+        fig.add_shape(type="rect", x0=100 if dx else x0, x1=x1 if dx else 100, y0=100 if dy else y0, y1=y1 if dy else 100,
+                      fillcolor=CORES_QUADRANTE[nome], line_width=0, layer="below")
+        fig.add_annotation(x=x1 if dx else x0, y=y1 if dy else y0, text=nome, showarrow=False,
+                           xanchor="right" if dx else "left", yanchor="top" if dy else "bottom", font=dict(color="gray"))
+    for ativo, g in tr.groupby('Ativo', sort=False):
+        largura = 3 if ativo == destaque else 1
+        fig.add_trace(go.Scatter(x=g['RS-Ratio'], y=g['RS-Momentum'], mode='lines+markers', name=str(ativo),
+                                 line=dict(width=largura), marker=dict(size=[4] * (len(g) - 1) + [11]),
+                                 text=g['Data'].astype(str), hovertemplate=f"{ativo}<br>%{{text}}<br>Ratio %{{x:.2f}} | Momentum %{{y:.2f}}<extra></extra>"))
+    fig.add_hline(y=100, line_dash="dot", line_color="gray"); fig.add_vline(x=100, line_dash="dot", line_color="gray")
+    return fig.update_layout(template="plotly_dark", height=600, title=titulo, xaxis_title="RS-Ratio", yaxis_title="RS-Momentum")
@@ -0,0 +1,107 @@
+# Arquivo: E:\Consigliere\src\sensibilidade.py
+# Módulo: The Shadow (Rolling Beta / Alpha / Correlation / Idiosyncratic Vol)
+# Status: V1.0 - Somas acumuladas / Multi-Ativo x Multi-Benchmark
+
+import hashlib
+import numpy as np
+import pandas as pd
+
+DIAS_ANO = 252
+MIN_OBS = 10          # mesmo mínimo do antigo calcular_beta_alpha
+ESTATISTICAS = ('Beta', 'Alfa', 'Correlação', 'Vol Idio', 'R²', 'N')
+MERCADO = 'Mercado'   # benchmark sintético: média dos retornos da watchlist
+_CACHE_BETAS = {}     # digest dos dados + parâmetros -> resultado
+_CACHE_MAX = 64
+
+def _matriz(x):
+    if isinstance(x, pd.Series): return x.to_frame()
+    return x
+
+def _momentos(A, B, janela):
+    """
+    Somas (n, Σa, Σb, Σaa, Σbb, Σab) de cada par ativo x benchmark, só nos dias em que
+    os dois têm retorno. janela=None -> histórico todo (N x K); senão, janela móvel de
+    `janela` linhas para todas as linhas (T x N x K) via somas acumuladas.
+    Os dados são centralizados por coluna antes de somar (estabilidade numérica).
+    """
+    va, vb = ~np.isnan(A), ~np.isnan(B)
+    M = va[:, :, None] & vb[:, None, :]
+    ca = np.nan_to_num(np.nanmean(np.where(va, A, np.nan), axis=0)) if va.any() else np.zeros(A.shape[1])
+    cb = np.nan_to_num(np.nanmean(np.where(vb, B, np.nan), axis=0)) if vb.any() else np.zeros(B.shape[1])
+    a = np.where(M, (A - ca)[:, :, None], 0.0)
+    b = np.where(M, (B - cb)[:, None, :], 0.0)
+    termos = [M.astype(float), a, b, a * a, b * b, a * b]
+    if janela is None: somas = [t.sum(axis=0) for t in termos]
+    else:
+        somas = []
+        for t in termos:
+            cs = np.cumsum(t, axis=0)
+            cs[janela:] = cs[janela:] - cs[:-janela].copy()
+            somas.append(cs)
+    return somas, ca[:, None], cb[None, :]
+
+def _estatisticas(somas, ca, cb, min_obs):
+    n, sa, sb, saa, sbb, sab = somas
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = (sab - sa * sb / n) / (n - 1)
+        var_a = np.maximum((saa - sa * sa / n) / (n - 1), 0.0)
+        var_b = np.maximum((sbb - sb * sb / n) / (n - 1), 0.0)
+        beta = cov / var_b
+        alfa = ((sa / n + ca) - beta * (sb / n + cb)) * DIAS_ANO
+        corr = cov / np.sqrt(var_a * var_b)
+        idio = np.sqrt(np.maximum(var_a - beta * cov, 0.0) * (n - 1) / (n - 2) * DIAS_ANO)
+    ok = (n >= max(min_obs, 3)) & (var_b > 0)
+    nan = lambda v: np.where(ok, v, np.nan)
+    return {'Beta': nan(beta), 'Alfa': nan(alfa), 'Correlação': nan(corr), 'Vol Idio': nan(idio),
+            'R²': nan(corr * corr), 'N': n}
+
+def estatisticas(retornos, benchmarks, janela=None, min_obs=MIN_OBS):
+    """
+    Beta, alfa anualizado, correlação, vol idiossincrática anualizada e R² de cada ativo
+    contra cada benchmark (retornos já alinhados pelo índice; NaN = sem negócio no dia).
+    Retorna {estatística: array} com forma (ativos, benchmarks) ou (T, ativos, benchmarks).
+    Resultados ficam em cache pela "foto" dos dados.
+    """
+    retornos, benchmarks = _matriz(retornos), _matriz(benchmarks).reindex(_matriz(retornos).index)
+    A = retornos.to_numpy(dtype=float); B = benchmarks.to_numpy(dtype=float)
+    digest = hashlib.blake2b(A.tobytes() + B.tobytes() + str(A.shape + B.shape).encode(), digest_size=16).hexdigest()
+    chave = (digest, janela, min_obs)
+    if chave not in _CACHE_BETAS:
+        if len(_CACHE_BETAS) >= _CACHE_MAX: _CACHE_BETAS.clear()
+        _CACHE_BETAS[chave] = _estatisticas(*_momentos(A, B, janela), min_obs)
+    return _CACHE_BETAS[chave]
+
+# --- ATALHOS A PARTIR DE PREÇOS ---
+def retorno_mercado(df_precos):
+    """Proxy de mercado da watchlist (média dos retornos do dia), como o Guardian sempre usou."""
+    return df_precos.pct_change().mean(axis=1).fillna(0).rename(MERCADO)
+
+def _benchmarks(df_precos, benchmarks):
+    colunas = {}
+    for bm in benchmarks:
+        if isinstance(bm, pd.Series): colunas[bm.name or MERCADO] = bm
+        elif bm == MERCADO: colunas[MERCADO] = retorno_mercado(df_precos)
+        elif bm in df_precos.columns: colunas[bm] = df_precos[bm].pct_change()
+    return pd.DataFrame(colunas, index=df_precos.index)
+
+def tabela(df_precos, benchmarks=(MERCADO,), min_obs=MIN_OBS):
+    """Histórico todo: DataFrame ativos x (benchmark, estatística)."""
+    bench = _benchmarks(df_precos, benchmarks)
+    if df_precos.empty or bench.empty: return pd.DataFrame()
+    est = estatisticas(df_precos.pct_change(), bench, None, min_obs)
+    partes = {bm: pd.DataFrame({s: est[s][:, k] for s in ESTATISTICAS}, index=df_precos.columns)
+              for k, bm in enumerate(bench.columns)}
+    return pd.concat(partes, axis=1)
+
+def moveis(df_precos, benchmark=MERCADO, janela=60, min_obs=None):
+    """Janela móvel contra um benchmark: {estatística: DataFrame datas x ativos}."""
+    bench = _benchmarks(df_precos, [benchmark])
+    if df_precos.empty or bench.empty: return {}
+    est = estatisticas(df_precos.pct_change(), bench, janela, min_obs if min_obs is not None else max(MIN_OBS, janela // 2))
+    return {s: pd.DataFrame(est[s][:, :, 0], index=df_precos.index, columns=df_precos.columns) for s in ESTATISTICAS}
+
+def betas(df_precos, benchmark=MERCADO, padrao=1.0):
+    """{ticker: beta} do histórico todo (padrão quando não há dados), para o Guardian e o stress."""
+    t = tabela(df_precos, [benchmark])
+    if t.empty: return {c: padrao for c in df_precos.columns}
+    return t.iloc[:, 0].fillna(padrao).to_dict()
@@ -5,11 +5,12 @@
 import time
 import datetime
 import dados as db
-import cerebro as brain
 import database as vault
 import comms as voice
 import cacador as hunter
 import capo # O Chefe toma a decisão
+import macro as governor
+import fluxo as stream
 import pandas as pd
 import sys
 import os
@@ -22,6 +23,10 @@ INTERVALO = 1800 # 30 min
 LOTE_PADRAO = 5000.0 # Valor financeiro por trade automático (R$)
 SCORE_COMPRA = 85    # Score mínimo para comprar sozinho
 SCORE_VENDA = 25     # Score máximo para vender sozinho (se tiver posição)
+PERIODO = "2y"       # Histórico usado para (re)construir o estado de um ativo
+
+# Indicadores incrementais por ativo (carregados do disco no 1º ciclo e salvos a cada ciclo)
+ESTADOS = None
 
 def log(msg):
     ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -35,6 +40,100 @@ def registrar_heartbeat():
         with open(HEARTBEAT_FILE, "w") as f: f.write(str(time.time()))
     except: pass
 
+# --- REGRAS (as do ciclo_vigilancia, reaproveitadas pelo replay histórico) ---
+def niveis_saida(preco, atr):
+    """Stop técnico (2 ATR) e alvo (3 ATR). Se o ATR falhar (histórico sem High/Low), usa 5%."""
+    if not atr > 0: atr = preco * 0.05
+    return preco - (2 * atr), preco + (3 * atr)
+
+def processar_ciclo(cofre, estados, aconselhar, auto_trade, avisar=None, user_id=1, registrar=None):
+    """
+    Um ciclo de decisão sobre um "cofre" com a interface do database (carregar_portfolio,
+    registrar_trade, registrar_sinal), ex.: replay.CofreMemoria.
+    Repete o laço do ciclo_vigilancia passo a passo, inclusive os limites dele: o caixa
+    local não é descontado entre compras do mesmo ciclo, stop e take são testados de
+    forma independente e a carteira é a fotografia do início do ciclo (uma posição zerada
+    pelo Guardião ainda pode ser vendida por score no mesmo ciclo).
+    `estados` = {ticker: fluxo.EstadoAtivo}; `aconselhar(ticker, estado)` = conselho do Capo;
+    `avisar(msg)` = Telegram (opcional); `registrar(msg)` = log.
+    Retorna o nº de alertas.
+    """
+    registrar = registrar or log
+    avisar = avisar or (lambda msg: None)
+    portfolio = cofre.carregar_portfolio(user_id)
+    caixa_disponivel = portfolio.get('Caixa', 0)
+    ativos_port = [a for a in portfolio.keys() if a != 'Caixa']
+    alertas = 0
+    
+    # --- A. GUARDIÃO DE POSIÇÃO (Stops & Takes) ---
+    for ativo in ativos_port:
+        if ativo in estados:
+            dados = portfolio[ativo]
+            atual = estados[ativo].preco
+            stop = dados.get('stop', 0); take = dados.get('take', 0)
+            
+            # Stop Loss (Execução de Emergência)
+            if stop > 0 and atual <= stop:
+                if auto_trade:
+                    cofre.registrar_trade(ativo, 'V', dados['qtd'], atual, "STOP LOSS AUTOMÁTICO", user_id=user_id)
+                    msg = f"🚨 **STOP EXECUTADO**: Vendi {dados['qtd']}x {ativo} a {atual:.2f}"
+                    registrar(f"EXECUÇÃO: Stop Loss em {ativo}")
+                else:
+                    msg = f"🚨 **STOP LOSS ACIONADO**: {ativo} em {atual:.2f} (Stop: {stop:.2f})\nRecomendação: VENDER."
+                avisar(msg)
+                alertas += 1
+            
+            # Take Profit
+            if take > 0 and atual >= take:
+                if auto_trade:
+                    cofre.registrar_trade(ativo, 'V', dados['qtd'], atual, "TAKE PROFIT AUTOMÁTICO", user_id=user_id)
+                    msg = f"💰 **LUCRO NO BOLSO**: Vendi {dados['qtd']}x {ativo} a {atual:.2f}"
+                    registrar(f"EXECUÇÃO: Take Profit em {ativo}")
+                else:
+                    msg = f"💰 **TAKE PROFIT ATINGIDO**: {ativo} em {atual:.2f} (Alvo: {take:.2f})"
+                avisar(msg)
+                alertas += 1
+
+    # --- B. OPPORTUNITY HUNTER & AUTO-TRADER ---
+    for ticker, estado in estados.items():
+        if estado.barras < 200: continue
+        
+        # 1. Consulta o CAPO (Score Geral)
+        decisao = aconselhar(ticker, estado)
+        score = decisao['Score']
+        preco_atual = decisao['Preço']
+        
+        # --- LÓGICA DE EXECUÇÃO ---
+        if auto_trade:
+            # COMPRA (sem dobrar posição; caixa conferido contra o início do ciclo, como ao vivo)
+            if score >= SCORE_COMPRA:
+                if ticker not in ativos_port and caixa_disponivel >= LOTE_PADRAO:
+                    qtd_compra = int(LOTE_PADRAO / preco_atual)
+                    if qtd_compra > 0:
+                        # Stop Técnico Automático (ATR)
+                        stop_auto, take_auto = niveis_saida(preco_atual, estado.indicadores()['ATR'])
+                        cofre.registrar_trade(ticker, 'C', qtd_compra, preco_atual, f"AUTO CAPO SCORE {score}", stop_auto, take_auto, user_id=user_id)
+                        avisar(f"🤖 **COMPRA AUTOMÁTICA**: {ticker}\nScore: {score}/100\nQtd: {qtd_compra} @ {preco_atual:.2f}\nStop: {stop_auto:.2f}")
+                        registrar(f"EXECUÇÃO: Compra {ticker} Score {score}")
+            
+            # VENDA (Saída por Score Baixo)
+            elif score <= SCORE_VENDA:
+                if ticker in ativos_port:
+                    qtd_pos = portfolio[ticker]['qtd']
+                    if qtd_pos > 0:
+                        cofre.registrar_trade(ticker, 'V', qtd_pos, preco_atual, f"AUTO SAÍDA SCORE {score}", user_id=user_id)
+                        avisar(f"🤖 **VENDA AUTOMÁTICA**: {ticker}\nScore caiu para {score}/100\nPosição Zerada.")
+                        registrar(f"EXECUÇÃO: Venda {ticker} Score {score}")
+
+        # --- ALERTA DE SINAL (Se não for auto trade ou apenas para log) ---
+        # Se o score for muito alto, registra sinal mesmo se não comprar
+        if score >= 80:
+            novo = cofre.registrar_sinal(ticker, f"CAPO HIGH CONVICTION ({score})", preco_atual, user_id=user_id)
+            if novo and not auto_trade: # Só avisa se não comprou automático
+                avisar(f"💎 **OPORTUNIDADE DE OURO**: {ticker}\nScore do Capo: {score}/100\nPreço: {preco_atual:.2f}")
+                alertas += 1
+    return alertas
+
 def ciclo_vigilancia():
     registrar_heartbeat()
     
@@ -57,21 +156,32 @@ def ciclo_vigilancia():
 
     log(f"Escaneando {len(todos_ativos)} ativos... (Auto-Trading: {auto_trade})")
     
+    global ESTADOS
+    if ESTADOS is None: ESTADOS = stream.carregar_estados()
+    
     try:
-        # Pega dados
-        df_precos = db.buscar_dados_multiticker(todos_ativos, "2y") 
+        # Sincroniza o armazém (um download incremental para a lista inteira) e
+        # avança os indicadores só com as barras novas de cada ativo
+        db.sincronizar_armazem(todos_ativos, PERIODO)
+        estados = {t: stream.sincronizar_estado(ESTADOS, t, lambda desde, t=t: db.ler_armazem(t, desde, PERIODO))
+                   for t in todos_ativos}
     except Exception as e:
         log(f"Erro dados: {e}"); return
 
-    if df_precos.empty: return
+    estados = {t: e for t, e in estados.items() if e.barras}
+    if not estados: return
 
     alertas = 0
     
+    # Regime macro: uma fotografia por ciclo, compartilhada por todos os ativos
+    contexto_macro = governor.obter_contexto_macro(forcar=True)
+    log(f"Regime Macro: {contexto_macro['regime']} (Penalidade -{contexto_macro['penalidade']})")
+    
     # --- A. GUARDIÃO DE POSIÇÃO (Stops & Takes) ---
     for ativo in ativos_port:
-        if ativo in df_precos.columns:
+        if ativo in estados:
             dados = portfolio[ativo]
-            atual = df_precos[ativo].iloc[-1]
+            atual = estados[ativo].preco
             stop = dados.get('stop', 0); take = dados.get('take', 0)
             
             # Stop Loss (Execução de Emergência)
@@ -103,18 +213,14 @@ def ciclo_vigilancia():
 
     # --- B. OPPORTUNITY HUNTER & AUTO-TRADER ---
     for ticker in todos_ativos:
-        if ticker in df_precos.columns:
-            hist = df_precos[ticker].dropna()
-            if len(hist) < 200: continue 
-            
-            # 1. Consulta o CAPO (Score Geral)
-            # Precisamos criar um DF pequeno só para este ativo para passar pro Capo
-            df_ativo = hist.to_frame(name='Close')
-            # Adiciona volume se tiver no original (o 'cerebro' precisa para VWAP)
-            # No df_precos multiticker do yfinance, as vezes vem MultiIndex. Simplificação aqui:
-            # O Capo calcula indicadores internamente.
+        if ticker in estados:
+            estado = estados[ticker]
+            if estado.barras < 200: continue 
             
-            decisao = capo.gerar_conselho_final(ticker, df_ativo)
+            # 1. Consulta o CAPO (Score Geral) a partir do estado incremental;
+            #    o histórico completo só é lido se o modelo da IA precisar de treino
+            decisao = capo.gerar_conselho_estado(ticker, estado, contexto_macro,
+                                                 historico=lambda t=ticker: db.ler_armazem(t, None, PERIODO))
             score = decisao['Score']
             preco_atual = decisao['Preço']
             
@@ -128,9 +234,9 @@ def ciclo_vigilancia():
                             qtd_compra = int(LOTE_PADRAO / preco_atual)
                             if qtd_compra > 0:
                                 # Define Stop Técnico Automático (ATR)
-                                atr = brain.calcular_atr(hist.to_frame(name='Close')).iloc[-1] # ATR simplificado
-                                # Se ATR falhar (por falta de High/Low), usa 5%
-                                if atr == 0: atr = preco_atual * 0.05
+                                atr = estado.indicadores()['ATR']
+                                # Se ATR falhar (histórico sem High/Low), usa 5%
+                                if not atr > 0: atr = preco_atual * 0.05
                                 
                                 stop_auto = preco_atual - (2 * atr)
                                 take_auto = preco_atual + (3 * atr)
@@ -161,6 +267,9 @@ def ciclo_vigilancia():
                     if token and chat_id: voice.enviar_telegram(token, chat_id, msg)
                     alertas += 1
 
+    # Guarda só os ativos ainda monitorados
+    for t in set(ESTADOS) - set(todos_ativos): del ESTADOS[t]
+    stream.salvar_estados(ESTADOS)
     log(f"Ciclo fim. Alertas/Execuções: {alertas}. Aguardando {INTERVALO}s...")
 
 def iniciar_servico():
@@ -4,6 +4,7 @@
 
 import pandas as pd
 import plotly.express as px
+import rotacao as compass
 
 # Mapa Manual de Setores (Expandir conforme necessidade)
 # Como APIs gratuitas falham em dar setor preciso da B3, usamos um mapa fixo robusto.
@@ -70,4 +71,20 @@ def gerar_arvore_setorial(df_precos):
     # Usamos valor absoluto do retorno + 1 para dar volume visual, ou fixo
     df_ativos_setor['Tamanho'] = 1 
     
-    return df_ativos_setor
\ No newline at end of file
+    return df_ativos_setor
+
+def indices_setoriais(df_precos):
+    """
+    Índice igual-ponderado (base 100) de cada setor: média dos retornos diários dos
+    ativos do setor que negociaram no dia. Colunas = setores.
+    """
+    if df_precos.empty: return pd.DataFrame()
+    rets = df_precos.pct_change()
+    setores = rets.T.groupby(rets.columns.map(identificar_setor)).mean().T
+    return (1 + setores.fillna(0)).cumprod() * 100
+
+def calcular_rrg_setorial(df_precos, janela=14, suavizacao=1):
+    """RRG dos setores (índices setoriais) contra o índice igual-ponderado da watchlist inteira."""
+    setores = indices_setoriais(df_precos)
+    if setores.empty: return compass.calcular(setores)
+    return compass.calcular(setores, compass.indice_mercado(df_precos).reindex(setores.index), janela, suavizacao)
@@ -2,15 +2,17 @@
 # Módulo: The Appraiser (Fundamental Valuation Engine)
 # Status: V1.0 - Graham & Bazin
 
-import yfinance as yf
 import pandas as pd
 import numpy as np
+import time
+from concurrent.futures import ThreadPoolExecutor
+import fontes
 
 def obter_dados_fundamentos(ticker):
-    """Busca dados específicos para valuation no Yahoo Finance."""
+    """Busca dados específicos para valuation na fonte de dados ativa."""
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
+        info = fontes.obter_fonte().fundamentos(ticker)
+        if not info: return None
         
         # Tratamento de erros para chaves inexistentes
         dados = {
@@ -31,6 +33,29 @@ def obter_dados_fundamentos(ticker):
     except Exception as e:
         return None
 
+# --- CACHE DE FUNDAMENTOS (BALANÇOS MUDAM POUCO) ---
+FUNDAMENTOS_TTL = 21600 # 6h
+_CACHE_FUNDAMENTOS = {} # ticker -> (timestamp, dados)
+
+def obter_dados_fundamentos_lote(tickers, max_workers=8, ttl=FUNDAMENTOS_TTL):
+    """
+    Fundamentos de vários ativos de uma vez: o que está no cache é reaproveitado,
+    o resto é buscado em paralelo (a fonte não tem endpoint em lote).
+    Retorna {ticker: dados ou None}.
+    """
+    agora = time.time()
+    res, faltantes = {}, []
+    for t in dict.fromkeys(tickers):
+        em_cache = _CACHE_FUNDAMENTOS.get(t)
+        if em_cache and (agora - em_cache[0]) < ttl: res[t] = em_cache[1]
+        else: faltantes.append(t)
+    if faltantes:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for t, dados in zip(faltantes, pool.map(obter_dados_fundamentos, faltantes)):
+                res[t] = dados
+                if dados: _CACHE_FUNDAMENTOS[t] = (agora, dados)
+    return res
+
 def calcular_graham(lpa, vpa):
     """
     Fórmula de Benjamin Graham para Valor Intrínseco: